@@ -0,0 +1,92 @@
+import os
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analysis (
+    kind TEXT NOT NULL,
+    path TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    data BLOB,
+    PRIMARY KEY (kind, path)
+);
+"""
+
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+class AnalysisCache:
+    def __init__(self, db_path="analysis_cache.db"):
+        self.db_path = db_path
+        self.local = threading.local()
+        self.schema_lock = threading.Lock()
+        self.schema_ready = False
+
+    def connection(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=10)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            with self.schema_lock:
+                if not self.schema_ready:
+                    connection.executescript(SCHEMA)
+                    self.schema_ready = True
+            self.local.connection = connection
+        return connection
+
+    def get_many(self, kind, paths):
+        wanted = set(paths)
+        try:
+            rows = self.connection().execute(
+                "SELECT path, mtime_ns, size, data FROM analysis WHERE kind = ?", (kind,)
+            ).fetchall()
+        except sqlite3.Error as e:
+            print(f"Error reading analysis cache: {e}")
+            return {}
+        results = {}
+        for path, mtime_ns, size, data in rows:
+            if path in wanted and file_signature(path) == (mtime_ns, size):
+                results[path] = data
+        return results
+
+    def get(self, kind, path):
+        try:
+            row = self.connection().execute(
+                "SELECT mtime_ns, size, data FROM analysis WHERE kind = ? AND path = ?", (kind, path)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Error reading analysis cache: {e}")
+            return None
+        if row is None or file_signature(path) != (row[0], row[1]):
+            return None
+        return row[2]
+
+    def put_many(self, kind, items):
+        # Items carry the signature seen before analysis, so a file changed mid-run stays stale
+        rows = []
+        for path, signature, data in items:
+            if signature is not None:
+                rows.append((kind, path, signature[0], signature[1], data))
+        if not rows:
+            return
+        try:
+            connection = self.connection()
+            with connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO analysis (kind, path, mtime_ns, size, data) "
+                    "VALUES (?, ?, ?, ?, ?)", rows
+                )
+        except sqlite3.Error as e:
+            print(f"Error writing analysis cache: {e}")
+
+    def close(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self.local.connection = None
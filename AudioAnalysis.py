@@ -0,0 +1,386 @@
+import os
+import struct
+import threading
+import functools
+from concurrent.futures import ProcessPoolExecutor
+from AnalysisCache import file_signature
+
+ANALYSIS_RATE = 11025
+FRAME_SIZE = 2048
+HOP_SIZE = 256
+BAND_COUNT = 17
+MAX_ANALYSIS_SECONDS = 30
+MATCH_BIT_ERROR_RATE = 0.25
+MAX_FRAME_SHIFT = 8
+MATCH_SHARED_KEYS = 2
+MAX_KEY_CLIPS = 32
+SILENCE_THRESHOLD_DB = -50.0
+TRIM_LEAD_IN = 0.005
+PEAK_BLOCK = 64
+PEAK_MAX_BUCKETS = 16384
+PEAK_MIN_BUCKETS = 32
+
+pygame = None
+popcount = None
+
+def init_worker():
+    global pygame
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+    os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+    if hasattr(os, "nice"):
+        try:
+            os.nice(10)
+        except OSError:
+            pass
+    import pygame as pygame_module
+    pygame = pygame_module
+    pygame.mixer.init(frequency=ANALYSIS_RATE, size=-16, channels=1)
+
+def init_pcm_worker(frequency, size, channels):
+    # A separate process with its own mixer in the player's format, so decoding never shares pygame
+    # with the player
+    global pygame
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+    os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+    import pygame as pygame_module
+    pygame = pygame_module
+    pygame.mixer.init(frequency=frequency, size=size, channels=channels)
+    if pygame.mixer.get_init() != (frequency, size, channels):
+        raise RuntimeError(f"Decoder mixer opened as {pygame.mixer.get_init()}")
+
+def decode_raw(path):
+    return pygame.mixer.Sound(path).get_raw()
+
+def decode_mono(path):
+    import numpy as np
+    if pygame is None:
+        init_worker()
+    raw = pygame.mixer.Sound(path).get_raw()
+    return np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32768.0
+
+def band_edges():
+    import numpy as np
+    frequencies = np.geomspace(300.0, 3000.0, BAND_COUNT + 1)
+    return np.round(frequencies * FRAME_SIZE / ANALYSIS_RATE).astype(np.intp)
+
+def fingerprint(samples):
+    # Haitsma-Kalker style: one bit per adjacent band pair, set when the energy
+    # difference between the bands grows from one frame to the next
+    import numpy as np
+    samples = samples[:MAX_ANALYSIS_SECONDS * ANALYSIS_RATE]
+    if len(samples) < FRAME_SIZE + HOP_SIZE or np.sqrt(np.mean(samples * samples)) < 1e-4:
+        return None
+    frames = np.lib.stride_tricks.sliding_window_view(samples, FRAME_SIZE)[::HOP_SIZE]
+    spectrum = np.abs(np.fft.rfft(frames * np.hanning(FRAME_SIZE), axis=1)) ** 2
+    edges = band_edges()
+    energy = np.add.reduceat(spectrum[:, edges[0]:edges[-1]], edges[:-1] - edges[0], axis=1)
+    band_diff = energy[:, :-1] - energy[:, 1:]
+    bits = (band_diff[1:] - band_diff[:-1]) > 0
+    return np.packbits(bits, axis=1, bitorder="little").view("<u2").ravel()
+
+def fingerprint_data(samples):
+    bits = fingerprint(samples)
+    duration = len(samples) / ANALYSIS_RATE
+    return struct.pack("<d", duration) + (bits.tobytes() if bits is not None else b"")
+
+def trim_data(samples):
+    import numpy as np
+    threshold = 10 ** (SILENCE_THRESHOLD_DB / 20)
+    audible = np.flatnonzero(np.abs(samples) > threshold)
+    if len(audible) == 0:
+        return None
+    start = max(0.0, audible[0] / ANALYSIS_RATE - TRIM_LEAD_IN)
+    end = min(len(samples), audible[-1] + 1) / ANALYSIS_RATE
+    return struct.pack("<dd", start, end)
+
+def unpack_trim(data):
+    return struct.unpack("<dd", data)
+
+def integrity_data(samples, error=None):
+    # First byte is the verdict; a failed probe keeps the reason after it
+    if error is None and len(samples) == 0:
+        error = "decodes to no audio"
+    if error is None:
+        return b"\x01"
+    return b"\x00" + str(error).encode("utf-8", "replace")[:200]
+
+def unpack_integrity(data):
+    if data is None or data[:1] == b"\x01":
+        return True, ""
+    return False, data[1:].decode("utf-8", "replace")
+
+def peak_levels(samples):
+    # Level 0 holds the min/max of every block; each level above halves the one below it
+    import numpy as np
+    block = max(PEAK_BLOCK, -(-len(samples) // PEAK_MAX_BUCKETS))
+    count = -(-len(samples) // block)
+    padded = np.pad(samples, (0, count * block - len(samples)), mode="edge").reshape(count, block)
+    low = np.clip(np.round(padded.min(axis=1) * 127), -127, 127).astype(np.int8)
+    high = np.clip(np.round(padded.max(axis=1) * 127), -127, 127).astype(np.int8)
+    levels = [np.stack([low, high], axis=1)]
+    while len(levels[-1]) > PEAK_MIN_BUCKETS:
+        level = levels[-1]
+        if len(level) % 2:
+            level = np.concatenate([level, level[-1:]])
+        pairs = level.reshape(-1, 2, 2)
+        levels.append(np.stack([pairs[:, :, 0].min(axis=1), pairs[:, :, 1].max(axis=1)], axis=1))
+    return block, levels
+
+def peaks_data(samples):
+    if len(samples) == 0:
+        return None
+    block, levels = peak_levels(samples)
+    header = struct.pack(f"<dIB{len(levels)}I", len(samples) / ANALYSIS_RATE, block, len(levels),
+                         *(len(level) for level in levels))
+    return header + b"".join(level.tobytes() for level in levels)
+
+class PeakPyramid:
+    # int8 min/max pairs at every power-of-two zoom, so any view is one reduceat over a level
+    def __init__(self, duration, block, levels):
+        self.duration = duration
+        self.block = block
+        self.levels = levels
+
+    def columns(self, start, end, width):
+        import numpy as np
+        start = max(0.0, start)
+        end = min(self.duration, end)
+        if end <= start or width <= 0:
+            return np.zeros(0, np.float32), np.zeros(0, np.float32)
+        # Coarsest level that still has a bucket for every column
+        rate = ANALYSIS_RATE / self.block
+        level_index = 0
+        for index in range(len(self.levels) - 1, -1, -1):
+            if (end - start) * rate / 2 ** index >= width:
+                level_index = index
+                break
+        level = self.levels[level_index]
+        level_rate = rate / 2 ** level_index
+        first = min(len(level) - 1, int(start * level_rate))
+        last = max(first + 1, min(len(level), int(np.ceil(end * level_rate))))
+        edges = np.linspace(0, last - first, width + 1).astype(np.intp)[:-1]
+        low = np.minimum.reduceat(level[first:last, 0], edges)
+        high = np.maximum.reduceat(level[first:last, 1], edges)
+        return low / 127.0, high / 127.0
+
+def unpack_peaks(data):
+    import numpy as np
+    if not data:
+        return None
+    duration, block, count = struct.unpack_from("<dIB", data, 0)
+    offset = struct.calcsize("<dIB")
+    sizes = struct.unpack_from(f"<{count}I", data, offset)
+    offset += 4 * count
+    levels = []
+    for size in sizes:
+        levels.append(np.frombuffer(data, dtype=np.int8, count=size * 2, offset=offset).reshape(size, 2))
+        offset += size * 2
+    return PeakPyramid(duration, block, levels)
+
+def cached_duration(cache, path):
+    # Peaks and fingerprints both start with the decoded duration
+    for kind in ("peaks", "fingerprint"):
+        data = cache.get(kind, path)
+        if data:
+            return struct.unpack_from("<d", data, 0)[0]
+    return None
+
+ANALYSERS = {
+    "fingerprint": fingerprint_data,
+    "trim": trim_data,
+    "integrity": integrity_data,
+    "peaks": peaks_data,
+}
+
+def analyse_file(path, kinds):
+    signature = file_signature(path)
+    try:
+        samples = decode_mono(path)
+    except Exception as e:
+        print(f"Could not decode {path} for analysis: {e}")
+        results = dict.fromkeys(kinds)
+        if "integrity" in results:
+            results["integrity"] = integrity_data(None, e)
+        return path, signature, results
+    results = {}
+    for kind in kinds:
+        try:
+            results[kind] = ANALYSERS[kind](samples)
+        except Exception as e:
+            print(f"Could not run {kind} analysis on {path}: {e}")
+            results[kind] = None
+    return path, signature, results
+
+def unpack_fingerprint(data):
+    import numpy as np
+    duration = struct.unpack_from("<d", data, 0)[0]
+    bits = np.frombuffer(data, dtype="<u2", offset=8)
+    return duration, bits
+
+def bit_error_rate(a, b, max_shift=MAX_FRAME_SHIFT):
+    # All shifts at once: row s compares a[k] with b[k - s], masked where b runs out
+    global popcount
+    import numpy as np
+    if popcount is None:
+        popcount = np.unpackbits(np.arange(65536, dtype="<u2").view(np.uint8)).reshape(-1, 16).sum(axis=1)
+    shifts = np.arange(-max_shift, max_shift + 1)[:, None]
+    other = np.arange(len(a))[None, :] - shifts
+    valid = (other >= 0) & (other < len(b))
+    differing = np.where(valid, popcount[a[None, :] ^ b[np.clip(other, 0, len(b) - 1)]], 0).sum(axis=1)
+    length = valid.sum(axis=1)
+    usable = length >= 2
+    if not usable.any():
+        return 1.0
+    return min(1.0, float((differing[usable] / (length[usable] * 16)).min()))
+
+def candidate_pairs(durations, fingerprints):
+    # Clips are only compared if they have near-equal lengths and share a few exact 16-bit frames
+    # at roughly the same position. The position is bucketed on two grids offset by half a bucket,
+    # so frames within MAX_FRAME_SHIFT of each other always share a bucket on one of them.
+    import numpy as np
+    bucket = 2 * MAX_FRAME_SHIFT
+    keys = []
+    owners = []
+    for index, bits in enumerate(fingerprints):
+        words = bits.astype(np.int64)
+        frames = np.arange(len(words))
+        unique = np.unique(np.concatenate([
+            words | (frames // bucket * 2) << 16,
+            words | ((frames + MAX_FRAME_SHIFT) // bucket * 2 + 1) << 16,
+        ]))
+        keys.append(unique)
+        owners.append(np.full(len(unique), index, dtype=np.int64))
+    if not keys:
+        return []
+    keys = np.concatenate(keys)
+    owners = np.concatenate(owners)
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    owners = owners[order]
+
+    # Keys shared by many clips (silence, steady tones) say nothing about a match
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    sizes = np.diff(np.r_[starts, len(keys)])
+    keep = np.repeat(sizes <= MAX_KEY_CLIPS, sizes)
+    keys = keys[keep]
+    owners = owners[keep]
+
+    count = len(fingerprints)
+    codes = []
+    for gap in range(1, MAX_KEY_CLIPS):
+        same = keys[gap:] == keys[:-gap]
+        if not same.any():
+            break
+        codes.append(owners[:-gap][same] * count + owners[gap:][same])
+    if not codes:
+        return []
+    codes, shared = np.unique(np.concatenate(codes), return_counts=True)
+    codes = codes[shared >= MATCH_SHARED_KEYS]
+    first, second = codes // count, codes % count
+
+    durations = np.asarray(durations)
+    close = durations[second] - durations[first] <= np.maximum(0.1, durations[first] * 0.02)
+    return list(zip(first[close].tolist(), second[close].tolist()))
+
+def group_duplicates(fingerprints, rank=None):
+    entries = []
+    for path, data in fingerprints.items():
+        if data is None:
+            continue
+        duration, bits = unpack_fingerprint(data)
+        if len(bits) >= 2:
+            entries.append((duration, path, bits))
+    entries.sort(key=lambda entry: entry[0])
+
+    parent = {}
+    def find(path):
+        while parent.get(path, path) != path:
+            path = parent[path]
+        return path
+
+    pairs = candidate_pairs([entry[0] for entry in entries], [entry[2] for entry in entries])
+    for i, j in pairs:
+        path, other_path = entries[i][1], entries[j][1]
+        if find(path) != find(other_path) and bit_error_rate(entries[i][2], entries[j][2]) < MATCH_BIT_ERROR_RATE:
+            parent[find(other_path)] = find(path)
+
+    groups = {}
+    for _, path, _ in entries:
+        groups.setdefault(find(path), []).append(path)
+    rank = rank or {}
+    return [sorted(group, key=lambda path: rank.get(path, len(rank))) for group in groups.values()
+            if len(group) > 1]
+
+class AnalysisJob:
+    # One decode per file feeds every requested kind; on_batch sees results as they land.
+    # on_duplicates gets the duplicate groups, which are also worked out in the pool.
+    def __init__(self, kinds, paths, cache, on_done=None, on_batch=None, max_workers=None, batch_size=64,
+                 on_duplicates=None, rank=None):
+        self.kinds = tuple(kinds)
+        self.paths = list(paths)
+        self.cache = cache
+        self.on_done = on_done
+        self.on_batch = on_batch
+        self.on_duplicates = on_duplicates
+        self.rank = rank
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.batch_size = batch_size
+        self.cancelled = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def deliver(self, kind_results):
+        if self.on_batch is not None and not self.cancelled.is_set():
+            self.on_batch(kind_results)
+
+    def flush(self, batch):
+        for kind in self.kinds:
+            self.cache.put_many(kind, [(path, signature, results[kind]) for path, signature, results in batch])
+        self.deliver({kind: {path: results[kind] for path, _, results in batch} for kind in self.kinds})
+
+    def run(self):
+        results = {kind: self.cache.get_many(kind, self.paths) for kind in self.kinds}
+        self.deliver(results)
+        todo = [path for path in self.paths if any(path not in results[kind] for kind in self.kinds)]
+        grouping = self.on_duplicates is not None and "fingerprint" in self.kinds
+        if todo or grouping:
+            batch = []
+            executor = ProcessPoolExecutor(self.max_workers if todo else 1, initializer=init_worker)
+            try:
+                if todo:
+                    print(f"Analysing {len(todo)} files ({', '.join(self.kinds)})")
+                    chunk_size = max(1, min(32, len(todo) // (self.max_workers * 4)))
+                    worker = functools.partial(analyse_file, kinds=self.kinds)
+                    for item in executor.map(worker, todo, chunksize=chunk_size):
+                        if self.cancelled.is_set():
+                            break
+                        path, _, file_results = item
+                        for kind in self.kinds:
+                            results[kind][path] = file_results[kind]
+                        batch.append(item)
+                        if len(batch) >= self.batch_size:
+                            self.flush(batch)
+                            batch = []
+                    if batch:
+                        self.flush(batch)
+                        batch = []
+                if grouping and not self.cancelled.is_set():
+                    # Grouping is numpy-heavy, so it runs at the pool's low priority, off this process's GIL
+                    groups = executor.submit(group_duplicates, results["fingerprint"], self.rank).result()
+                    if not self.cancelled.is_set():
+                        self.on_duplicates(groups)
+            except Exception as e:
+                print(f"Error running analysis: {e}")
+            finally:
+                executor.shutdown(wait=not self.cancelled.is_set(), cancel_futures=True)
+            if batch:
+                self.flush(batch)
+        if self.on_done is not None and not self.cancelled.is_set():
+            self.on_done(results)
@@ -0,0 +1,162 @@
+import time
+import struct
+import multiprocessing
+from multiprocessing import shared_memory
+from MemoryReader import PROCESS_NAME, open_process_memory, ButtonReader
+
+DISCONNECTED = -1
+
+class EventRing:
+    # write_count, heartbeat_ns, samples, long_gaps, max_gap_ns, short_pulses
+    HEADER = struct.Struct("<QqQQqQ")
+    # edge time (monotonic_ns), button state
+    RECORD = struct.Struct("<qq")
+
+    def __init__(self, capacity=1024, name=None):
+        self.capacity = capacity
+        size = self.HEADER.size + capacity * self.RECORD.size
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.HEADER.pack_into(self.shm.buf, 0, 0, 0, 0, 0, 0, 0)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        self.write_count = 0
+        self.read_count = 0
+        self.lost = 0
+
+    def offset(self, index):
+        return self.HEADER.size + (index % self.capacity) * self.RECORD.size
+
+    def write(self, time_ns, state):
+        # Single producer: fill the slot first, then publish it by bumping the counter
+        self.RECORD.pack_into(self.shm.buf, self.offset(self.write_count), time_ns, state)
+        self.write_count += 1
+        struct.pack_into("<Q", self.shm.buf, 0, self.write_count)
+
+    def publish_stats(self, heartbeat_ns, sampler):
+        self.HEADER.pack_into(self.shm.buf, 0, self.write_count, heartbeat_ns, sampler.samples,
+                              sampler.long_gaps, sampler.gap_max_ns, sampler.short_pulses)
+
+    def read_header(self):
+        return self.HEADER.unpack_from(self.shm.buf, 0)
+
+    def read(self):
+        write_count = struct.unpack_from("<Q", self.shm.buf, 0)[0]
+        start = max(self.read_count, write_count - self.capacity)
+        events = [self.RECORD.unpack_from(self.shm.buf, self.offset(index))
+                  for index in range(start, write_count)]
+        # Anything the producer lapped while we were copying may be torn, including the slot
+        # it may be filling right now for the next, not yet published, index
+        overwritten = struct.unpack_from("<Q", self.shm.buf, 0)[0] + 1 - self.capacity - start
+        if overwritten > 0:
+            events = events[overwritten:]
+            start += overwritten
+        self.lost += start - self.read_count
+        self.read_count = max(start, write_count)
+        return events
+
+    def close(self):
+        self.shm.close()
+
+    def unlink(self):
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+def poll_process(ring_name, capacity, process_name, memory_backend, pointer_chains, guard_interval, sampler, stop_event,
+                 tuning=None):
+    ring = EventRing(capacity, name=ring_name)
+    if tuning is not None:
+        tuning.apply()
+    try:
+        reader = ButtonReader(open_process_memory(process_name, memory_backend), pointer_chains, guard_interval)
+        if reader.locate() is None:
+            raise RuntimeError("button address not found")
+    except Exception as e:
+        print(f"Poller failed to open {process_name}: {e}")
+        ring.write(time.monotonic_ns(), DISCONNECTED)
+        ring.close()
+        return
+
+    sampler.reset()
+    try:
+        while not stop_event.is_set():
+            now_ns = time.monotonic_ns()
+            state = reader.read(now_ns / 1e9)
+            if state < 0:
+                ring.write(now_ns, DISCONNECTED)
+                break
+            if sampler.sample(state, now_ns) or sampler.samples == 1:
+                ring.write(now_ns, state)
+            ring.publish_stats(now_ns, sampler)
+            time.sleep(sampler.next_interval(now_ns))
+    finally:
+        ring.close()
+
+class ButtonPoller:
+    def __init__(self, sampler, pointer_chains=(), guard_interval=0.5, process_name=PROCESS_NAME, capacity=1024,
+                 memory_backend="auto", tuning=None):
+        self.sampler = sampler
+        self.memory_backend = memory_backend
+        self.tuning = tuning
+        self.pointer_chains = pointer_chains
+        self.guard_interval = guard_interval
+        self.process_name = process_name
+        self.capacity = capacity
+        self.ring = None
+        self.process = None
+        self.stop_event = None
+
+    def start(self):
+        try:
+            self.ring = EventRing(self.capacity)
+            self.stop_event = multiprocessing.Event()
+            self.process = multiprocessing.Process(
+                target=poll_process,
+                args=(self.ring.name, self.capacity, self.process_name, self.memory_backend, self.pointer_chains,
+                      self.guard_interval, self.sampler, self.stop_event, self.tuning),
+                daemon=True
+            )
+            self.process.start()
+            return True
+        except Exception as e:
+            print(f"Could not start button poller process: {e}")
+            self.stop()
+            return False
+
+    def read_events(self):
+        if self.ring is None:
+            return None
+        events = self.ring.read()
+        if not events and not self.process.is_alive():
+            return None
+        return events
+
+    def stats(self):
+        if self.ring is None:
+            return None
+        write_count, heartbeat_ns, samples, long_gaps, max_gap_ns, short_pulses = self.ring.read_header()
+        return {
+            "samples": samples,
+            "edges": write_count,
+            "max_gap_ms": round(max_gap_ns / 1e6, 3),
+            "long_gaps": long_gaps,
+            "short_pulses": short_pulses,
+            "lost": self.ring.lost,
+            "heartbeat_age_ms": round((time.monotonic_ns() - heartbeat_ns) / 1e6, 3) if heartbeat_ns else None,
+        }
+
+    def stop(self):
+        if self.stop_event is not None:
+            self.stop_event.set()
+        if self.process is not None:
+            self.process.join(timeout=1)
+            if self.process.is_alive():
+                self.process.terminate()
+            self.process = None
+        if self.ring is not None:
+            self.ring.close()
+            self.ring.unlink()
+            self.ring = None
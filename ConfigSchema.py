@@ -0,0 +1,132 @@
+import os
+import json
+import copy
+import threading
+
+class Field:
+    __slots__ = ("type", "default", "check", "choices")
+
+    def __init__(self, type, default, check=None, choices=None):
+        self.type = type
+        self.default = default
+        self.check = check
+        self.choices = choices
+
+    def coerce(self, name, value):
+        if self.type is float and isinstance(value, int) and not isinstance(value, bool):
+            value = float(value)
+        elif self.type is int and isinstance(value, float) and value.is_integer():
+            value = int(value)
+        if not isinstance(value, self.type) or (self.type is int and isinstance(value, bool)):
+            raise ValueError(f"{name} must be {self.type.__name__}, got {type(value).__name__}")
+        if self.choices is not None and value not in self.choices:
+            raise ValueError(f"{name} must be one of {', '.join(map(str, self.choices))}")
+        if self.check is not None and not self.check(value):
+            raise ValueError(f"{name} has an invalid value: {value!r}")
+        return value
+
+def positive(value):
+    return value > 0
+
+def non_negative(value):
+    return value >= 0
+
+def percent(value):
+    return 0 <= value <= 100
+
+class ConfigBase:
+    FILE_NAME = None
+    FIELDS = {}
+    __slots__ = ("_path", "_extra", "_listeners", "_lock")
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def instance(cls):
+        with cls._instances_lock:
+            config = cls._instances.get(cls)
+            if config is None:
+                config = cls()
+                cls._instances[cls] = config
+            return config
+
+    def __init__(self, path=None):
+        object.__setattr__(self, "_path", path or os.path.join(os.getcwd(), self.FILE_NAME))
+        object.__setattr__(self, "_extra", {})
+        object.__setattr__(self, "_listeners", [])
+        object.__setattr__(self, "_lock", threading.RLock())
+        for name, field in self.FIELDS.items():
+            object.__setattr__(self, name, copy.deepcopy(field.default))
+        self.load()
+
+    def get_config_path(self):
+        return self._path
+
+    def load(self):
+        if not os.path.exists(self._path):
+            return
+        try:
+            with open(self._path, 'r') as f:
+                loaded_config = json.load(f)
+        except Exception as e:
+            print(f"Error loading config: {e}")
+            return
+
+        for key, value in loaded_config.items():
+            field = self.FIELDS.get(key)
+            if field is None:
+                self._extra[key] = value
+                continue
+            try:
+                object.__setattr__(self, key, field.coerce(key, value))
+            except ValueError as e:
+                print(f"Ignoring invalid setting: {e}")
+
+    def save_config(self):
+        with self._lock:
+            try:
+                with open(self._path, 'w') as f:
+                    json.dump(self.to_dict(), f, indent=2)
+                return True
+            except Exception as e:
+                print(f"Error saving config: {e}")
+                return False
+
+    def to_dict(self):
+        data = dict(self._extra)
+        for name in self.FIELDS:
+            data[name] = getattr(self, name)
+        return data
+
+    def __setattr__(self, name, value):
+        field = self.FIELDS.get(name)
+        if field is None:
+            raise AttributeError(f"Unknown setting: {name}")
+        value = field.coerce(name, value)
+        old_value = getattr(self, name)
+        object.__setattr__(self, name, value)
+        if old_value != value:
+            self.notify(name, old_value, value)
+
+    def set(self, name, value, save=True):
+        setattr(self, name, value)
+        if save:
+            self.save_config()
+
+    def changed(self, name, save=True):
+        value = getattr(self, name)
+        self.notify(name, value, value)
+        if save:
+            self.save_config()
+
+    def subscribe(self, callback, names=None):
+        self._listeners.append((callback, frozenset(names) if names else None))
+
+    def notify(self, name, old_value, new_value):
+        for callback, names in list(self._listeners):
+            if names is None or name in names:
+                try:
+                    callback(name, old_value, new_value)
+                except Exception as e:
+                    print(f"Error in config listener for {name}: {e}")
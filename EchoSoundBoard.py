@@ -1,14 +1,43 @@
+import time
+STARTUP_TIME = time.perf_counter()
+
 import os
-import pygame
+import json
+import wave
 import tkinter as tk
 from tkinter import filedialog, ttk, Listbox, Scrollbar
 import threading
-import time
-import pymem
-import pymem.process
-import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from enum import Enum
+from LibraryWatcher import LibraryWatcher
+from LibraryManager import LibraryManager
+from LibraryScanner import LibraryScan, library_order
+from GestureGrammar import GestureGrammar, describe_action
+from Profiler import profiler, StartupTimer
+from EdgeSampler import EdgeSampler
+from ThreadTuning import PRIORITIES, ThreadTuning
+from ButtonPoller import ButtonPoller, DISCONNECTED
+from MemoryReader import MEMORY_BACKENDS, open_process_memory, ButtonReader
+from FlightRecorder import recorder, PLAY, STOP, PAUSE, RESUME, TRACK_END
+from ConfigSchema import ConfigBase, Field, positive, non_negative, percent
+from PcmCache import PcmCache
+from Effects import DEFAULT_PRESETS, EffectChain, load_presets
+from PlayStats import PlayStats
+from AnalysisCache import AnalysisCache
+from AudioAnalysis import AnalysisJob, cached_duration, init_pcm_worker, decode_raw, unpack_trim, unpack_integrity, unpack_peaks
+from TrackTable import TrackTable
+from PlayerActor import PlayerActor, LibraryView, library_view
+
+pygame = None
+
+def load_pygame():
+    global pygame
+    if pygame is None:
+        import pygame as pygame_module
+        pygame = pygame_module
+    return pygame
 
 class SoundAction(Enum):
     PLAY_CURRENT = "play_current"
@@ -16,6 +45,7 @@ class SoundAction(Enum):
     PREV_SONG = "prev_song"
     TOGGLE_PAUSE = "toggle_pause"
     RESTART_SONG = "restart_song"
+    NEXT_LIBRARY = "next_library"
 
 @dataclass
 class SoundItem:
@@ -26,116 +56,159 @@ class SoundItem:
         if not self.name:
             self.name = os.path.splitext(os.path.basename(self.path))[0]
 
-class ConfigManager:
-    
-    def __init__(self):
-        self.config_file = "settings.json"
-        self.config = self.load_config()
-    
-    def get_config_path(self):
-        return os.path.join(os.getcwd(), self.config_file)
-    
-    def load_config(self):
-        default_config = {
-            "last_folder": "",
-            "volume": 70,
-            "loop": False,
-            "current_index": 0
-        }
-        
-        config_path = self.get_config_path()
-        if os.path.exists(config_path):
-            try:
-                with open(config_path, 'r') as f:
-                    loaded_config = json.load(f)
-                    for key in default_config:
-                        if key not in loaded_config:
-                            loaded_config[key] = default_config[key]
-                    return loaded_config
-            except Exception as e:
-                print(f"Error loading config: {e}")
-                return default_config
-        return default_config
+class ConfigManager(ConfigBase):
+    FILE_NAME = "settings.json"
+    FIELDS = {
+        "last_folder": Field(str, ""),
+        "volume": Field(int, 70, percent),
+        "loop": Field(bool, False),
+        "current_index": Field(int, 0, non_negative),
+        "libraries": Field(dict, {}),
+        "active_library": Field(str, ""),
+        "library_positions": Field(dict, {}),
+        "gestures": Field(list, [
+            {"pattern": "C C C", "action": "prev_song", "window": 0.8},
+            {"pattern": "C C C C", "action": "next_song", "window": 1.0},
+            {"pattern": "C C C C C", "action": "next_library", "window": 1.2},
+            {"pattern": "H", "action": "toggle_pause"}
+        ]),
+        "hold_threshold": Field(float, 2.0, positive),
+        "click_timeout": Field(float, 0.5, positive),
+        "click_max": Field(float, 0.5, positive),
+        "adaptive_timeout": Field(bool, False),
+        "min_click_timeout": Field(float, 0.25, positive),
+        "profiling": Field(bool, False),
+        "poll_interval": Field(float, 0.02, positive),
+        "burst_after_edge": Field(bool, True),
+        "burst_interval": Field(float, 0.002, positive),
+        "burst_duration": Field(float, 0.3, non_negative),
+        "poller_process": Field(bool, True),
+        "pointer_chains": Field(list, []),
+        "guard_interval": Field(float, 0.5, positive),
+        "memory_backend": Field(str, "auto", choices=MEMORY_BACKENDS),
+        "detector_priority": Field(str, "normal", choices=PRIORITIES),
+        "detector_cpus": Field(list, []),
+        "timer_resolution_ms": Field(int, 0, non_negative),
+        "pcm_cache": Field(bool, True),
+        "pcm_cache_dir": Field(str, "pcm_cache"),
+        "pcm_cache_max_mb": Field(int, 256, positive),
+        "pcm_cache_prefetch": Field(bool, False),
+        "pcm_cache_hot_tracks": Field(int, 20, non_negative),
+        "play_stats": Field(bool, True),
+        "sort_mode": Field(str, "library", choices=("library", "most_played", "recent")),
+        "trim_silence": Field(bool, True),
+        "find_duplicates": Field(bool, True),
+        "check_integrity": Field(bool, True),
+        "waveforms": Field(bool, True),
+        "effect_presets": Field(dict, DEFAULT_PRESETS),
+        "active_effect": Field(str, ""),
+        "track_effects": Field(dict, {}),
+        "effect_cache_max_mb": Field(int, 128, positive),
+        "collapse_duplicates": Field(bool, False),
+        "library_roots": Field(list, []),
+        "recursive_scan": Field(bool, True),
+        "scan_workers": Field(int, 8, positive)
+    }
+    __slots__ = tuple(FIELDS)
     
-    def save_config(self):
-        try:
-            config_path = self.get_config_path()
-            with open(config_path, 'w') as f:
-                json.dump(self.config, f, indent=2)
-            return True
-        except Exception as e:
-            print(f"Error saving config: {e}")
-            return False
+    GESTURE_FIELDS = ("gestures", "hold_threshold", "click_timeout", "click_max",
+                      "adaptive_timeout", "min_click_timeout")
     
-    def set_last_folder(self, folder_path):
-        self.config["last_folder"] = folder_path
+    # The dicts are changed in place, so the edits hold the lock save_config dumps them under
+    def set_current_index(self, index):
+        self.current_index = index
+        with self._lock:
+            if self.active_library:
+                self.library_positions[self.active_library] = index
         self.save_config()
     
-    def get_last_folder(self):
-        return self.config.get("last_folder", "")
-    
-    def set_volume(self, volume):
-        self.config["volume"] = volume
-        self.save_config()
+    def set_library(self, name, spec):
+        with self._lock:
+            self.libraries[name] = spec
+        self.changed("libraries")
     
-    def get_volume(self):
-        return self.config.get("volume", 70)
+    def remove_library(self, name):
+        with self._lock:
+            self.libraries.pop(name, None)
+            self.library_positions.pop(name, None)
+        if self.active_library == name:
+            self.active_library = ""
+        self.changed("libraries")
     
-    def set_loop(self, loop_enabled):
-        self.config["loop"] = loop_enabled
+    def set_library_position(self, name, index):
+        with self._lock:
+            self.library_positions[name] = index
         self.save_config()
     
-    def get_loop(self):
-        return self.config.get("loop", False)
+    def get_library_position(self, name):
+        return self.library_positions.get(name, 0)
     
-    def set_current_index(self, index):
-        self.config["current_index"] = index
-        self.save_config()
+    def get_edge_sampler(self):
+        return EdgeSampler(
+            poll_interval=self.poll_interval,
+            burst_after_edge=self.burst_after_edge,
+            burst_interval=self.burst_interval,
+            burst_duration=self.burst_duration
+        )
     
-    def get_current_index(self):
-        return self.config.get("current_index", 0)
+    def get_thread_tuning(self):
+        try:
+            return ThreadTuning.from_config(self)
+        except ValueError as e:
+            print(f"Ignoring detector tuning: {e}")
+            return ThreadTuning()
+    
+    def get_gesture_grammar(self):
+        return GestureGrammar(
+            self.gestures,
+            hold_threshold=self.hold_threshold,
+            click_timeout=self.click_timeout,
+            click_max=self.click_max,
+            adaptive_timeout=self.adaptive_timeout,
+            min_click_timeout=self.min_click_timeout
+        )
 
 class EchoVRButtonDetector:
     
-    BUTTON_ADDRESSES = [
-        0x20C7CA8,
-        0x20C7CA0, 0x20C7CB0, 0x20C7C98, 0x20C7CB8,
-        0x207CA8, 0x20C7D00, 0x20C8000
-    ]
-    
-    def __init__(self):
-        self.pm = None
+    def __init__(self, gesture_grammar, edge_sampler, use_poller=False, pointer_chains=(), guard_interval=0.5,
+                 memory_backend="auto", tuning=None):
+        self.memory = None
+        self.reader = None
         self.echo_connected = False
         self.button_address = None
         self.base_address = None
+        self.pointer_chains = pointer_chains
+        self.guard_interval = guard_interval
+        self.memory_backend = memory_backend
+        self.tuning = tuning or ThreadTuning()
         
         self.last_state = 0
-        self.press_start_time = 0
-        self.last_click_time = 0
-        self.hold_detected = False
-        
-        self.hold_threshold = 2.0
-        self.click_timeout = 0.8
-        
-        self.click_history = []
-        self.action_pending = False
-        self.action_timer = None
+        self.set_gesture_grammar(gesture_grammar)
+        self.sampler = edge_sampler
+        self.use_poller = use_poller
+        self.poller = None
+    
+    def set_gesture_grammar(self, gesture_grammar):
+        self.gesture_grammar = gesture_grammar
+        self.gesture_matcher = gesture_grammar.matcher()
     
     def connect_to_echo(self):
         try:
-            self.pm = pymem.Pymem("echovr.exe")
-            echo_module = pymem.process.module_from_name(
-                self.pm.process_handle, "echovr.exe"
-            )
-            self.base_address = echo_module.lpBaseOfDll
+            self.memory = open_process_memory(backend=self.memory_backend)
+            self.base_address = self.memory.base_address
+            self.reader = ButtonReader(self.memory, self.pointer_chains, self.guard_interval)
             
-            self.button_address = self.scan_for_button_address()
+            self.button_address = self.reader.locate()
             
             if self.button_address:
-                test_value = self.pm.read_uchar(self.button_address)
+                test_value = self.reader.read()
                 self.echo_connected = test_value in [0, 1]
                 if self.echo_connected:
                     print(f"Connected to EchoVR. Button address: {hex(self.button_address)}")
+                    self.sampler.resume()
+                    recorder.connection(True, hex(self.button_address))
+                    if self.use_poller:
+                        self.start_poller()
                 return self.echo_connected
             
             return False
@@ -145,189 +218,623 @@ class EchoVRButtonDetector:
             self.echo_connected = False
             return False
     
-    def scan_for_button_address(self):
-        if not self.pm or not self.base_address:
+    def start_poller(self):
+        self.stop_poller()
+        poller = ButtonPoller(self.sampler, self.pointer_chains, self.guard_interval,
+                              memory_backend=self.memory_backend, tuning=self.tuning)
+        if poller.start():
+            self.poller = poller
+            print("Sampling the button in a separate process")
+        else:
+            print("Falling back to in-process sampling")
+    
+    def stop_poller(self):
+        if self.poller is not None:
+            self.poller.stop()
+            self.poller = None
+    
+    def sampler_stats(self):
+        if self.poller is not None:
+            return self.poller.stats()
+        return self.sampler.stats()
+    
+    def read_poller_edges(self):
+        events = self.poller.read_events()
+        if events is None or any(state == DISCONNECTED for _, state in events):
+            print("Button poller lost EchoVR")
+            recorder.connection(False, "poller")
+            self.stop_poller()
+            self.echo_connected = False
             return None
-        
-        for offset in self.BUTTON_ADDRESSES:
-            try:
-                addr = self.base_address + offset
-                value = self.pm.read_uchar(addr)
-                if value in [0, 1]:
-                    return addr
-            except:
-                continue
-        
-        try:
-            for offset in range(-0x100, 0x100, 4):
-                try:
-                    addr = self.base_address + 0x20C7CA8 + offset
-                    value = self.pm.read_uchar(addr)
-                    if value in [0, 1]:
-                        print(f"Found button at offset {hex(offset)}")
-                        return addr
-                except:
-                    continue
-        except:
-            pass
-        
-        return None
+        edges = []
+        for edge_ns, state in events:
+            if state != self.last_state:
+                recorder.edge(state == 1, edge_ns)
+                edges.append((edge_ns / 1e9, state == 1))
+                self.last_state = state
+        return edges
     
     def read_button_state(self):
-        if not self.echo_connected or self.button_address is None:
+        if not self.echo_connected or self.reader is None:
             return -1
-        try:
-            button_state = self.pm.read_uchar(self.button_address)
+        if profiler.enabled:
+            read_start = time.perf_counter()
+            button_state = self.reader.read()
+            profiler.record("detector.read_uchar", time.perf_counter() - read_start)
             return button_state
-        except:
-            return -1
+        return self.reader.read()
     
-    def process_clicks(self, mp3_player):
-        if not self.click_history:
+    def perform_action(self, rule, mp3_player):
+        try:
+            action = SoundAction(rule.action)
+        except ValueError:
+            print(f"Unknown gesture action: {rule.action}")
             return
         
-        current_time = time.time()
-        
-        if len(self.click_history) >= 3:
-            first_click_time = self.click_history[0]
-            last_click_time = self.click_history[-1]
-            total_time = last_click_time - first_click_time
-            
-            click_count = len(self.click_history)
-            
-            if click_count == 3 and total_time < 0.8:
-                print("3 clicks detected - previous song")
-                if mp3_player.playing:
-                    mp3_player.previous_song()
-                else:
-                    mp3_player.previous_song()
-                    mp3_player.play()
-                self.click_history = []
-            
-            elif click_count == 4 and total_time < 1.0:
-                print("4 clicks detected - next song")
-                if mp3_player.playing:
-                    mp3_player.next_song()
-                else:
-                    mp3_player.next_song()
-                    mp3_player.play()
-                self.click_history = []
-            
-            elif click_count > 4:
-                self.click_history = []
+        print(f"{describe_action(rule.action)} gesture detected")
+        recorder.gesture(rule.action, " ".join(rule.pattern))
+        if action == SoundAction.PREV_SONG:
+            mp3_player.previous_song()
+        elif action == SoundAction.NEXT_SONG:
+            mp3_player.next_song()
+        elif action == SoundAction.TOGGLE_PAUSE:
+            mp3_player.toggle_play()
+        elif action == SoundAction.PLAY_CURRENT:
+            mp3_player.play()
+        elif action == SoundAction.RESTART_SONG:
+            mp3_player.restart()
+        elif action == SoundAction.NEXT_LIBRARY:
+            if mp3_player.gui:
+                mp3_player.post(mp3_player.gui.cycle_library)
     
     def check_button_actions(self, mp3_player):
-        current_state = self.read_button_state()
-        if current_state < 0:
-            return
-        
-        current_time = time.time()
-        
-        if current_state == 1 and self.last_state == 0:
-            self.press_start_time = current_time
-            self.last_click_time = current_time
-            self.hold_detected = False
+        if self.poller is not None:
+            edges = self.read_poller_edges()
+            if edges is None:
+                return
+            current_time = time.monotonic_ns() / 1e9
+        else:
+            current_state = self.read_button_state()
+            if current_state < 0:
+                return
+            now_ns = time.monotonic_ns()
+            self.sampler.sample(current_state, now_ns)
+            current_time = now_ns / 1e9
+            edges = []
+            if current_state != self.last_state:
+                recorder.edge(current_state == 1, now_ns)
+                edges.append((current_time, current_state == 1))
+            self.last_state = current_state
         
-        elif current_state == 1 and self.last_state == 1:
-            hold_duration = current_time - self.press_start_time
-            
-            if hold_duration >= self.hold_threshold and not self.hold_detected:
-                print("Long hold detected - toggle pause")
-                mp3_player.toggle_play()
-                self.hold_detected = True
-                self.click_history = []
-                if self.action_timer:
-                    self.action_timer.cancel()
-                    self.action_timer = None
-        
-        elif current_state == 0 and self.last_state == 1:
-            press_duration = current_time - self.press_start_time
-            
-            if press_duration < 0.5 and not self.hold_detected:
-                current_time = time.time()
-                
-                if self.click_history:
-                    time_since_last = current_time - self.click_history[-1]
-                    if time_since_last > 1.0:
-                        self.click_history = []
-                
-                self.click_history.append(current_time)
-                
-                if len(self.click_history) > 4:
-                    self.click_history = self.click_history[-4:]
-                
-                if self.action_timer:
-                    self.action_timer.cancel()
-                
-                self.action_timer = threading.Timer(0.5, lambda: self.process_clicks(mp3_player))
-                self.action_timer.daemon = True
-                self.action_timer.start()
-        
-        self.last_state = current_state
+        for rule in self.gesture_matcher.feed(edges, current_time):
+            self.perform_action(rule, mp3_player)
+
+class TrackLoadError(Exception):
+    pass
 
 class MP3Player:
     def __init__(self, gui=None):
-        pygame.mixer.init()
-        self.playlist = []
-        self.song_names = []
+        self.mixer_ready = False
+        self.mixer_lock = threading.Lock()
+        self.playlist = TrackTable()
         self.current_index = 0
         self.playing = False
         self.paused = False
         self.loop = False
         self.volume = 0.7
         self.current_song = None
-        self.echo_detector = EchoVRButtonDetector()
+        self.channel = None
+        self.sound = None
+        self.preview_channel = None
+        self.music_start = 0.0
+        self.music_end = None
+        self.trims = {}
+        self.bad_tracks = {}
+        self.pcm_cache = None
+        self.effect_cache = None
+        self.decoder = None
+        self.folder_path = None
+        self.library_name = None
         self.gui = gui
-        self.config = ConfigManager()
+        self.config = ConfigManager.instance()
+        self.echo_detector = EchoVRButtonDetector(self.config.get_gesture_grammar(),
+                                                  self.config.get_edge_sampler(),
+                                                  use_poller=self.config.poller_process,
+                                                  pointer_chains=self.config.pointer_chains,
+                                                  guard_interval=self.config.guard_interval,
+                                                  memory_backend=self.config.memory_backend,
+                                                  tuning=self.config.get_thread_tuning())
+        self.libraries = LibraryManager(self.config)
+        self.scan = None
+        self.duplicates = set()
+        self.analysis_cache = AnalysisCache()
+        self.play_stats = PlayStats() if self.config.play_stats else None
+        self.effect_chains = load_presets(self.config.effect_presets)
+        self.config.subscribe(self.on_gesture_config_changed, ConfigManager.GESTURE_FIELDS)
+        self.config.subscribe(self.on_effect_config_changed, ("effect_presets",))
+        
+    @property
+    def song_names(self):
+        return self.playlist.names
+    
+    def on_gesture_config_changed(self, name, old_value, new_value):
+        self.echo_detector.set_gesture_grammar(self.config.get_gesture_grammar())
+    
+    def on_effect_config_changed(self, name, old_value, new_value):
+        self.effect_chains = load_presets(self.config.effect_presets)
+    
+    def init_mixer(self):
+        with self.mixer_lock:
+            if not self.mixer_ready:
+                load_pygame().mixer.init()
+                self.mixer_ready = True
+                if self.config.pcm_cache:
+                    self.pcm_cache = PcmCache(
+                        self.config.pcm_cache_dir,
+                        max_bytes=self.config.pcm_cache_max_mb * 1024 * 1024,
+                        decoder=self.decode_pcm,
+                        mixer_format=pygame.mixer.get_init(),
+                        duration_hint=self.track_duration
+                    )
+                    # Rendered variants get their own directory so they have their own LRU budget
+                    self.effect_cache = PcmCache(
+                        os.path.join(self.config.pcm_cache_dir, "effects"),
+                        max_bytes=self.config.effect_cache_max_mb * 1024 * 1024,
+                        decoder=self.render_effect,
+                        mixer_format=pygame.mixer.get_init()
+                    )
+                self.prefetch()
+    
+    def decode_pcm(self, path):
+        # Called from the PCM cache's worker; the decode itself runs in a helper process
+        with self.mixer_lock:
+            if self.decoder is None:
+                self.decoder = ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn"),
+                                                   initializer=init_pcm_worker,
+                                                   initargs=self.pcm_cache.mixer_format)
+            decoder = self.decoder
+        return decoder.submit(decode_raw, path).result()
+    
+    def track_duration(self, path):
+        duration = cached_duration(self.analysis_cache, path)
+        if duration is None and path.lower().endswith(".wav"):
+            try:
+                with wave.open(path) as header:
+                    duration = header.getnframes() / header.getframerate()
+            except (OSError, EOFError, wave.Error):
+                pass
+        return duration
+    
+    def effect_for(self, path):
+        name = self.config.track_effects.get(os.path.basename(path), self.config.active_effect)
+        chain = self.effect_chains.get(name)
+        return chain if chain else None
+    
+    def effect_variant(self, chain, trim):
+        return json.dumps({"chain": chain.key(), "trim": trim}, separators=(",", ":"))
+    
+    def render_effect(self, path, variant):
+        # Runs on the effect cache's worker, so it never touches pygame: the plain PCM comes from the
+        # PCM cache, trimmed the same way playback would be
+        spec = json.loads(variant)
+        buffer = self.pcm_cache.wait(path)
+        if buffer is None:
+            return None
+        pcm = buffer[:]
+        buffer.close()
+        frequency, size, channels = self.effect_cache.mixer_format
+        trim = spec["trim"]
+        if trim is not None:
+            frame_bytes = abs(size) // 8 * channels
+            pcm = pcm[int(trim[0] * frequency) * frame_bytes:int(trim[1] * frequency) * frame_bytes]
+        return EffectChain(json.loads(spec["chain"])).render(pcm, frequency, size, channels)
+    
+    def play_effect(self, path, chain, trim=None):
+        if self.effect_cache is None:
+            return False
+        variant = self.effect_variant(chain, trim)
+        buffer = self.effect_cache.open(path, variant)
+        if buffer is None:
+            # Plays dry this time; the render is ready for the next trigger
+            print(f"Rendering effect for {os.path.basename(path)}")
+            self.effect_cache.request(path, variant)
+            return False
+        return self.play_buffer(buffer)
+    
+    def prefetch(self):
+        self.prefetch_effects()
+        if self.pcm_cache is None:
+            return
+        if self.config.pcm_cache_prefetch:
+            self.pcm_cache.request_many(list(self.playlist))
+        elif self.play_stats is not None and self.config.pcm_cache_hot_tracks:
+            self.pcm_cache.request_many(
+                self.play_stats.hot_paths(self.playlist, self.config.pcm_cache_hot_tracks)
+            )
+    
+    def set_active_effect(self, name):
+        self.config.set("active_effect", name if name in self.effect_chains else "")
+        self.prefetch_effects()
+    
+    def prefetch_effects(self):
+        chain = self.effect_chains.get(self.config.active_effect)
+        if self.effect_cache is None or not chain:
+            return
+        paths = []
+        if 0 <= self.current_index < len(self.playlist):
+            paths.append(self.playlist[self.current_index])
+        if self.play_stats is not None and self.config.pcm_cache_hot_tracks:
+            paths += self.play_stats.hot_paths(self.playlist, self.config.pcm_cache_hot_tracks)
+        for path in paths:
+            trim = self.trims.get(path) if self.config.trim_silence else None
+            self.effect_cache.request(path, self.effect_variant(chain, trim))
+    
+    def apply_trims(self, trims):
+        for path, data in trims.items():
+            if data is None:
+                self.trims.pop(path, None)
+            else:
+                self.trims[path] = unpack_trim(data)
+    
+    def apply_integrity(self, verdicts):
+        # Returns only what changed: path -> reason, or None for a track that plays again
+        changed = {}
+        for path, data in verdicts.items():
+            playable, reason = unpack_integrity(data)
+            if playable:
+                if self.bad_tracks.pop(path, None) is not None:
+                    changed[path] = None
+            elif path not in self.bad_tracks:
+                self.bad_tracks[path] = reason
+                changed[path] = reason
+        return changed
+    
+    def step_index(self, step):
+        # Walks past tracks known to be unplayable; None when nothing playable is left
+        count = len(self.playlist)
+        index = self.current_index
+        for _ in range(count):
+            index = (index + step) % count
+            if not self.bad_tracks or self.playlist[index] not in self.bad_tracks:
+                return index
+        return None
+    
+    def play_cached(self, path, trim=None):
+        if self.pcm_cache is None:
+            return False
+        buffer = self.pcm_cache.open(path)
+        if buffer is None:
+            self.pcm_cache.request(path)
+            return False
+        return self.play_buffer(buffer, trim)
+    
+    def play_buffer(self, buffer, trim=None):
+        view = memoryview(buffer)
+        if trim is not None:
+            frequency, size, channels = pygame.mixer.get_init()
+            frame_bytes = abs(size) // 8 * channels
+            view = view[int(trim[0] * frequency) * frame_bytes:int(trim[1] * frequency) * frame_bytes]
+        try:
+            # pygame copies the mapped pages straight into its own chunk, so the
+            # decoded audio never passes through a Python bytes object.
+            sound = pygame.mixer.Sound(buffer=view)
+        finally:
+            view.release()
+            buffer.close()
+        channel = sound.play()
+        if channel is None:
+            return False
+        channel.set_volume(self.volume)
+        self.sound = sound
+        self.channel = channel
+        return True
+    
+    def play_music(self, path, trim=None):
+        try:
+            pygame.mixer.music.load(path)
+        except pygame.error as e:
+            raise TrackLoadError(e) from e
+        pygame.mixer.music.set_volume(self.volume)
+        self.music_start = 0.0
+        self.music_end = None
+        if trim is not None:
+            try:
+                pygame.mixer.music.play(start=trim[0])
+                self.music_start, self.music_end = trim
+                return
+            except pygame.error:
+                pass
+        pygame.mixer.music.play()
+    
+    def preview(self, path, position, length=0.25):
+        # Scrubbing plays a slice of the cached PCM. Until the cache has the track it is queued for
+        # decoding and None is returned, so the actor never decodes a whole track here
+        self.init_mixer()
+        if self.pcm_cache is None:
+            return False
+        buffer = self.pcm_cache.open(path)
+        if buffer is None:
+            self.pcm_cache.request(path)
+            return None
+        frequency, size, channels = pygame.mixer.get_init()
+        frame_bytes = abs(size) // 8 * channels
+        start = max(0, int(position * frequency)) * frame_bytes
+        view = memoryview(buffer)[start:start + int(length * frequency) * frame_bytes]
+        try:
+            sound = pygame.mixer.Sound(buffer=view) if len(view) else None
+        finally:
+            view.release()
+            buffer.close()
+        if self.preview_channel is not None:
+            self.preview_channel.stop()
+            self.preview_channel = None
+        if sound is None:
+            return False
+        self.preview_channel = sound.play()
+        if self.preview_channel is None:
+            return False
+        self.preview_channel.set_volume(self.volume)
+        return True
+    
+    def is_busy(self):
+        if self.channel is not None:
+            return self.channel.get_busy()
+        if self.music_end is not None and \
+                pygame.mixer.music.get_pos() / 1000.0 + self.music_start >= self.music_end:
+            return False
+        return pygame.mixer.music.get_busy()
+    
+    def shutdown(self):
+        if self.scan is not None:
+            self.scan.cancel()
+        self.stop()
+        if self.play_stats is not None:
+            self.play_stats.close()
+        # The cache workers must be finished before the mixer they read the format of goes away
+        for cache in (self.effect_cache, self.pcm_cache):
+            if cache is not None:
+                cache.stop()
+        if self.decoder is not None:
+            self.decoder.shutdown(cancel_futures=True)
+            self.decoder = None
+        if self.mixer_ready:
+            pygame.mixer.quit()
+    
+    def load_folder(self, folder_path, on_scan=None):
+        if not os.path.exists(folder_path):
+            print(f"Folder doesn't exist: {folder_path}")
+            return False
+        name = self.libraries.add_folder(folder_path)
+        self.libraries.drop(name)
+        if self.switch_library(name, on_scan):
+            self.config.set("last_folder", folder_path)
+            return True
+        return False
+    
+    def add_root(self, folder_path, on_scan=None):
+        roots = list(self.config.library_roots)
+        if folder_path not in roots:
+            roots.append(folder_path)
+            self.config.set("library_roots", roots)
+        name = self.libraries.set_roots(roots)
+        self.libraries.drop(name)
+        return self.switch_library(name, on_scan)
+    
+    def import_playlist(self, playlist_path):
+        name = self.libraries.import_m3u(playlist_path)
+        return self.switch_library(name)
+    
+    def export_playlist(self, playlist_path):
+        return self.libraries.export_m3u(playlist_path, self.playlist)
+    
+    def switch_library(self, name, on_scan=None):
+        if on_scan is not None:
+            roots = self.libraries.scan_roots(name)
+            if roots:
+                self.start_scan(name, roots, on_scan)
+                return True
         
-    def load_folder(self, folder_path):
-        self.playlist = []
-        self.song_names = []
+        paths = self.libraries.load_tracks(name)
+        if not paths:
+            if paths is not None:
+                print(f"No supported audio files found in library {name}")
+            return False
+        self.open_library(name, paths)
+        self.finish_library()
+        return True
+    
+    def open_library(self, name, paths):
+        if self.scan is not None:
+            # A half-scanned library is never stashed; it is scanned again next time
+            self.scan.cancel()
+            self.scan = None
+        elif self.library_name is not None and self.library_name != name:
+            self.libraries.stash(self.library_name, self.playlist)
+        if self.library_name is not None and self.library_name != name:
+            self.config.set_library_position(self.library_name, self.current_index)
+        self.stop()
         
-        supported_formats = ['.mp3', '.wav', '.ogg', '.flac']
+        self.playlist = paths if isinstance(paths, TrackTable) else TrackTable(paths)
+        self.duplicates = set()
+        self.current_index = 0
+        self.library_name = name
+        spec = self.libraries.get(name)
+        self.folder_path = spec["path"] if spec.get("type") == "folder" else None
+        self.config.set("active_library", name)
+    
+    def start_scan(self, name, roots, on_scan):
+        # on_scan(scan, paths) is called from scanner threads; paths is None once the walk is done
+        self.open_library(name, TrackTable())
+        scan = LibraryScan(roots,
+                           on_batch=lambda paths: on_scan(scan, paths),
+                           on_done=lambda: on_scan(scan, None),
+                           recursive=self.config.recursive_scan,
+                           max_workers=self.config.scan_workers)
+        self.scan = scan
+        print(f"Scanning {len(roots)} folder(s) for library {name}")
+        scan.start()
+    
+    def add_scanned(self, scan, paths):
+        if scan is not self.scan:
+            return None
+        first = len(self.playlist)
+        self.playlist.extend(paths)
+        return first
+    
+    def finish_scan(self, scan):
+        if scan is not self.scan:
+            return None
+        self.scan = None
+        self.playlist.reorder(sorted(range(len(self.playlist)), key=lambda i: library_order(self.playlist[i])))
+        self.playlist.renumber()
+        if not self.playlist:
+            print(f"No supported audio files found in library {self.library_name}")
+            return False
+        self.finish_library()
+        return True
+    
+    def finish_library(self):
+        self.sort_playlist(self.config.sort_mode)
+        name = self.library_name
+        saved_index = self.config.get_library_position(name)
+        if 0 <= saved_index < len(self.playlist):
+            self.current_index = saved_index
+        else:
+            self.current_index = 0
+        self.config.set_current_index(self.current_index)
         
+        print(f"Loaded {len(self.playlist)} songs from library {name}")
+        self.prefetch()
+    
+    def add_track(self, file_name):
+        full_path = os.path.join(self.folder_path, file_name)
+        if full_path in self.playlist:
+            return None
+        return self.playlist.append(full_path)
+    
+    def remove_track(self, file_name):
+        full_path = os.path.join(self.folder_path, file_name)
         try:
-            if not os.path.exists(folder_path):
-                print(f"Folder doesn't exist: {folder_path}")
-                return False
-                
-            files_loaded = 0
-            for file in os.listdir(folder_path):
-                file_lower = file.lower()
-                if any(file_lower.endswith(fmt) for fmt in supported_formats):
-                    full_path = os.path.join(folder_path, file)
-                    self.playlist.append(full_path)
-                    name = os.path.splitext(file)[0]
-                    self.song_names.append(name)
-                    files_loaded += 1
-            
-            if files_loaded > 0:
-                self.config.set_last_folder(folder_path)
-                
-                saved_index = self.config.get_current_index()
-                if 0 <= saved_index < len(self.playlist):
-                    self.current_index = saved_index
-                else:
-                    self.current_index = 0
-                    self.config.set_current_index(0)
-                
-                print(f"Loaded {files_loaded} songs from {folder_path}")
-                return True
-            else:
-                print(f"No supported audio files found in {folder_path}")
-                return False
-                
-        except Exception as e:
-            print(f"Error loading folder {folder_path}: {e}")
+            index = self.playlist.index(full_path)
+        except ValueError:
+            return None
+        del self.playlist[index]
+        
+        if index < self.current_index:
+            self.current_index -= 1
+        elif index == self.current_index and self.current_index >= len(self.playlist):
+            self.current_index = max(0, len(self.playlist) - 1)
+        self.config.set_current_index(self.current_index)
+        return index
+    
+    def rescan_library(self, on_scan=None):
+        name = self.library_name
+        if name is None:
             return False
+        self.libraries.drop(name)
+        if not self.switch_library(name, on_scan):
+            # Nothing left on disk: show an empty library rather than the old tracks
+            self.open_library(name, TrackTable())
+            self.finish_library()
+        return True
+    
+    def apply_file_changes(self, changes):
+        # Returns (kind, index) for each change that touched the playlist, in order
+        applied = []
+        for change in changes:
+            kind = change[0]
+            if kind == "added":
+                index = self.add_track(change[1])
+            elif kind == "removed":
+                index = self.remove_track(change[1])
+            elif kind == "renamed":
+                index = self.rename_track(change[1], change[2])
+            else:
+                continue
+            if index is not None:
+                applied.append((kind, index))
+        return applied
     
-    def load_from_config(self):
-        last_folder = self.config.get_last_folder()
+    def rename_track(self, old_name, new_name):
+        old_path = os.path.join(self.folder_path, old_name)
+        try:
+            index = self.playlist.index(old_path)
+        except ValueError:
+            return None
+        new_path = os.path.join(self.folder_path, new_name)
+        self.playlist.replace(index, new_path)
+        if self.current_song == old_path:
+            self.current_song = new_path
+        return index
+    
+    def sort_playlist(self, mode):
+        if not self.playlist:
+            return
+        current_song = None
+        if 0 <= self.current_index < len(self.playlist):
+            current_song = self.playlist[self.current_index]
+        
+        order = sorted(range(len(self.playlist)), key=self.playlist.ranks.__getitem__)
+        if mode != "library" and self.play_stats is not None:
+            paths = list(self.playlist)
+            counts = self.play_stats.counts(paths)
+            field = 0 if mode == "most_played" else 1
+            order.sort(key=lambda i: counts.get(paths[i], (0, 0.0))[field], reverse=True)
+        
+        self.playlist.reorder(order)
+        if current_song is not None:
+            self.current_index = self.playlist.index(current_song)
+    
+    def collapse_duplicates(self, groups):
+        keepers = {}
+        for group in groups:
+            for path in group[1:]:
+                keepers[path] = group[0]
+        if not keepers:
+            return 0
+        current_song = None
+        if 0 <= self.current_index < len(self.playlist):
+            current_song = keepers.get(self.playlist[self.current_index], self.playlist[self.current_index])
+        
+        kept = [i for i, path in enumerate(self.playlist) if path not in keepers]
+        removed = len(self.playlist) - len(kept)
+        self.playlist.reorder(kept)
+        if current_song in self.playlist:
+            self.current_index = self.playlist.index(current_song)
+        else:
+            self.current_index = min(self.current_index, max(0, len(self.playlist) - 1))
+        self.config.set_current_index(self.current_index)
+        return removed
+    
+    def set_duplicates(self, groups):
+        self.duplicates = {path for group in groups for path in group[1:]}
+        return len(self.duplicates)
+    
+    def set_sort_mode(self, mode):
+        self.config.set("sort_mode", mode)
+        self.sort_playlist(mode)
+        self.config.set_current_index(self.current_index)
+    
+    def load_from_config(self, on_scan=None):
+        roots_library = self.libraries.set_roots(self.config.library_roots) if self.config.library_roots else None
+        active_library = self.config.active_library
+        if active_library and self.libraries.get(active_library):
+            print(f"Auto-loading songs from library: {active_library}")
+            return self.switch_library(active_library, on_scan)
+        
+        if roots_library:
+            print(f"Auto-loading songs from {len(self.config.library_roots)} library roots")
+            return self.switch_library(roots_library, on_scan)
+        
+        last_folder = self.config.last_folder
         if last_folder and os.path.exists(last_folder):
             print(f"Auto-loading songs from last folder: {last_folder}")
-            return self.load_folder(last_folder)
+            name = self.libraries.add_folder(last_folder)
+            self.config.set_library_position(name, self.config.current_index)
+            return self.switch_library(name, on_scan)
         return False
     
+    @profiler.profiled("player.play")
     def play(self, index=None):
         if not self.playlist:
             return False
@@ -340,47 +847,63 @@ class MP3Player:
             
         if 0 <= self.current_index < len(self.playlist):
             self.current_song = self.playlist[self.current_index]
+            # Only a file that can't be loaded is skipped from now on; anything else is the
+            # environment's fault and propagates without marking the track
+            self.init_mixer()
+            trim = self.trims.get(self.current_song) if self.config.trim_silence else None
+            chain = self.effect_for(self.current_song)
             try:
-                pygame.mixer.music.load(self.current_song)
-                pygame.mixer.music.set_volume(self.volume)
-                pygame.mixer.music.play()
-                self.playing = True
-                self.paused = False
-                
-                self.config.set_current_index(self.current_index)
-                
-                if self.gui:
-                    self.gui.update_song_list_selection(self.current_index)
-                    self.gui.update_current_song_display()
-                
-                print(f"Playing: {self.song_names[self.current_index]}")
-                return True
-            except Exception as e:
+                played = chain is not None and self.play_effect(self.current_song, chain, trim)
+                if not played and not self.play_cached(self.current_song, trim):
+                    self.play_music(self.current_song, trim)
+            except TrackLoadError as e:
                 print(f"Error playing {self.current_song}: {e}")
+                self.bad_tracks[self.current_song] = str(e)
                 return False
+            self.playing = True
+            self.paused = False
+            
+            self.config.set_current_index(self.current_index)
+            recorder.playback(PLAY, self.current_index, "cached" if self.channel is not None else "")
+            if self.play_stats is not None:
+                self.play_stats.record_play(self.current_song, self.library_name)
+            
+            print(f"Playing: {self.song_names[self.current_index]}")
+            return True
         return False
     
     def stop(self):
         if self.playing:
-            pygame.mixer.music.stop()
+            if self.channel is not None:
+                self.channel.stop()
+                self.channel = None
+                self.sound = None
+            else:
+                pygame.mixer.music.stop()
+            recorder.playback(STOP, self.current_index)
             self.playing = False
             self.paused = False
-            if self.gui:
-                self.gui.update_current_song_display()
     
     def pause(self):
         if self.playing and not self.paused:
-            pygame.mixer.music.pause()
+            if self.channel is not None:
+                self.channel.pause()
+            else:
+                pygame.mixer.music.pause()
+            recorder.playback(PAUSE, self.current_index)
             self.paused = True
-            if self.gui:
-                self.gui.update_current_song_display()
     
     def unpause(self):
         if self.playing and self.paused:
-            pygame.mixer.music.unpause()
+            if self.channel is not None:
+                self.channel.unpause()
+            else:
+                pygame.mixer.music.unpause()
+            recorder.playback(RESUME, self.current_index)
             self.paused = False
-            if self.gui:
-                self.gui.update_current_song_display()
+    
+    def restart(self):
+        return self.play(self.current_index)
     
     def toggle_play(self):
         if self.playing:
@@ -391,32 +914,49 @@ class MP3Player:
         else:
             self.play()
     
+    @profiler.profiled("player.next_song")
     def next_song(self):
         if not self.playlist:
             return
         self.stop()
-        self.current_index = (self.current_index + 1) % len(self.playlist)
+        index = self.step_index(1)
+        if index is None:
+            print("No playable tracks in this library")
+            return
+        self.current_index = index
         self.play()
     
+    @profiler.profiled("player.previous_song")
     def previous_song(self):
         if not self.playlist:
             return
         self.stop()
-        self.current_index = (self.current_index - 1) % len(self.playlist)
+        index = self.step_index(-1)
+        if index is None:
+            print("No playable tracks in this library")
+            return
+        self.current_index = index
         self.play()
     
     def set_volume(self, volume):
         self.volume = max(0.0, min(1.0, volume))
-        if self.playing:
+        if self.channel is not None:
+            self.channel.set_volume(self.volume)
+        elif self.playing:
             pygame.mixer.music.set_volume(self.volume)
     
     def toggle_loop(self):
-        self.loop = not self.loop
-        self.config.set_loop(self.loop)
+        return self.set_loop(not self.loop)
+    
+    def set_loop(self, loop):
+        self.loop = loop
+        self.config.set("loop", self.loop)
         return self.loop
     
+    @profiler.profiled("player.check_song_end")
     def check_song_end(self):
-        if self.playing and not pygame.mixer.music.get_busy() and not self.paused:
+        if self.playing and not self.is_busy() and not self.paused:
+            recorder.playback(TRACK_END, self.current_index)
             if self.loop:
                 self.play()
             else:
@@ -425,15 +965,40 @@ class MP3Player:
         return False
 
 class DarkRoundedGUI:
+    SORT_LABELS = {"library": "Library order", "most_played": "Most played", "recent": "Recent"}
+    NO_EFFECT = "No effect"
+    THUMBNAIL_WIDTH = 48
+    WAVEFORM_WIDTH = 400
+    WAVEFORM_HEIGHT = 34
+    SCRUB_INTERVAL = 0.04
+    EVENT_POLL_MS = 15
+    
     def __init__(self):
+        self.startup_timer = StartupTimer(STARTUP_TIME, expected=[
+            "first frame", "mixer ready", "library loaded", "echovr attach"
+        ])
+        self.startup_timer.mark("imports")
+        
         self.root = tk.Tk()
         self.root.title("EchoVR Soundboard")
         self.root.geometry("450x550")
         self.root.configure(bg='#1a1a1a')
-        
-        self.config = ConfigManager()
+        self.startup_timer.mark("tk root")
         
         self.player = MP3Player(gui=self)
+        self.actor = PlayerActor(self.player, on_state=self.apply_player_state)
+        self.library = LibraryView()
+        self.config = ConfigManager.instance()
+        self.library_watcher = None
+        self.analysis_job = None
+        self.thumbnails = {}
+        self.visible_rows_pending = False
+        self.stale_labels_from = None
+        self.waveform_path = None
+        self.waveform = None
+        self.waveform_view = (0.0, 0.0)
+        self.scrub_position = None
+        self.last_scrub = 0.0
         
         self.setup_styles()
         self.create_widgets()
@@ -441,14 +1006,27 @@ class DarkRoundedGUI:
         self.load_config_settings()
         
         self.center_window()
+        self.startup_timer.mark("window built")
         
-        self.connect_to_echovr()
+        self.actor.start()
+        self.drain_player_events()
         self.start_echo_monitoring()
-        self.check_song_end()
         
+        self.start_mixer_init()
         self.auto_load_songs()
         
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        self.root.bind("<F9>", self.toggle_profiling)
+        self.root.bind("<F10>", self.dump_flight_recording)
+        self.root.report_callback_exception = self.report_callback_exception
+        recorder.install_crash_hooks()
+        # Looked up on each sample: the matcher is replaced whenever the gesture config changes
+        detector = self.player.echo_detector
+        profiler.add_gauge("gesture.commit_latency_median",
+                           lambda: detector.gesture_matcher.median_commit_latency())
+        profiler.add_gauge("detector.sampler", self.player.echo_detector.sampler_stats)
+        if self.config.profiling:
+            profiler.enable()
         
     def setup_styles(self):
         self.style = ttk.Style()
@@ -536,6 +1114,24 @@ class DarkRoundedGUI:
                                     style='Status.TLabel')
         self.echo_status.place(x=225, y=60, anchor='center')
         
+        self.sort_var = tk.StringVar(value=self.SORT_LABELS[self.config.sort_mode])
+        self.sort_combo = ttk.Combobox(self.canvas,
+                                     textvariable=self.sort_var,
+                                     values=list(self.SORT_LABELS.values()),
+                                     state='readonly',
+                                     width=12)
+        self.sort_combo.place(x=425, y=60, anchor='e')
+        self.sort_combo.bind('<<ComboboxSelected>>', self.on_sort_select)
+        
+        self.effect_var = tk.StringVar(value=self.config.active_effect or self.NO_EFFECT)
+        self.effect_combo = ttk.Combobox(self.canvas,
+                                       textvariable=self.effect_var,
+                                       values=[self.NO_EFFECT] + list(self.player.effect_chains),
+                                       state='readonly',
+                                       width=12)
+        self.effect_combo.place(x=25, y=60, anchor='w')
+        self.effect_combo.bind('<<ComboboxSelected>>', self.on_effect_select)
+        
         self.current_song_label = ttk.Label(self.canvas,
                                           text="No music folder selected",
                                           style='Song.TLabel',
@@ -549,10 +1145,16 @@ class DarkRoundedGUI:
         self.folder_status.place(x=225, y=120, anchor='center')
         
         list_frame = tk.Frame(self.canvas, bg='#2d2d2d', bd=0)
-        list_frame.place(x=25, y=140, width=400, height=180)
+        list_frame.place(x=25, y=140, width=400, height=148)
         
-        list_scrollbar = Scrollbar(list_frame)
-        list_scrollbar.pack(side='right', fill='y')
+        self.list_scrollbar = Scrollbar(list_frame)
+        self.list_scrollbar.pack(side='right', fill='y')
+        
+        self.thumbnail_canvas = tk.Canvas(list_frame,
+                                        bg='#252525',
+                                        highlightthickness=0,
+                                        width=self.THUMBNAIL_WIDTH)
+        self.thumbnail_canvas.pack(side='left', fill='y', padx=(5, 0), pady=5)
         
         self.song_listbox = Listbox(
             list_frame,
@@ -563,40 +1165,52 @@ class DarkRoundedGUI:
             font=('Arial', 10),
             borderwidth=0,
             highlightthickness=0,
-            yscrollcommand=list_scrollbar.set,
+            yscrollcommand=self.on_list_scroll,
             cursor='hand2'
         )
         self.song_listbox.pack(side='left', fill='both', expand=True, padx=5, pady=5)
-        list_scrollbar.config(command=self.song_listbox.yview)
+        self.list_scrollbar.config(command=self.song_listbox.yview)
         self.song_listbox.bind('<<ListboxSelect>>', self.on_song_select)
         
+        self.waveform_canvas = tk.Canvas(self.canvas,
+                                       bg='#252525',
+                                       highlightthickness=0,
+                                       cursor='sb_h_double_arrow')
+        self.waveform_canvas.place(x=25, y=292, width=self.WAVEFORM_WIDTH, height=self.WAVEFORM_HEIGHT)
+        self.waveform_canvas.bind('<Button-1>', self.scrub)
+        self.waveform_canvas.bind('<B1-Motion>', self.scrub)
+        self.waveform_canvas.bind('<Double-Button-1>', self.reset_waveform_zoom)
+        self.waveform_canvas.bind('<MouseWheel>', self.zoom_waveform)
+        self.waveform_canvas.bind('<Button-4>', self.zoom_waveform)
+        self.waveform_canvas.bind('<Button-5>', self.zoom_waveform)
+        
         control_frame = tk.Frame(self.canvas, bg='#1a1a1a')
         control_frame.place(x=25, y=330, width=400, height=60)
         
         self.prev_btn = ttk.Button(control_frame,
                                  text="⏮",
-                                 command=self.player.previous_song,
+                                 command=self.actor.previous_song,
                                  style='Control.TButton',
                                  width=4)
         self.prev_btn.pack(side='left', padx=5)
         
         self.play_btn = ttk.Button(control_frame,
                                  text="▶",
-                                 command=self.player.toggle_play,
+                                 command=self.actor.toggle_play,
                                  style='Control.TButton',
                                  width=4)
         self.play_btn.pack(side='left', padx=5)
         
         self.next_btn = ttk.Button(control_frame,
                                  text="⏭",
-                                 command=self.player.next_song,
+                                 command=self.actor.next_song,
                                  style='Control.TButton',
                                  width=4)
         self.next_btn.pack(side='left', padx=5)
         
         self.stop_btn = ttk.Button(control_frame,
                                  text="⏹",
-                                 command=self.player.stop,
+                                 command=self.actor.stop_playback,
                                  style='Control.TButton',
                                  width=4)
         self.stop_btn.pack(side='left', padx=5)
@@ -636,13 +1250,37 @@ class DarkRoundedGUI:
                                     style='Song.TLabel')
         self.volume_label.pack(side='left', padx=10)
         
+        self.library_var = tk.StringVar(value="")
+        self.library_combo = ttk.Combobox(self.canvas,
+                                        textvariable=self.library_var,
+                                        state='readonly',
+                                        width=16)
+        self.library_combo.place(x=25, y=460, anchor='w')
+        self.library_combo.bind('<<ComboboxSelected>>', self.on_library_select)
+        
         self.folder_btn = ttk.Button(self.canvas,
-                                   text="📁 Select Music Folder",
+                                   text="📁 Add Folder",
                                    command=self.select_folder,
                                    style='Folder.TButton')
-        self.folder_btn.place(x=225, y=460, anchor='center')
+        self.folder_btn.place(x=200, y=460, anchor='w')
+        self.folder_btn.bind("<Shift-Button-1>", self.add_library_root)
+        
+        self.import_btn = ttk.Button(self.canvas,
+                                   text="⤓ M3U",
+                                   command=self.import_playlist,
+                                   style='Folder.TButton',
+                                   width=6)
+        self.import_btn.place(x=305, y=460, anchor='w')
+        
+        self.export_btn = ttk.Button(self.canvas,
+                                   text="⤒ M3U",
+                                   command=self.export_playlist,
+                                   style='Folder.TButton',
+                                   width=6)
+        self.export_btn.place(x=425, y=460, anchor='e')
         
-        info_text = "EchoVR Mute Button: • 3 Clicks = Previous Song • 4 Clicks = Next Song • Hold 2s = Pause/Play"
+        gestures = self.player.echo_detector.gesture_grammar.describe()
+        info_text = "EchoVR Mute Button: • " + " • ".join(gestures)
         self.info_label = ttk.Label(self.canvas,
                                   text=info_text,
                                   style='Status.TLabel',
@@ -682,34 +1320,128 @@ class DarkRoundedGUI:
         self.root.geometry(f'+{x}+{y}')
     
     def load_config_settings(self):
-        volume = self.config.get_volume()
+        volume = self.config.volume
         self.volume_var.set(volume)
-        self.player.set_volume(volume / 100.0)
+        self.actor.set_volume(volume / 100.0)
         self.volume_label.config(text=f"{volume}%")
         
-        loop_enabled = self.config.get_loop()
-        if loop_enabled:
-            self.player.loop = True
-            self.loop_btn.config(text="🔂")
-        else:
-            self.player.loop = False
-            self.loop_btn.config(text="🔁")
+        loop_enabled = self.config.loop
+        self.actor.set_loop(loop_enabled)
+        self.loop_btn.config(text="🔂" if loop_enabled else "🔁")
+    
+    def start_mixer_init(self):
+        def init():
+            try:
+                self.player.init_mixer()
+            except Exception as e:
+                print(f"Error initialising audio: {e}")
+            self.startup_timer.mark("mixer ready")
+        self.actor.submit(init)
+    
+    def drain_player_events(self):
+        # Everything other threads hand to Tk arrives through the actor's outbox
+        try:
+            self.actor.drain()
+        finally:
+            self.root.after(self.EVENT_POLL_MS, self.drain_player_events)
+    
+    def submit_library(self, command, *args, then=None):
+        # Library commands hand back a fresh copy of the library along with their result
+        def run():
+            return getattr(self.player, command)(*args), library_view(self.player)
+        
+        def done(outcome):
+            result, self.library = outcome
+            if then is not None:
+                then(result)
+        
+        run.__name__ = command
+        return self.actor.submit(run, then=done)
     
     def auto_load_songs(self):
-        if self.player.load_from_config():
+        self.submit_library("load_from_config", self.on_scan, then=self.finish_auto_load)
+    
+    def finish_auto_load(self, loaded):
+        if loaded:
+            self.on_library_loaded(f"Loaded from: {self.library.name}")
+            if not self.library.scanning:
+                self.current_song_label.config(
+                    text=f"Ready to play • {len(self.library.playlist)} songs loaded"
+                )
+        self.refresh_library_choices()
+        self.startup_timer.mark("library loaded")
+    
+    def on_library_loaded(self, status_text):
+        self.refresh_song_list()
+        self.refresh_library_choices()
+        self.folder_status.config(text=status_text)
+        self.update_song_list_selection(self.actor.state.current_index)
+        if self.library.scanning:
+            self.stop_library_watcher()
+            self.current_song_label.config(text="Scanning library…")
+            return
+        self.start_library_watcher()
+        self.start_library_analysis()
+    
+    def on_scan(self, scan, paths):
+        self.actor.post(self.apply_scan_results, scan, paths)
+    
+    @profiler.profiled("tk.apply_scan_results")
+    def apply_scan_results(self, scan, paths):
+        if paths is not None:
+            self.actor.submit("add_scanned", scan, paths, then=lambda first: self.add_scanned_rows(first, paths))
+        else:
+            self.submit_library("finish_scan", scan, then=self.finish_scan)
+    
+    def add_scanned_rows(self, first, paths):
+        # The Tk copy grows with the same batches, in the same order, as the player's
+        if first is None or first != len(self.library.playlist):
+            return
+        self.library.playlist.extend(paths)
+        self.song_listbox.insert(tk.END, *(self.song_list_label(i) for i in range(first, len(self.library.playlist))))
+        self.current_song_label.config(text=f"Scanning library • {len(self.library.playlist)} songs found")
+    
+    def finish_scan(self, finished):
+        if finished is None:
+            return
+        name = self.library.name
+        if finished:
+            self.on_library_loaded(self.folder_status.cget("text"))
+            self.update_current_song_display()
+            self.update_status_message(f"Loaded {len(self.library.playlist)} songs from {name}")
+        else:
             self.refresh_song_list()
-            last_folder = self.config.get_last_folder()
-            folder_name = os.path.basename(last_folder) if last_folder else "Unknown"
-            self.folder_status.config(text=f"Loaded from: {folder_name}")
-            self.current_song_label.config(
-                text=f"Ready to play • {len(self.player.playlist)} songs loaded"
-            )
-            saved_index = self.config.get_current_index()
-            if 0 <= saved_index < len(self.player.playlist):
-                self.update_song_list_selection(saved_index)
+            self.start_library_watcher()
+            self.update_status_message(f"No audio files found in {name}")
+    
+    def refresh_library_choices(self):
+        self.library_combo.config(values=list(self.library.library_names))
+        self.library_var.set(self.library.name or "")
+    
+    def on_library_select(self, event):
+        name = self.library_var.get()
+        if name and name != self.library.name:
+            self.switch_library(name)
+    
+    def cycle_library(self):
+        def switch(name):
+            if name and name != self.library.name:
+                self.switch_library(name)
+        self.actor.submit(self.player.libraries.next_name, self.library.name, then=switch)
+    
+    def switch_library(self, name):
+        def done(switched):
+            if switched:
+                self.on_library_loaded(f"Library: {name}")
+                if not self.library.scanning:
+                    self.update_status_message(f"Switched to {name} • {len(self.library.playlist)} songs")
+            else:
+                self.refresh_library_choices()
+                self.update_status_message(f"Could not load library {name}")
+        self.submit_library("switch_library", name, self.on_scan, then=done)
     
     def select_folder(self):
-        last_folder = self.config.get_last_folder()
+        last_folder = self.config.last_folder
         initial_dir = last_folder if os.path.exists(last_folder) else None
         
         folder_path = filedialog.askdirectory(
@@ -717,16 +1449,348 @@ class DarkRoundedGUI:
             initialdir=initial_dir
         )
         
-        if folder_path and self.player.load_folder(folder_path):
-            self.refresh_song_list()
-            folder_name = os.path.basename(folder_path)
-            self.folder_status.config(text=f"Folder: {folder_name}")
-            self.update_status_message(f"Loaded {len(self.player.playlist)} songs from {folder_name}")
+        if not folder_path:
+            return
+        folder_name = os.path.basename(folder_path)
+        
+        def done(loaded):
+            if loaded:
+                self.on_library_loaded(f"Folder: {folder_name}")
+                if not self.library.scanning:
+                    self.update_status_message(f"Loaded {len(self.library.playlist)} songs from {folder_name}")
+        self.submit_library("load_folder", folder_path, self.on_scan, then=done)
     
+    def add_library_root(self, event=None):
+        folder_path = filedialog.askdirectory(title="Add Library Root")
+        if folder_path:
+            self.submit_library("add_root", folder_path, self.on_scan,
+                                then=lambda loaded: loaded and self.on_library_loaded(f"Library: {self.library.name}"))
+        return "break"
+    
+    def import_playlist(self):
+        playlist_path = filedialog.askopenfilename(
+            title="Import M3U Playlist",
+            filetypes=[("M3U Playlist", "*.m3u *.m3u8"), ("All files", "*.*")]
+        )
+        
+        if not playlist_path:
+            return
+        
+        def done(imported):
+            if imported:
+                self.on_library_loaded(f"Playlist: {self.library.name}")
+                self.update_status_message(f"Imported {len(self.library.playlist)} songs")
+        self.submit_library("import_playlist", playlist_path, then=done)
+    
+    def export_playlist(self):
+        if not self.library.playlist:
+            return
+        playlist_path = filedialog.asksaveasfilename(
+            title="Export M3U Playlist",
+            defaultextension=".m3u8",
+            initialfile=f"{self.library.name or 'playlist'}.m3u8",
+            filetypes=[("M3U Playlist", "*.m3u *.m3u8")]
+        )
+        
+        if playlist_path:
+            count = len(self.library.playlist)
+            self.actor.submit("export_playlist", playlist_path,
+                              then=lambda exported: exported and self.update_status_message(f"Exported {count} songs"))
+    
+    def start_library_watcher(self):
+        self.stop_library_watcher()
+        if not self.library.folder_path:
+            return
+        # The watcher only follows the top level; tracks in subfolders are picked up by the next scan
+        folder = os.path.normcase(os.path.normpath(self.library.folder_path))
+        known_names = [os.path.basename(path) for path in self.library.playlist
+                       if os.path.normcase(os.path.dirname(path)) == folder]
+        self.library_watcher = LibraryWatcher(
+            self.library.folder_path,
+            known_names,
+            lambda changes: self.actor.post(self.apply_library_changes, changes)
+        )
+        self.library_watcher.start()
+    
+    def stop_library_watcher(self):
+        if self.library_watcher:
+            self.library_watcher.stop()
+            self.library_watcher = None
+    
+    def start_library_analysis(self):
+        if self.analysis_job is not None:
+            self.analysis_job.cancel()
+            self.analysis_job = None
+        kinds = []
+        if self.config.trim_silence:
+            kinds.append("trim")
+        if self.config.find_duplicates and len(self.library.playlist) > 1:
+            kinds.append("fingerprint")
+        if self.config.check_integrity:
+            kinds.append("integrity")
+        if self.config.waveforms:
+            kinds.append("peaks")
+        if not kinds or not self.library.playlist:
+            return
+        library_name = self.library.name
+        rank = dict(zip(self.library.playlist, self.library.playlist.ranks))
+        
+        def batch(results):
+            if "trim" in results:
+                self.actor.submit("apply_trims", results["trim"])
+            if "integrity" in results:
+                self.actor.submit("apply_integrity", results["integrity"],
+                                  then=lambda changed: self.mark_bad_tracks(library_name, changed))
+            if "peaks" in results:
+                thumbnails = {}
+                for path, data in results["peaks"].items():
+                    pyramid = unpack_peaks(data)
+                    if pyramid is not None:
+                        thumbnails[path] = pyramid.columns(0.0, pyramid.duration, self.THUMBNAIL_WIDTH // 2)
+                self.actor.post(self.apply_thumbnails, thumbnails)
+        
+        def duplicates(groups):
+            self.actor.post(self.apply_duplicates, library_name, groups)
+        
+        self.analysis_job = AnalysisJob(kinds, list(self.library.playlist), self.player.analysis_cache,
+                                        on_batch=batch, on_duplicates=duplicates, rank=rank).start()
+    
+    def mark_bad_tracks(self, library_name, changed):
+        if library_name != self.library.name or not changed:
+            return
+        bad_tracks = self.library.bad_tracks
+        for path, reason in changed.items():
+            if reason is None:
+                bad_tracks.pop(path, None)
+            else:
+                bad_tracks[path] = reason
+                print(f"Unplayable: {os.path.basename(path)} ({reason})")
+            try:
+                index = self.library.playlist.index(path)
+            except ValueError:
+                continue
+            self.song_listbox.delete(index)
+            self.song_listbox.insert(index, self.song_list_label(index))
+        self.update_song_list_selection(self.actor.state.current_index)
+        if bad_tracks:
+            self.update_status_message(f"{len(bad_tracks)} unplayable tracks (marked ✗) will be skipped")
+    
+    def apply_thumbnails(self, thumbnails):
+        self.thumbnails.update(thumbnails)
+        self.schedule_visible_rows()
+        if self.waveform is None and self.waveform_path in thumbnails:
+            self.show_waveform(self.waveform_path, reload=True)
+    
+    def on_list_scroll(self, first, last):
+        self.list_scrollbar.set(first, last)
+        self.schedule_visible_rows()
+    
+    def schedule_visible_rows(self):
+        if not self.visible_rows_pending:
+            self.visible_rows_pending = True
+            self.root.after_idle(self.draw_visible_rows)
+    
+    def draw_visible_rows(self):
+        # Only the visible rows are touched: stale numbers are fixed, thumbnails drawn beside them
+        self.visible_rows_pending = False
+        canvas = self.thumbnail_canvas
+        canvas.delete("all")
+        count = min(self.song_listbox.size(), len(self.library.playlist))
+        if count == 0:
+            return
+        first = max(0, self.song_listbox.nearest(0))
+        last = min(count - 1, self.song_listbox.nearest(self.song_listbox.winfo_height()))
+        if self.stale_labels_from is not None:
+            self.relabel_rows(max(first, self.stale_labels_from), last)
+        if not self.thumbnails:
+            return
+        for index in range(first, last + 1):
+            box = self.song_listbox.bbox(index)
+            thumbnail = self.thumbnails.get(self.library.playlist[index])
+            if box is not None and thumbnail is not None:
+                self.draw_waveform(canvas, thumbnail, 0, box[1] + 1, self.THUMBNAIL_WIDTH, box[3] - 2, '#4a90e2')
+    
+    def relabel_rows(self, first, last):
+        selection = self.song_listbox.curselection()
+        for index in range(first, last + 1):
+            label = self.song_list_label(index)
+            if self.song_listbox.get(index) != label:
+                self.song_listbox.delete(index)
+                self.song_listbox.insert(index, label)
+                if index in selection:
+                    self.song_listbox.selection_set(index)
+    
+    def draw_waveform(self, canvas, columns, x, y, width, height, color):
+        low, high = columns
+        count = len(low)
+        if count == 0:
+            return
+        step = width / count
+        middle = y + height / 2
+        half = height / 2
+        top = []
+        bottom = []
+        for i in range(count):
+            column_x = x + (i + 0.5) * step
+            top += [column_x, middle - high[i] * half]
+            bottom += [column_x, middle - low[i] * half]
+        for i in range(len(bottom) - 2, -1, -2):
+            top += bottom[i:i + 2]
+        if count == 1:
+            top += top[:2]
+        canvas.create_polygon(top, fill=color, outline=color)
+    
+    def show_waveform(self, path, reload=False):
+        if path == self.waveform_path and not reload:
+            return
+        self.waveform_path = path
+        self.waveform = None
+        self.scrub_position = None
+        if path is not None and self.config.waveforms:
+            self.waveform = unpack_peaks(self.player.analysis_cache.get("peaks", path))
+        self.waveform_view = (0.0, self.waveform.duration if self.waveform is not None else 0.0)
+        self.draw_waveform_strip()
+    
+    def draw_waveform_strip(self):
+        canvas = self.waveform_canvas
+        canvas.delete("all")
+        if self.waveform is None:
+            if self.waveform_path is not None and self.config.waveforms:
+                canvas.create_text(self.WAVEFORM_WIDTH / 2, self.WAVEFORM_HEIGHT / 2, text="Waveform pending…",
+                                   fill='#666666', font=('Arial', 8))
+            return
+        start, end = self.waveform_view
+        columns = self.waveform.columns(start, end, self.WAVEFORM_WIDTH // 2)
+        self.draw_waveform(canvas, columns, 0, 2, self.WAVEFORM_WIDTH, self.WAVEFORM_HEIGHT - 4, '#4a90e2')
+        if self.scrub_position is not None and start <= self.scrub_position <= end:
+            x = (self.scrub_position - start) / (end - start) * self.WAVEFORM_WIDTH
+            canvas.create_line(x, 0, x, self.WAVEFORM_HEIGHT, fill='#ffffff')
+        if end - start < self.waveform.duration:
+            canvas.create_text(self.WAVEFORM_WIDTH - 4, 2, anchor='ne', fill='#888888', font=('Arial', 7),
+                               text=f"{start:.2f}–{end:.2f}s")
+    
+    def waveform_position(self, x):
+        start, end = self.waveform_view
+        return start + max(0.0, min(1.0, x / self.WAVEFORM_WIDTH)) * (end - start)
+    
+    def scrub(self, event):
+        if self.waveform is None:
+            return
+        self.scrub_position = self.waveform_position(event.x)
+        self.draw_waveform_strip()
+        # Motion events arrive faster than previews are worth starting
+        now = time.monotonic()
+        if now - self.last_scrub >= self.SCRUB_INTERVAL:
+            self.last_scrub = now
+            self.actor.submit("preview", self.waveform_path, self.scrub_position, then=self.show_preview_result)
+    
+    def show_preview_result(self, played):
+        if played is None:
+            self.update_status_message("Decoding track for previews…")
+    
+    def zoom_waveform(self, event):
+        if self.waveform is None:
+            return
+        zoom_in = event.num == 4 or event.delta > 0
+        start, end = self.waveform_view
+        duration = self.waveform.duration
+        anchor = self.waveform_position(event.x)
+        span = (end - start) * (0.5 if zoom_in else 2.0)
+        span = max(min(0.05, duration), min(duration, span))
+        start = anchor - event.x / self.WAVEFORM_WIDTH * span
+        start = max(0.0, min(duration - span, start))
+        self.waveform_view = (start, start + span)
+        self.draw_waveform_strip()
+    
+    def reset_waveform_zoom(self, event=None):
+        if self.waveform is not None:
+            self.waveform_view = (0.0, self.waveform.duration)
+            self.draw_waveform_strip()
+    
+    def apply_duplicates(self, library_name, groups):
+        self.analysis_job = None
+        if library_name != self.library.name or not groups:
+            return
+        for group in groups:
+            print("Duplicates: " + ", ".join(os.path.basename(path) for path in group))
+        
+        if self.config.collapse_duplicates:
+            self.submit_library("collapse_duplicates", groups,
+                                then=lambda removed: self.show_duplicates(f"Hid {removed} duplicate tracks"))
+        else:
+            self.submit_library("set_duplicates", groups,
+                                then=lambda count: self.show_duplicates(f"Found {count} duplicate tracks (marked ⧉)"))
+    
+    def show_duplicates(self, message):
+        self.refresh_song_list()
+        self.update_song_list_selection(self.actor.state.current_index)
+        self.update_status_message(message)
+    
+    def apply_library_changes(self, changes):
+        if any(change[0] == "rescan" for change in changes):
+            self.rescan_library()
+            return
+        self.submit_library("apply_file_changes", changes, then=self.show_library_changes)
+    
+    def rescan_library(self):
+        # The watched folder was moved or deleted; the list is rebuilt from disk and a new watcher started
+        self.stop_library_watcher()
+        status = self.folder_status.cget("text")
+        self.submit_library("rescan_library", self.on_scan, then=lambda _: self.on_library_loaded(status))
+    
+    @profiler.profiled("tk.show_library_changes")
+    def show_library_changes(self, applied):
+        first_shifted = None
+        for kind, index in applied:
+            if kind == "added":
+                self.song_listbox.insert(tk.END, self.song_list_label(index))
+            elif kind == "removed":
+                self.song_listbox.delete(index)
+                if first_shifted is None or index < first_shifted:
+                    first_shifted = index
+            elif kind == "renamed":
+                self.song_listbox.delete(index)
+                self.song_listbox.insert(index, self.song_list_label(index))
+        
+        if first_shifted is not None:
+            # Rows below a removal are renumbered as they scroll into view
+            if self.stale_labels_from is None or first_shifted < self.stale_labels_from:
+                self.stale_labels_from = first_shifted
+            self.schedule_visible_rows()
+        
+        self.update_song_list_selection(self.actor.state.current_index)
+        self.update_current_song_display()
+    
+    def song_list_label(self, index):
+        label = f"{index+1:02d}. {self.library.playlist.names[index]}"
+        path = self.library.playlist[index]
+        if path in self.library.duplicates:
+            label += " ⧉"
+        if path in self.library.bad_tracks:
+            label += " ✗"
+        return label
+    
+    @profiler.profiled("tk.refresh_song_list")
     def refresh_song_list(self):
+        self.stale_labels_from = None
         self.song_listbox.delete(0, tk.END)
-        for i, song_name in enumerate(self.player.song_names):
-            self.song_listbox.insert(tk.END, f"{i+1:02d}. {song_name}")
+        self.song_listbox.insert(tk.END, *(self.song_list_label(i) for i in range(len(self.library.playlist))))
+        self.schedule_visible_rows()
+    
+    def on_sort_select(self, event):
+        label = self.sort_var.get()
+        for mode, mode_label in self.SORT_LABELS.items():
+            if mode_label == label:
+                self.submit_library("set_sort_mode", mode, then=lambda _: self.show_sorted())
+                break
+    
+    def show_sorted(self):
+        self.refresh_song_list()
+        self.update_song_list_selection(self.actor.state.current_index)
+    
+    def on_effect_select(self, event):
+        name = self.effect_var.get()
+        self.actor.submit("set_active_effect", "" if name == self.NO_EFFECT else name)
     
     def update_song_list_selection(self, index):
         self.song_listbox.selection_clear(0, tk.END)
@@ -734,34 +1798,45 @@ class DarkRoundedGUI:
             self.song_listbox.selection_set(index)
             self.song_listbox.see(index)
     
+    @profiler.profiled("tk.on_song_select")
     def on_song_select(self, event):
         selection = self.song_listbox.curselection()
         if selection:
-            self.player.play(selection[0])
+            self.actor.play(selection[0])
     
     def update_volume(self, value):
         volume = int(value) / 100.0
-        self.player.set_volume(volume)
+        self.actor.set_volume(volume)
         self.volume_label.config(text=f"{int(value)}%")
-        self.config.set_volume(int(value))
+        self.config.set("volume", int(value))
     
     def toggle_loop(self):
-        loop_enabled = self.player.toggle_loop()
-        self.loop_btn.config(text="🔂" if loop_enabled else "🔁")
+        self.actor.submit("toggle_loop")
+    
+    def apply_player_state(self, state):
+        if state is not self.actor.state:
+            return
+        self.loop_btn.config(text="🔂" if state.loop else "🔁")
+        self.show_waveform(state.current_song)
+        self.update_ui_state()
+        self.update_current_song_display()
+        if state.playing:
+            self.update_song_list_selection(state.current_index)
     
     def update_current_song_display(self):
-        if self.player.playing:
-            status = "⏸" if self.player.paused else "▶"
-            if self.player.current_song:
-                song_name = os.path.splitext(os.path.basename(self.player.current_song))[0]
-                current = self.player.current_index + 1
-                total = len(self.player.playlist)
+        state = self.actor.state
+        if state.playing:
+            status = "⏸" if state.paused else "▶"
+            if state.current_song:
+                song_name = os.path.splitext(os.path.basename(state.current_song))[0]
+                current = state.current_index + 1
+                total = state.track_count
                 self.current_song_label.config(
                     text=f"{status} {song_name}\nTrack {current}/{total}"
                 )
         else:
-            if self.player.playlist:
-                total = len(self.player.playlist)
+            if state.track_count:
+                total = state.track_count
                 self.current_song_label.config(
                     text=f"Ready • {total} songs loaded"
                 )
@@ -770,59 +1845,91 @@ class DarkRoundedGUI:
     
     def update_status_message(self, message):
         self.current_song_label.config(text=message)
-        self.root.after(3000, lambda: self.update_current_song_display() if self.player.playlist else None)
+        self.root.after(3000, lambda: self.update_current_song_display() if self.actor.state.track_count else None)
     
     def connect_to_echovr(self):
         self.echo_connected = self.player.echo_detector.connect_to_echo()
+        self.actor.post(self.update_echo_status)
+        self.startup_timer.mark("echovr attach")
+    
+    def update_echo_status(self):
         status = "Connected" if self.echo_connected else "Disconnected"
         color = "#48bb78" if self.echo_connected else "#f56565"
         self.echo_status.config(text=f"EchoVR: {status}", foreground=color)
-        if not self.echo_connected:
-            self.root.after(5000, self.connect_to_echovr)
     
     def monitor_echo_buttons(self):
+        sampler = self.player.echo_detector.sampler
+        self.player.echo_detector.tuning.apply()
         while hasattr(self, 'root'):
+            loop_start = time.perf_counter()
+            poll_interval = sampler.next_interval(time.monotonic_ns())
             if self.player.echo_detector.echo_connected:
-                self.player.echo_detector.check_button_actions(self.player)
-                self.root.after(0, self.update_ui_state)
+                self.player.echo_detector.check_button_actions(self.actor)
             else:
-                if not hasattr(self, '_reconnect_attempt') or self._reconnect_attempt < time.time():
-                    self._reconnect_attempt = time.time() + 5
+                if not hasattr(self, '_reconnect_attempt') or self._reconnect_attempt < time.monotonic():
+                    self._reconnect_attempt = time.monotonic() + 5
                     self.connect_to_echovr()
-            time.sleep(0.02)
+            if profiler.enabled:
+                sleep_start = time.perf_counter()
+                profiler.record("detector.loop", sleep_start - loop_start)
+                time.sleep(poll_interval)
+                profiler.record("detector.sleep_overshoot", time.perf_counter() - sleep_start - poll_interval)
+            else:
+                time.sleep(poll_interval)
     
     def start_echo_monitoring(self):
         self.detection_thread = threading.Thread(target=self.monitor_echo_buttons, daemon=True)
         self.detection_thread.start()
     
+    @profiler.profiled("tk.update_ui_state")
     def update_ui_state(self):
-        if self.player.playing:
-            self.play_btn.config(text="⏸" if not self.player.paused else "▶")
+        state = self.actor.state
+        if state.playing:
+            self.play_btn.config(text="⏸" if not state.paused else "▶")
         else:
             self.play_btn.config(text="▶")
     
-    def check_song_end(self):
-        self.player.check_song_end()
-        self.root.after(100, self.check_song_end)
+    def toggle_profiling(self, event=None):
+        enabled = profiler.toggle()
+        self.update_status_message("Profiling on (F9 to stop)" if enabled else "Profiling off")
+    
+    def dump_flight_recording(self, event=None):
+        path = recorder.dump()
+        if path:
+            self.update_status_message(f"Saved {path}")
+    
+    def report_callback_exception(self, exc_type, exc_value, traceback):
+        recorder.dump()
+        tk.Tk.report_callback_exception(self.root, exc_type, exc_value, traceback)
     
     def on_closing(self):
         self.close_app()
     
     def close_app(self):
-        if hasattr(self.player, 'current_index'):
-            self.config.set_current_index(self.player.current_index)
+        self.config.set_current_index(self.actor.state.current_index)
         
-        self.player.stop()
-        pygame.mixer.quit()
+        self.stop_library_watcher()
+        if self.analysis_job is not None:
+            self.analysis_job.cancel()
+        self.player.echo_detector.stop_poller()
+        profiler.disable()
+        try:
+            self.actor.call("shutdown", timeout=2)
+        except Exception as e:
+            print(f"Error stopping player: {e}")
+        self.actor.stop()
         
         self.root.destroy()
     
     def run(self):
+        self.root.after_idle(lambda: self.startup_timer.mark("first frame"))
         self.root.mainloop()
 
 def main():
     app = DarkRoundedGUI()
+    app.startup_timer.mark("gui constructed")
     app.run()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,86 @@
+NS_PER_SECOND = 1_000_000_000
+
+class EdgeSampler:
+    def __init__(self, poll_interval=0.02, burst_after_edge=True, burst_interval=0.002,
+                 burst_duration=0.3, min_pulse=0.011):
+        self.poll_interval = float(poll_interval)
+        self.burst_after_edge = bool(burst_after_edge)
+        self.burst_interval = float(burst_interval)
+        self.burst_duration_ns = int(burst_duration * NS_PER_SECOND)
+        self.min_pulse_ns = int(min_pulse * NS_PER_SECOND)
+        self.jitter_threshold_ns = int(2 * self.poll_interval * NS_PER_SECOND)
+        self.reset()
+
+    def reset(self):
+        self.last_state = None
+        self.last_sample_ns = 0
+        self.last_edge_ns = 0
+        self.press_gap_ns = 0
+        self.high_samples = 0
+        self.burst_until_ns = 0
+
+        self.samples = 0
+        self.edges = 0
+        self.gap_total_ns = 0
+        self.gap_max_ns = 0
+        self.long_gaps = 0
+        self.short_pulses = 0
+
+    def resume(self):
+        self.last_state = None
+        self.last_sample_ns = 0
+        self.high_samples = 0
+
+    def sample(self, state, now_ns):
+        gap_ns = now_ns - self.last_sample_ns if self.last_sample_ns else 0
+        self.last_sample_ns = now_ns
+        self.samples += 1
+        if gap_ns:
+            self.gap_total_ns += gap_ns
+            if gap_ns > self.gap_max_ns:
+                self.gap_max_ns = gap_ns
+            if gap_ns > self.jitter_threshold_ns:
+                self.long_gaps += 1
+
+        previous = self.last_state
+        self.last_state = state
+        if state == 1:
+            self.high_samples += 1
+        if previous is None or state == previous:
+            return False
+
+        self.edges += 1
+        self.last_edge_ns = now_ns
+        if self.burst_after_edge:
+            self.burst_until_ns = now_ns + self.burst_duration_ns
+
+        if state == 1:
+            self.high_samples = 1
+            self.press_gap_ns = gap_ns
+        else:
+            if self.high_samples == 1 and self.press_gap_ns:
+                self.check_pulse(max(self.press_gap_ns, gap_ns))
+            self.high_samples = 0
+        return True
+
+    def check_pulse(self, blind_ns):
+        # Seen in a single sample against a gap long enough to hide a press, so presses this
+        # short can be missed entirely; the count is a lower bound on how often that risk came up
+        if blind_ns > self.min_pulse_ns:
+            self.short_pulses += 1
+
+    def next_interval(self, now_ns):
+        if now_ns < self.burst_until_ns:
+            return self.burst_interval
+        return self.poll_interval
+
+    def stats(self):
+        intervals = self.samples - 1
+        return {
+            "samples": self.samples,
+            "edges": self.edges,
+            "mean_gap_ms": round(self.gap_total_ns / intervals / 1e6, 3) if intervals > 0 else None,
+            "max_gap_ms": round(self.gap_max_ns / 1e6, 3),
+            "long_gaps": self.long_gaps,
+            "short_pulses": self.short_pulses,
+        }
@@ -0,0 +1,103 @@
+import json
+
+DEFAULT_PRESETS = {
+    "chipmunk": [{"type": "speed", "factor": 1.5}],
+    "slow-mo": [{"type": "speed", "factor": 0.75}],
+    "loud": [{"type": "gain", "db": 6.0}],
+    "radio": [{"type": "eq", "low_db": -24.0, "mid_db": 3.0, "high_db": -12.0}, {"type": "gain", "db": 3.0}],
+    "soft": [{"type": "fade", "fade_in": 0.25, "fade_out": 0.5}, {"type": "gain", "db": -6.0}],
+}
+
+STEP_DEFAULTS = {
+    "gain": {"db": 0.0},
+    "speed": {"factor": 1.0},
+    "fade": {"fade_in": 0.0, "fade_out": 0.0},
+    "eq": {"low_db": 0.0, "mid_db": 0.0, "high_db": 0.0, "low_hz": 250.0, "high_hz": 4000.0},
+}
+
+def normalize_step(step):
+    kind = step.get("type")
+    if kind not in STEP_DEFAULTS:
+        raise ValueError(f"Unknown effect type: {kind}")
+    normalized = {"type": kind}
+    for name, default in STEP_DEFAULTS[kind].items():
+        normalized[name] = float(step.get(name, default))
+    if kind == "speed" and not 0.25 <= normalized["factor"] <= 4.0:
+        raise ValueError("Speed factor must be between 0.25 and 4")
+    return normalized
+
+def apply_gain(samples, step, frequency):
+    return samples * (10 ** (step["db"] / 20))
+
+def apply_speed(samples, step, frequency):
+    # Tape-style: resampling changes pitch and length together
+    import numpy as np
+    positions = np.arange(0, len(samples) - 1, step["factor"])
+    index = positions.astype(np.intp)
+    fraction = (positions - index)[:, None].astype(np.float32)
+    return samples[index] * (1 - fraction) + samples[index + 1] * fraction
+
+def apply_fade(samples, step, frequency):
+    import numpy as np
+    samples = samples.copy()
+    count = min(len(samples), int(step["fade_in"] * frequency))
+    if count:
+        samples[:count] *= np.linspace(0.0, 1.0, count, dtype=np.float32)[:, None]
+    count = min(len(samples), int(step["fade_out"] * frequency))
+    if count:
+        samples[-count:] *= np.linspace(1.0, 0.0, count, dtype=np.float32)[:, None]
+    return samples
+
+def apply_eq(samples, step, frequency):
+    # Three bands with short cosine crossfades, applied to the whole clip in the frequency domain
+    import numpy as np
+    spectrum = np.fft.rfft(samples, axis=0)
+    bins = np.fft.rfftfreq(len(samples), 1.0 / frequency)
+    low, mid, high = (10 ** (step[name] / 20) for name in ("low_db", "mid_db", "high_db"))
+
+    def crossfade(edge):
+        position = np.clip((np.log2(np.maximum(bins, 1.0) / edge) + 0.5), 0.0, 1.0)
+        return 0.5 - 0.5 * np.cos(np.pi * position)
+
+    to_mid = crossfade(step["low_hz"])
+    to_high = crossfade(step["high_hz"])
+    gains = low + (mid - low) * to_mid + (high - mid) * to_high
+    return np.fft.irfft(spectrum * gains[:, None], n=len(samples), axis=0).astype(np.float32)
+
+APPLY = {
+    "gain": apply_gain,
+    "speed": apply_speed,
+    "fade": apply_fade,
+    "eq": apply_eq,
+}
+
+class EffectChain:
+    def __init__(self, steps):
+        self.steps = [normalize_step(step) for step in steps]
+
+    def __bool__(self):
+        return bool(self.steps)
+
+    def key(self):
+        return json.dumps(self.steps, sort_keys=True, separators=(",", ":"))
+
+    def render(self, pcm, frequency, size, channels):
+        import numpy as np
+        if size != -16:
+            raise ValueError(f"Effects need a signed 16-bit mixer, not {size}")
+        samples = np.frombuffer(pcm, dtype="<i2")
+        samples = samples[:len(samples) // channels * channels].reshape(-1, channels).astype(np.float32) / 32768.0
+        for step in self.steps:
+            if len(samples) < 2:
+                break
+            samples = APPLY[step["type"]](samples, step, frequency)
+        return (np.clip(samples, -1.0, 32767 / 32768) * 32768.0).astype("<i2").tobytes()
+
+def load_presets(presets):
+    chains = {}
+    for name, steps in presets.items():
+        try:
+            chains[name] = EffectChain(steps)
+        except (ValueError, TypeError, AttributeError) as e:
+            print(f"Ignoring effect preset {name}: {e}")
+    return chains
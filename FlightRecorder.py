@@ -0,0 +1,173 @@
+import os
+import sys
+import json
+import time
+import struct
+import itertools
+import threading
+
+EDGE = 1
+GESTURE = 2
+ACTION = 3
+PLAYBACK = 4
+CONNECTION = 5
+
+PLAY = 1
+STOP = 2
+PAUSE = 3
+RESUME = 4
+TRACK_END = 5
+
+KIND_NAMES = {EDGE: "edge", GESTURE: "gesture", ACTION: "action", PLAYBACK: "playback",
+              CONNECTION: "connection"}
+PLAYBACK_NAMES = {PLAY: "play", STOP: "stop", PAUSE: "pause", RESUME: "resume", TRACK_END: "end"}
+
+MAGIC = b"EVRF"
+VERSION = 1
+# magic, version, record size, capacity, write count, wall clock ns, monotonic ns, string table length
+FILE_HEADER = struct.Struct("<4sHHIQqqI")
+# monotonic ns, kind, code, string id, argument
+RECORD = struct.Struct("<qBBHi")
+
+class FlightRecorder:
+    def __init__(self, capacity=65536):
+        self.capacity = capacity
+        self.buffer = bytearray(capacity * RECORD.size)
+        self.counter = itertools.count()
+        self.write_count = 0
+        self.strings = [""]
+        self.string_ids = {"": 0}
+        self.string_lock = threading.Lock()
+        self.dump_lock = threading.Lock()
+        self.hooks_installed = False
+
+    def intern(self, text):
+        string_id = self.string_ids.get(text)
+        if string_id is None:
+            with self.string_lock:
+                string_id = self.string_ids.get(text)
+                if string_id is None:
+                    if len(self.strings) >= 0xFFFF:
+                        return 0
+                    string_id = len(self.strings)
+                    self.strings.append(text)
+                    self.string_ids[text] = string_id
+        return string_id
+
+    def record(self, kind, code=0, text="", arg=0, time_ns=None):
+        index = next(self.counter)
+        RECORD.pack_into(self.buffer, (index % self.capacity) * RECORD.size,
+                         time.monotonic_ns() if time_ns is None else time_ns,
+                         kind, code, self.intern(text) if text else 0, arg)
+        if index >= self.write_count:
+            self.write_count = index + 1
+
+    def edge(self, pressed, time_ns=None):
+        self.record(EDGE, 1 if pressed else 0, time_ns=time_ns)
+
+    def gesture(self, action, pattern_text):
+        self.record(GESTURE, text=f"{pattern_text} -> {action}")
+
+    def action(self, name, arg=0):
+        self.record(ACTION, text=name, arg=arg)
+
+    def playback(self, code, index=-1, text=""):
+        self.record(PLAYBACK, code, text, index)
+
+    def connection(self, connected, text=""):
+        self.record(CONNECTION, 1 if connected else 0, text)
+
+    def dump(self, path=None):
+        if path is None:
+            path = f"flight_{time.strftime('%Y%m%d_%H%M%S')}.evr"
+        with self.dump_lock:
+            write_count = self.write_count
+            records = bytes(self.buffer)
+            strings = json.dumps(self.strings).encode("utf-8")
+            header = FILE_HEADER.pack(MAGIC, VERSION, RECORD.size, self.capacity, write_count,
+                                      time.time_ns(), time.monotonic_ns(), len(strings))
+            try:
+                with open(path, "wb") as f:
+                    f.write(header)
+                    f.write(strings)
+                    f.write(records)
+            except OSError as e:
+                print(f"Error writing flight recording: {e}")
+                return None
+        print(f"Flight recording saved to {os.path.abspath(path)} ({min(write_count, self.capacity)} events)")
+        return path
+
+    def install_crash_hooks(self):
+        if self.hooks_installed:
+            return
+        self.hooks_installed = True
+        previous_excepthook = sys.excepthook
+        previous_thread_hook = threading.excepthook
+
+        def excepthook(exc_type, exc_value, traceback):
+            self.dump()
+            previous_excepthook(exc_type, exc_value, traceback)
+
+        def thread_excepthook(args):
+            self.dump()
+            previous_thread_hook(args)
+
+        sys.excepthook = excepthook
+        threading.excepthook = thread_excepthook
+
+def load(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, record_size, capacity, write_count, wall_ns, monotonic_ns, strings_length = \
+        FILE_HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+        raise ValueError(f"{path} is not a flight recording this tool understands")
+    offset = FILE_HEADER.size
+    strings = json.loads(data[offset:offset + strings_length].decode("utf-8"))
+    offset += strings_length
+
+    events = []
+    for index in range(max(0, write_count - capacity), write_count):
+        events.append(RECORD.unpack_from(data, offset + (index % capacity) * RECORD.size))
+    events.sort(key=lambda event: event[0])
+    return wall_ns - monotonic_ns, strings, events
+
+def format_event(event, strings, first_ns):
+    time_ns, kind, code, string_id, arg = event
+    text = strings[string_id] if string_id < len(strings) else f"#{string_id}"
+    if kind == EDGE:
+        detail = "pressed" if code else "released"
+    elif kind == PLAYBACK:
+        detail = PLAYBACK_NAMES.get(code, str(code))
+        if arg >= 0:
+            detail += f" #{arg}"
+        if text:
+            detail += f" {text}"
+    elif kind == CONNECTION:
+        detail = ("connected" if code else "disconnected") + (f" {text}" if text else "")
+    elif kind == ACTION:
+        detail = text + (f" ({arg})" if arg else "")
+    else:
+        detail = text
+    return f"{(time_ns - first_ns) / 1e9:+12.4f}s  {KIND_NAMES.get(kind, kind):<10} {detail}"
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print("Usage: python FlightRecorder.py <recording.evr>")
+        return 1
+    offset_ns, strings, events = load(argv[0])
+    if not events:
+        print("Recording is empty")
+        return 0
+    first_ns = events[0][0]
+    started = time.localtime((first_ns + offset_ns) / 1e9)
+    print(f"{len(events)} events starting {time.strftime('%Y-%m-%d %H:%M:%S', started)}")
+    for event in events:
+        print(format_event(event, strings, first_ns))
+    return 0
+
+recorder = FlightRecorder()
+
+if __name__ == "__main__":
+    sys.exit(main())
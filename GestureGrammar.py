@@ -0,0 +1,267 @@
+from collections import namedtuple, deque
+
+CLICK = "C"
+LONG_PRESS = "L"
+HOLD = "H"
+
+TOKEN_WORDS = {
+    "c": CLICK, "click": CLICK, "tap": CLICK,
+    "l": LONG_PRESS, "long": LONG_PRESS, "long_press": LONG_PRESS,
+    "h": HOLD, "hold": HOLD,
+}
+
+GestureRule = namedtuple("GestureRule", ["pattern", "action", "window"], defaults=[None])
+
+def parse_pattern(pattern):
+    if isinstance(pattern, (list, tuple)):
+        parts = [str(part) for part in pattern]
+    else:
+        parts = str(pattern).replace(",", " ").replace("-", " ").split()
+
+    tokens = []
+    for part in parts:
+        word = part.lower()
+        if word in TOKEN_WORDS:
+            tokens.append(TOKEN_WORDS[word])
+        elif word and all(ch in "clh" for ch in word):
+            tokens.extend(TOKEN_WORDS[ch] for ch in word)
+        else:
+            raise ValueError(f"Unknown gesture token '{part}' in pattern {pattern!r}")
+    if not tokens:
+        raise ValueError("Empty gesture pattern")
+    return tuple(tokens)
+
+def describe_pattern(tokens, hold_threshold):
+    if all(token == CLICK for token in tokens):
+        return "1 Click" if len(tokens) == 1 else f"{len(tokens)} Clicks"
+    words = {CLICK: "Click", LONG_PRESS: "Long Press", HOLD: f"Hold {hold_threshold:g}s"}
+    return ", ".join(words[token] for token in tokens)
+
+def describe_action(action):
+    return action.replace("_", " ").title()
+
+class GestureGrammar:
+    def __init__(self, gestures, hold_threshold=2.0, click_timeout=0.5, click_max=0.5,
+                 min_press=0.0, debounce=0.0, adaptive_timeout=False, min_click_timeout=0.25):
+        self.hold_threshold = float(hold_threshold)
+        self.click_timeout = float(click_timeout)
+        self.adaptive_timeout = bool(adaptive_timeout)
+        self.min_click_timeout = min(float(min_click_timeout), self.click_timeout)
+        self.click_max = float(click_max)
+        self.min_press = float(min_press)
+        self.debounce = float(debounce)
+
+        if self.click_max > self.hold_threshold:
+            self.click_max = self.hold_threshold
+
+        self.rules = []
+        for gesture in gestures:
+            try:
+                window = gesture.get("window")
+                if window is not None:
+                    window = float(window)
+                    if window <= 0:
+                        raise ValueError("window must be positive")
+                rule = GestureRule(parse_pattern(gesture["pattern"]), str(gesture["action"]), window)
+            except (KeyError, TypeError, ValueError) as e:
+                print(f"Ignoring invalid gesture {gesture!r}: {e}")
+                continue
+            self.rules.append(rule)
+        self.compile()
+
+    def compile(self):
+        self.transitions = [{}]
+        self.accepting = [None]
+        for rule in self.rules:
+            state = 0
+            for token in rule.pattern:
+                next_state = self.transitions[state].get(token)
+                if next_state is None:
+                    next_state = len(self.transitions)
+                    self.transitions[state][token] = next_state
+                    self.transitions.append({})
+                    self.accepting.append(None)
+                state = next_state
+            if self.accepting[state] is not None:
+                print(f"Gesture {rule.pattern} is mapped twice, keeping {self.accepting[state].action}")
+                continue
+            self.accepting[state] = rule
+
+        self.can_hold = [HOLD in transitions for transitions in self.transitions]
+        self.is_leaf = [not transitions for transitions in self.transitions]
+
+    def describe(self):
+        return [f"{describe_pattern(rule.pattern, self.hold_threshold)} = {describe_action(rule.action)}"
+                for rule in self.rules]
+
+    def matcher(self):
+        return GestureMatcher(self)
+
+class GestureMatcher:
+    ADAPT_MIN_SAMPLES = 8
+    ADAPT_WEIGHT = 0.2
+    ADAPT_MARGIN = 4.0
+
+    def __init__(self, grammar):
+        self.grammar = grammar
+        self.reset()
+        self.last_release = float("-inf")
+        self.last_edge = 0.0
+        self.open_gap = False
+        self.click_timeout = grammar.click_timeout
+        self.gap_samples = 0
+        self.gap_mean = 0.0
+        self.gap_var = 0.0
+        self.commit_latencies = deque(maxlen=100)
+
+    def reset(self):
+        self.state = 0
+        self.pressed = False
+        self.press_start = 0.0
+        self.ignore_release = False
+        self.hold_deadline = None
+        self.gap_deadline = None
+        self.first_token = 0.0
+        self.last_token = 0.0
+
+    def on_edge(self, pressed, now):
+        grammar = self.grammar
+        self.last_edge = now
+        if pressed:
+            self.pressed = True
+            if self.open_gap and grammar.adaptive_timeout:
+                # Gaps that outlasted the learned timeout are still learned, so it can grow back
+                gap = now - self.last_release
+                if gap < grammar.click_timeout:
+                    self.learn_gap(gap)
+            self.open_gap = False
+            self.gap_deadline = None
+            if now - self.last_release < grammar.debounce:
+                self.ignore_release = True
+                return None
+            self.ignore_release = False
+            self.press_start = now
+            self.hold_deadline = now + grammar.hold_threshold
+            return None
+
+        if not self.pressed:
+            return None
+        self.pressed = False
+        self.hold_deadline = None
+        self.last_release = now
+
+        if self.ignore_release:
+            self.ignore_release = False
+            if self.state != 0:
+                self.open_gap = True
+                self.gap_deadline = now + self.click_timeout
+            return None
+
+        duration = now - self.press_start
+        if duration < grammar.min_press:
+            if self.state != 0:
+                self.open_gap = True
+                self.gap_deadline = now + self.click_timeout
+            return None
+
+        token = CLICK if duration < grammar.click_max else LONG_PRESS
+        return self.advance(token, now)
+
+    def poll(self, now):
+        if self.hold_deadline is not None and now >= self.hold_deadline:
+            self.hold_deadline = None
+            self.ignore_release = True
+            self.last_edge = now
+            return self.advance(HOLD, now)
+        if self.gap_deadline is not None and now >= self.gap_deadline:
+            rule = self.accept(self.state)
+            self.reset()
+            if rule is not None:
+                self.commit_latencies.append(now - self.last_edge)
+            return rule
+        return None
+
+    def feed(self, edges, now):
+        # Replays timestamped edges in order, letting deadlines that expired between them fire first
+        rules = []
+        for edge_time, pressed in edges:
+            rule = self.poll(edge_time)
+            if rule is not None:
+                rules.append(rule)
+            rule = self.on_edge(pressed, edge_time)
+            if rule is not None:
+                rules.append(rule)
+        rule = self.poll(now)
+        if rule is not None:
+            rules.append(rule)
+        return rules
+
+    def advance(self, token, now):
+        grammar = self.grammar
+        next_state = grammar.transitions[self.state].get(token)
+        if next_state is None and self.state != 0:
+            # The token can still start a gesture of its own, like a hold right after a click or two
+            self.state = 0
+            next_state = grammar.transitions[0].get(token)
+        if next_state is None:
+            pressed = self.pressed
+            self.reset()
+            self.pressed = pressed
+            self.ignore_release = pressed
+            return None
+
+        if self.state == 0:
+            self.first_token = now
+        self.last_token = now
+
+        # A leaf can't be extended by any longer pattern, so commit without waiting out the timeout
+        if grammar.is_leaf[next_state]:
+            rule = self.accept(next_state)
+            self.state = 0
+            self.gap_deadline = None
+            if rule is not None:
+                self.commit_latencies.append(0.0)
+            return rule
+
+        self.state = next_state
+        if not self.pressed:
+            self.open_gap = True
+            self.gap_deadline = now + self.click_timeout
+        return None
+
+    def accept(self, state):
+        # A rule with a window only fires if its tokens, first to last, fit inside it
+        rule = self.grammar.accepting[state]
+        if rule is not None and rule.window is not None and self.last_token - self.first_token >= rule.window:
+            print(f"{describe_action(rule.action)} ignored: gesture took longer than {rule.window:g}s")
+            return None
+        return rule
+
+    def learn_gap(self, gap):
+        if gap <= 0:
+            return
+        if self.gap_samples == 0:
+            self.gap_mean = gap
+        else:
+            delta = gap - self.gap_mean
+            self.gap_mean += self.ADAPT_WEIGHT * delta
+            self.gap_var = (1 - self.ADAPT_WEIGHT) * (self.gap_var + self.ADAPT_WEIGHT * delta * delta)
+        self.gap_samples += 1
+
+        if self.gap_samples >= self.ADAPT_MIN_SAMPLES:
+            timeout = self.gap_mean + self.ADAPT_MARGIN * self.gap_var ** 0.5
+            self.click_timeout = max(self.grammar.min_click_timeout,
+                                     min(self.grammar.click_timeout, timeout))
+
+    def median_commit_latency(self):
+        if not self.commit_latencies:
+            return None
+        samples = sorted(self.commit_latencies)
+        return samples[len(samples) // 2]
+
+    def hold_progress(self, now):
+        if not self.pressed or self.ignore_release or self.hold_deadline is None:
+            return None
+        if not self.grammar.can_hold[self.state]:
+            return None
+        return min(1.0, (now - self.press_start) / self.grammar.hold_threshold)
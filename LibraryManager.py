@@ -0,0 +1,153 @@
+import os
+from LibraryWatcher import is_supported
+from LibraryScanner import scan_folders
+from TrackTable import TrackTable
+
+ROOTS_LIBRARY = "All roots"
+
+def read_m3u(playlist_path):
+    base_dir = os.path.dirname(os.path.abspath(playlist_path))
+    paths = []
+    with open(playlist_path, 'r', encoding='utf-8-sig', errors='replace') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if not os.path.isabs(line):
+                line = os.path.normpath(os.path.join(base_dir, line))
+            paths.append(line)
+    return paths
+
+def write_m3u(playlist_path, paths):
+    with open(playlist_path, 'w', encoding='utf-8') as f:
+        f.write("#EXTM3U\n")
+        for path in paths:
+            name = os.path.splitext(os.path.basename(path))[0]
+            f.write(f"#EXTINF:-1,{name}\n")
+            f.write(f"{path}\n")
+
+class LibraryManager:
+    def __init__(self, config):
+        self.config = config
+        self.packed = {}
+
+    def names(self):
+        return list(self.config.libraries.keys())
+
+    def get(self, name):
+        return self.config.libraries.get(name)
+
+    def unique_name(self, base_name):
+        libraries = self.config.libraries
+        name = base_name or "Library"
+        counter = 2
+        while name in libraries:
+            name = f"{base_name} ({counter})"
+            counter += 1
+        return name
+
+    def find(self, kind, path):
+        for name, spec in self.config.libraries.items():
+            if spec.get("type") == kind and os.path.normcase(spec.get("path", "")) == os.path.normcase(path):
+                return name
+        return None
+
+    def add_folder(self, folder_path, name=None):
+        existing = self.find("folder", folder_path)
+        if existing:
+            return existing
+        name = name or self.unique_name(os.path.basename(os.path.normpath(folder_path)))
+        self.config.set_library(name, {"type": "folder", "path": folder_path})
+        return name
+
+    def set_roots(self, roots):
+        spec = {"type": "roots", "paths": list(roots)}
+        if self.get(ROOTS_LIBRARY) != spec:
+            self.packed.pop(ROOTS_LIBRARY, None)
+            self.config.set_library(ROOTS_LIBRARY, spec)
+        return ROOTS_LIBRARY
+
+    def scan_roots(self, name):
+        # Folder libraries that aren't already held in memory are scanned; None means load directly
+        spec = self.get(name)
+        if spec is None or name in self.packed:
+            return None
+        if spec.get("type") == "folder":
+            roots = [spec.get("path", "")]
+        elif spec.get("type") == "roots":
+            roots = spec.get("paths", [])
+        else:
+            return None
+        existing = [root for root in roots if os.path.isdir(root)]
+        for root in roots:
+            if root not in existing:
+                print(f"Folder doesn't exist: {root}")
+        return existing or None
+
+    def import_m3u(self, playlist_path, name=None):
+        existing = self.find("playlist", playlist_path)
+        if existing:
+            self.packed.pop(existing, None)
+            return existing
+        name = name or self.unique_name(os.path.splitext(os.path.basename(playlist_path))[0])
+        self.config.set_library(name, {"type": "playlist", "path": playlist_path})
+        return name
+
+    def export_m3u(self, playlist_path, paths):
+        try:
+            write_m3u(playlist_path, paths)
+            print(f"Exported {len(paths)} songs to {playlist_path}")
+            return True
+        except Exception as e:
+            print(f"Error exporting playlist {playlist_path}: {e}")
+            return False
+
+    def remove(self, name):
+        self.packed.pop(name, None)
+        self.config.remove_library(name)
+
+    def next_name(self, current_name):
+        names = self.names()
+        if not names:
+            return None
+        if current_name not in names:
+            return names[0]
+        return names[(names.index(current_name) + 1) % len(names)]
+
+    def load_tracks(self, name):
+        spec = self.get(name)
+        if spec is None:
+            print(f"Unknown library: {name}")
+            return None
+
+        if name in self.packed:
+            return self.unpack(name)
+
+        source = spec.get("path", "")
+        try:
+            if spec.get("type") == "playlist":
+                if not os.path.exists(source):
+                    print(f"Playlist doesn't exist: {source}")
+                    return None
+                return [path for path in read_m3u(source) if is_supported(path)]
+            roots = self.scan_roots(name)
+            if not roots:
+                return None
+            return scan_folders(roots, self.config.recursive_scan, self.config.scan_workers)
+        except Exception as e:
+            print(f"Error loading library {name}: {e}")
+            return None
+
+    def stash(self, name, tracks):
+        if name is None or name not in self.config.libraries:
+            return
+        if not len(tracks):
+            self.packed.pop(name, None)
+            return
+        self.packed[name] = tracks if isinstance(tracks, TrackTable) else TrackTable(tracks)
+
+    def unpack(self, name):
+        return self.packed.pop(name)
+
+    def drop(self, name):
+        self.packed.pop(name, None)
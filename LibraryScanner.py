@@ -0,0 +1,139 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from LibraryWatcher import is_supported
+
+def library_order(path):
+    return os.path.dirname(path).lower(), os.path.basename(path).lower()
+
+class LibraryScan:
+    # Every directory listing is its own task, so a slow mount only holds up its own subtree
+    def __init__(self, roots, on_batch=None, on_done=None, recursive=True, max_workers=8,
+                 batch_size=256, flush_interval=0.1):
+        self.roots = list(roots)
+        self.on_batch = on_batch
+        self.on_done = on_done
+        self.recursive = recursive
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.cancelled = threading.Event()
+        self.finished = threading.Event()
+        self.lock = threading.Lock()
+        self.emit_lock = threading.Lock()
+        self.executor = None
+        self.pending = 0
+        self.visited = set()
+        self.batch = []
+        self.last_flush = 0.0
+        self.found = 0
+        self.errors = 0
+
+    def start(self):
+        if not self.roots:
+            self.finish()
+            return self
+        self.executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="library-scan")
+        self.last_flush = time.monotonic()
+        # Hold one pending slot until every root is queued, so a fast root can't end the scan early
+        with self.lock:
+            self.pending += 1
+        for root in self.roots:
+            self.submit(root)
+        self.task_done()
+        return self
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def wait(self, timeout=None):
+        return self.finished.wait(timeout)
+
+    def submit(self, path):
+        with self.lock:
+            self.pending += 1
+        try:
+            self.executor.submit(self.scan_directory, path)
+        except RuntimeError:
+            self.task_done()
+
+    def scan_directory(self, path):
+        try:
+            if not self.cancelled.is_set():
+                self.list_directory(path)
+        except Exception as e:
+            self.errors += 1
+            print(f"Error scanning {path}: {e}")
+        finally:
+            self.task_done()
+
+    def list_directory(self, path):
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            self.errors += 1
+            print(f"Cannot scan {path}: {e}")
+            return
+        # Overlapping roots and bind mounts would otherwise list the same files twice
+        with self.lock:
+            key = (stat.st_dev, stat.st_ino)
+            if key in self.visited:
+                return
+            self.visited.add(key)
+
+        files = []
+        subdirectories = []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if self.recursive and not entry.name.startswith("."):
+                            subdirectories.append(entry.path)
+                    elif is_supported(entry.name) and entry.is_file():
+                        files.append(entry.path)
+                except OSError:
+                    continue
+        for subdirectory in subdirectories:
+            self.submit(subdirectory)
+        if files:
+            self.add_files(files)
+
+    def add_files(self, files):
+        with self.lock:
+            self.batch.extend(files)
+            self.found += len(files)
+            due = (len(self.batch) >= self.batch_size or
+                   time.monotonic() - self.last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def flush(self):
+        # Batches are delivered one at a time, in the order they were taken
+        with self.emit_lock:
+            with self.lock:
+                batch, self.batch = self.batch, []
+                self.last_flush = time.monotonic()
+            if batch and self.on_batch is not None and not self.cancelled.is_set():
+                self.on_batch(batch)
+
+    def task_done(self):
+        with self.lock:
+            self.pending -= 1
+            done = self.pending == 0
+        if done:
+            self.flush()
+            self.finish()
+
+    def finish(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+        self.finished.set()
+        if self.on_done is not None and not self.cancelled.is_set():
+            self.on_done()
+
+def scan_folders(roots, recursive=True, max_workers=8):
+    paths = []
+    scan = LibraryScan(roots, on_batch=paths.extend, recursive=recursive, max_workers=max_workers)
+    scan.start().wait()
+    return sorted(paths, key=library_order)
@@ -0,0 +1,267 @@
+import os
+import sys
+import threading
+import time
+import struct
+import select
+
+SUPPORTED_FORMATS = ('.mp3', '.wav', '.ogg', '.flac')
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+INOTIFY_EVENT = struct.Struct("iIII")
+
+def is_supported(file_name):
+    return file_name.lower().endswith(SUPPORTED_FORMATS)
+
+def _load_inotify():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+        return libc
+    except Exception:
+        return None
+
+class LibraryWatcher:
+    WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+                  IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+
+    def __init__(self, folder_path, known_names, on_change, poll_interval=1.0):
+        self.folder_path = folder_path
+        self.known = set(known_names)
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.running = False
+        self.thread = None
+        self.mode = None
+        self._inotify_fd = None
+        self._stop_r, self._stop_w = None, None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        libc = _load_inotify()
+        if libc is not None and self._open_inotify(libc):
+            self.mode = "inotify"
+            target = self._run_inotify
+        else:
+            self.mode = "polling"
+            target = self._run_polling
+        self.thread = threading.Thread(target=target, daemon=True)
+        self.thread.start()
+        print(f"Watching {self.folder_path} ({self.mode})")
+
+    def stop(self):
+        self.running = False
+        if self._stop_w is not None:
+            try:
+                os.write(self._stop_w, b"x")
+            except OSError:
+                pass
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)
+        self.thread = None
+        for fd in (self._inotify_fd, self._stop_r, self._stop_w):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self._inotify_fd = self._stop_r = self._stop_w = None
+
+    def _open_inotify(self, libc):
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return False
+        wd = libc.inotify_add_watch(fd, os.fsencode(self.folder_path), self.WATCH_MASK)
+        if wd < 0:
+            os.close(fd)
+            return False
+        self._inotify_fd = fd
+        self._stop_r, self._stop_w = os.pipe()
+        return True
+
+    def _emit(self, changes):
+        if changes and self.running:
+            try:
+                self.on_change(changes)
+            except Exception as e:
+                print(f"Error applying library changes: {e}")
+
+    def _snapshot(self):
+        entries = {}
+        try:
+            with os.scandir(self.folder_path) as it:
+                for entry in it:
+                    if is_supported(entry.name) and entry.is_file():
+                        try:
+                            entries[entry.name] = entry.inode()
+                        except OSError:
+                            entries[entry.name] = 0
+        except OSError:
+            return None
+        return entries
+
+    def _reconcile(self, previous, current):
+        removed = [name for name in previous if name not in current]
+        added = [name for name in current if name not in previous]
+        changes = []
+
+        by_inode = {}
+        for name in added:
+            inode = current[name]
+            if inode:
+                by_inode.setdefault(inode, []).append(name)
+
+        for name in removed:
+            inode = previous.get(name)
+            candidates = by_inode.get(inode) if inode else None
+            if candidates:
+                new_name = candidates.pop(0)
+                added.remove(new_name)
+                changes.append(("renamed", name, new_name))
+            else:
+                changes.append(("removed", name))
+
+        for name in sorted(added):
+            changes.append(("added", name))
+        return changes
+
+    def _known_snapshot(self, current):
+        return {name: current.get(name, 0) for name in self.known}
+
+    def _apply_known(self, changes):
+        for change in changes:
+            if change[0] == "added":
+                self.known.add(change[1])
+            elif change[0] == "removed":
+                self.known.discard(change[1])
+            elif change[0] == "renamed":
+                self.known.discard(change[1])
+                self.known.add(change[2])
+
+    def _run_polling(self):
+        previous = None
+        while self.running:
+            current = self._snapshot()
+            if current is not None:
+                if previous is None:
+                    previous = self._known_snapshot(current)
+                changes = self._reconcile(previous, current)
+                self._apply_known(changes)
+                self._emit(changes)
+                previous = current
+            elif previous is not None:
+                print(f"Library folder {self.folder_path} was moved or deleted")
+                self._emit([("rescan",)])
+                previous = None
+            time.sleep(self.poll_interval)
+
+    def _run_inotify(self):
+        current = self._snapshot()
+        if current is not None:
+            changes = self._reconcile(self._known_snapshot(current), current)
+            self._apply_known(changes)
+            self._emit(changes)
+
+        while self.running:
+            try:
+                ready, _, _ = select.select([self._inotify_fd, self._stop_r], [], [])
+            except (OSError, ValueError):
+                break
+            if self._stop_r in ready or not self.running:
+                break
+            try:
+                data = os.read(self._inotify_fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            except OSError as e:
+                print(f"Library watcher stopped: {e}")
+                break
+            # Give the second half of a rename a moment to arrive in the same batch
+            time.sleep(0.05)
+            try:
+                data += os.read(self._inotify_fd, 64 * 1024)
+            except OSError:
+                pass
+            changes, lost, overflow = self._parse_events(data)
+            if overflow and not lost:
+                # Events were dropped, so the folder listing is compared with what we know instead
+                print(f"Library watcher queue overflowed; rescanning {self.folder_path}")
+                current = self._snapshot()
+                if current is None:
+                    lost = True
+                else:
+                    changes = self._reconcile(self._known_snapshot(current), current)
+            self._apply_known(changes)
+            self._emit(changes)
+            if lost:
+                # The owner rescans the library and starts a new watcher, which polls until the folder is back
+                print(f"Library folder {self.folder_path} was moved or deleted")
+                self._emit([("rescan",)])
+                break
+
+    def _parse_events(self, data):
+        changes = []
+        known = set(self.known)
+        moved_from = {}
+        lost = False
+        overflow = False
+        offset = 0
+        while offset + INOTIFY_EVENT.size <= len(data):
+            wd, mask, cookie, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                lost = True
+                continue
+            if mask & IN_ISDIR or not name:
+                continue
+
+            if mask & IN_MOVED_FROM:
+                if name in known:
+                    moved_from[cookie] = name
+            elif mask & IN_MOVED_TO:
+                old_name = moved_from.pop(cookie, None)
+                if old_name is not None:
+                    known.discard(old_name)
+                    if is_supported(name):
+                        known.add(name)
+                        changes.append(("renamed", old_name, name))
+                    else:
+                        changes.append(("removed", old_name))
+                elif is_supported(name) and name not in known:
+                    known.add(name)
+                    changes.append(("added", name))
+            elif mask & IN_CLOSE_WRITE:
+                if is_supported(name) and name not in known:
+                    known.add(name)
+                    changes.append(("added", name))
+            elif mask & IN_DELETE:
+                if name in known:
+                    known.discard(name)
+                    changes.append(("removed", name))
+
+        for old_name in moved_from.values():
+            changes.append(("removed", old_name))
+        return changes, lost, overflow
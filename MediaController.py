@@ -1,15 +1,23 @@
-import os
+import time
+STARTUP_TIME = time.perf_counter()
+
 import tkinter as tk
 from tkinter import ttk
 import threading
-import time
-import pymem
-import pymem.process
-import json
+import multiprocessing
+import queue
+from collections import deque
 from enum import Enum
 import platform
-import win32api
-import win32con
+from MediaKeyBackends import create_backend
+from GestureGrammar import GestureGrammar, describe_action, describe_pattern
+from Profiler import profiler, StartupTimer
+from EdgeSampler import EdgeSampler
+from ThreadTuning import PRIORITIES, ThreadTuning
+from ButtonPoller import ButtonPoller, DISCONNECTED
+from MemoryReader import MEMORY_BACKENDS, ProcessNotFound, open_process_memory, ButtonReader
+from FlightRecorder import recorder
+from ConfigSchema import ConfigBase, Field, positive, non_negative
 
 class SoundAction(Enum):
     PLAY_PAUSE = "play_pause"
@@ -17,144 +25,235 @@ class SoundAction(Enum):
     PREV_TRACK = "prev_track"
 
 class MediaController:
-    def __init__(self):
+    def __init__(self, backend="auto"):
         self.last_action = "None"
+        self.backend = create_backend(backend) if isinstance(backend, str) else backend
+        self.queue = queue.Queue()
+        self.pending = set()
+        self.pending_lock = threading.Lock()
+        self.latencies = deque(maxlen=200)
+        self.running = True
+        self.worker = threading.Thread(target=self.dispatch_loop, daemon=True)
+        self.worker.start()
+
+    @property
+    def available(self):
+        return self.backend is not None
+
+    @property
+    def backend_name(self):
+        return self.backend.name if self.backend is not None else "no"
 
     def send_media_key(self, action):
-        try:
-            self.last_action = action.value
-            
-            VK_MEDIA_PLAY_PAUSE = 0xB3
-            VK_MEDIA_NEXT_TRACK = 0xB0
-            VK_MEDIA_PREV_TRACK = 0xB1
-
-            key_map = {
-                SoundAction.PLAY_PAUSE: VK_MEDIA_PLAY_PAUSE,
-                SoundAction.NEXT_TRACK: VK_MEDIA_NEXT_TRACK,
-                SoundAction.PREV_TRACK: VK_MEDIA_PREV_TRACK,
-            }
-
-            if action in key_map:
-                key = key_map[action]
-                win32api.keybd_event(key, 0, 0, 0)
-                time.sleep(0.05)
-                win32api.keybd_event(key, 0, win32con.KEYEVENTF_KEYUP, 0)
-                print(f"Media key pressed: {action.value}")
-                return True
-                
+        if self.backend is None:
+            print(f"No media key backend; {action.value} was not sent")
             return False
-            
-        except Exception as e:
-            print(f"Error: {e}")
+        if not self.backend.supports(action.value):
             return False
 
+        self.last_action = action.value
+        recorder.action(action.value)
+        with self.pending_lock:
+            if action in self.pending:
+                return True
+            self.pending.add(action)
+        self.queue.put((action, time.perf_counter()))
+        return True
+
+    def dispatch_loop(self):
+        while self.running:
+            item = self.queue.get()
+            if item is None:
+                break
+            action, queued_at = item
+            with self.pending_lock:
+                self.pending.discard(action)
+            try:
+                self.backend.send(action.value)
+                latency = time.perf_counter() - queued_at
+                self.latencies.append(latency)
+                recorder.action(f"{action.value} sent", int(latency * 1e6))
+                print(f"Media key pressed: {action.value} ({latency * 1000:.1f} ms)")
+            except Exception as e:
+                recorder.action(f"{action.value} failed")
+                print(f"Error: {e}")
+
+    def get_latency_stats(self):
+        samples = sorted(self.latencies)
+        if not samples:
+            return None
+        return {
+            "count": len(samples),
+            "median_ms": samples[len(samples) // 2] * 1000,
+            "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000,
+            "max_ms": samples[-1] * 1000,
+        }
+
     def get_last_action(self):
         return self.last_action
 
-class ConfigManager:
-    def __init__(self):
-        self.config_file = "echo_media_settings.json"
-        self.config = self.load_config()
-
-    def get_config_path(self):
-        return os.path.join(os.getcwd(), self.config_file)
-
-    def load_config(self):
-        default_config = {
-            "click_patterns": {
-                "prev_track": 3,
-                "next_track": 4,
-            },
-            "hold_actions": {
-                "play_pause": 3.0,
-            },
-            "auto_reconnect": True,
-            "click_timeout": 0.8,
-            "debounce_delay": 0.15,
-            "detection_threshold": 0.1,
-            "hold_threshold": 3.0,
-        }
+    def close(self):
+        self.running = False
+        self.queue.put(None)
+        self.worker.join(timeout=1)
+        if self.backend is not None:
+            self.backend.close()
+
+class StatusChannel:
+    def __init__(self, progress_interval=0.1):
+        self.messages = queue.SimpleQueue()
+        self.progress = None
+        self.progress_interval = progress_interval
+        self.next_progress_time = 0
+
+    def publish(self, text):
+        self.messages.put(text)
+
+    def publish_progress(self, fraction, now):
+        if now < self.next_progress_time:
+            return
+        self.next_progress_time = now + self.progress_interval
+        self.progress = fraction
 
-        config_path = self.get_config_path()
-        if os.path.exists(config_path):
-            try:
-                with open(config_path, 'r') as f:
-                    loaded_config = json.load(f)
-                for key in default_config:
-                    if key not in loaded_config:
-                        loaded_config[key] = default_config[key]
-                return loaded_config
-            except Exception as e:
-                print(f"Error: {e}")
-                return default_config
-        return default_config
+    def reset_progress(self):
+        self.next_progress_time = 0
+        self.progress = None
 
-    def save_config(self):
+    def drain(self):
+        progress, self.progress = self.progress, None
+        messages = []
+        while True:
+            try:
+                messages.append(self.messages.get_nowait())
+            except queue.Empty:
+                break
+        return progress, messages
+
+class ConfigManager(ConfigBase):
+    FILE_NAME = "echo_media_settings.json"
+    FIELDS = {
+        "click_patterns": Field(dict, {
+            "prev_track": 3,
+            "next_track": 4,
+        }),
+        "hold_actions": Field(dict, {
+            "play_pause": 3.0,
+        }),
+        "auto_reconnect": Field(bool, True),
+        "click_timeout": Field(float, 0.8, positive),
+        "debounce_delay": Field(float, 0.15, non_negative),
+        "detection_threshold": Field(float, 0.1, non_negative),
+        "hold_threshold": Field(float, 3.0, positive),
+        "click_max": Field(float, 1.0, positive),
+        "adaptive_timeout": Field(bool, False),
+        "min_click_timeout": Field(float, 0.25, positive),
+        "gestures": Field(list, []),
+        "media_backend": Field(str, "auto", choices=("auto", "win32", "mpris", "fake")),
+        "profiling": Field(bool, False),
+        "poll_interval": Field(float, 0.01, positive),
+        "burst_after_edge": Field(bool, True),
+        "burst_interval": Field(float, 0.002, positive),
+        "burst_duration": Field(float, 0.3, non_negative),
+        "poller_process": Field(bool, True),
+        "pointer_chains": Field(list, []),
+        "guard_interval": Field(float, 0.5, positive),
+        "memory_backend": Field(str, "auto", choices=MEMORY_BACKENDS),
+        "detector_priority": Field(str, "normal", choices=PRIORITIES),
+        "detector_cpus": Field(list, []),
+        "timer_resolution_ms": Field(int, 0, non_negative),
+    }
+    __slots__ = tuple(FIELDS)
+
+    GESTURE_FIELDS = ("click_patterns", "hold_actions", "click_timeout", "debounce_delay",
+                      "detection_threshold", "hold_threshold", "click_max", "adaptive_timeout",
+                      "min_click_timeout", "gestures")
+
+    def get_gestures(self):
+        if self.gestures:
+            return self.gestures
+        gestures = []
+        for action, clicks in self.click_patterns.items():
+            gestures.append({"pattern": ["C"] * int(clicks), "action": action})
+        for action in self.hold_actions:
+            gestures.append({"pattern": "H", "action": action})
+        return gestures
+
+    def get_thread_tuning(self):
         try:
-            config_path = self.get_config_path()
-            with open(config_path, 'w') as f:
-                json.dump(self.config, f, indent=2)
-            return True
-        except Exception as e:
-            print(f"Error: {e}")
-            return False
+            return ThreadTuning.from_config(self)
+        except ValueError as e:
+            print(f"Ignoring detector tuning: {e}")
+            return ThreadTuning()
+
+    def get_edge_sampler(self):
+        return EdgeSampler(
+            poll_interval=self.poll_interval,
+            burst_after_edge=self.burst_after_edge,
+            burst_interval=self.burst_interval,
+            burst_duration=self.burst_duration
+        )
+
+    def get_gesture_grammar(self):
+        return GestureGrammar(
+            self.get_gestures(),
+            hold_threshold=self.hold_threshold,
+            click_timeout=self.click_timeout,
+            click_max=self.click_max,
+            min_press=self.detection_threshold,
+            debounce=self.debounce_delay,
+            adaptive_timeout=self.adaptive_timeout,
+            min_click_timeout=self.min_click_timeout
+        )
 
 class EchoVRButtonDetector:
-    BUTTON_ADDRESSES = [
-        0x20C7CA8,
-        0x20C7CA0, 0x20C7CB0, 0x20C7C98, 0x20C7CB8,
-        0x207CA8, 0x20C7D00, 0x20C8000
-    ]
-
-    def __init__(self, media_controller, gui_update_callback=None):
-        self.pm = None
+    def __init__(self, media_controller, status_channel=None):
+        self.memory = None
+        self.reader = None
         self.echo_connected = False
         self.button_address = None
         self.base_address = None
 
         self.last_state = 0
-        self.press_start_time = 0
-        self.release_time = 0
-        self.last_press_time = 0
-        self.last_release_time = 0
-        
-        self.click_count = 0
-        self.click_timer = None
-        self.hold_timer = None
-        self.hold_detected = False
-        self.detection_active = False
 
         self.media_controller = media_controller
-        self.gui_update_callback = gui_update_callback
-        self.config = ConfigManager()
+        self.status_channel = status_channel
+        self.config = ConfigManager.instance()
+
+        self.set_gesture_grammar(self.config.get_gesture_grammar())
+        self.sampler = self.config.get_edge_sampler()
+        self.poller = None
+        self.config.subscribe(self.on_gesture_config_changed, ConfigManager.GESTURE_FIELDS)
+
+    def set_gesture_grammar(self, gesture_grammar):
+        self.gesture_grammar = gesture_grammar
+        self.gesture_matcher = gesture_grammar.matcher()
+        self.hold_threshold = gesture_grammar.hold_threshold
 
-        self.click_patterns = self.config.config.get("click_patterns", {})
-        self.hold_thresholds = self.config.config.get("hold_actions", {})
-        self.click_timeout = self.config.config.get("click_timeout", 0.8)
-        self.debounce_delay = self.config.config.get("debounce_delay", 0.15)
-        self.detection_threshold = self.config.config.get("detection_threshold", 0.1)
-        self.hold_threshold = self.config.config.get("hold_threshold", 3.0)
+    def on_gesture_config_changed(self, name, old_value, new_value):
+        self.set_gesture_grammar(self.config.get_gesture_grammar())
 
     def connect_to_echo(self):
         try:
-            self.pm = pymem.Pymem("echovr.exe")
-            echo_module = pymem.process.module_from_name(
-                self.pm.process_handle, "echovr.exe"
-            )
-            self.base_address = echo_module.lpBaseOfDll
+            self.memory = open_process_memory(backend=self.config.memory_backend)
+            self.base_address = self.memory.base_address
+            self.reader = ButtonReader(self.memory, self.config.pointer_chains, self.config.guard_interval)
 
-            self.button_address = self.scan_for_button_address()
+            self.button_address = self.reader.locate()
 
             if self.button_address:
-                test_value = self.pm.read_uchar(self.button_address)
+                test_value = self.reader.read()
                 self.echo_connected = test_value in [0, 1]
                 if self.echo_connected:
                     print(f"Connected to EchoVR. Button address: {hex(self.button_address)}")
+                    recorder.connection(True, hex(self.button_address))
+                    self.sampler.resume()
+                    if self.config.poller_process:
+                        self.start_poller()
                     return self.echo_connected
 
             return False
 
-        except pymem.exception.ProcessNotFound:
+        except ProcessNotFound:
             print("EchoVR process not found.")
             self.echo_connected = False
             return False
@@ -163,183 +262,146 @@ class EchoVRButtonDetector:
             self.echo_connected = False
             return False
 
-    def scan_for_button_address(self):
-        if not self.pm or not self.base_address:
+    def start_poller(self):
+        self.stop_poller()
+        poller = ButtonPoller(self.sampler, self.config.pointer_chains, self.config.guard_interval,
+                              memory_backend=self.config.memory_backend,
+                              tuning=self.config.get_thread_tuning())
+        if poller.start():
+            self.poller = poller
+            print("Sampling the button in a separate process")
+        else:
+            print("Falling back to in-process sampling")
+
+    def stop_poller(self):
+        if self.poller is not None:
+            self.poller.stop()
+            self.poller = None
+
+    def sampler_stats(self):
+        if self.poller is not None:
+            return self.poller.stats()
+        return self.sampler.stats()
+
+    def read_poller_edges(self):
+        events = self.poller.read_events()
+        if events is None or any(state == DISCONNECTED for _, state in events):
+            print("Button poller lost EchoVR")
+            recorder.connection(False, "poller")
+            self.stop_poller()
+            self.echo_connected = False
             return None
-
-        for offset in self.BUTTON_ADDRESSES:
-            try:
-                addr = self.base_address + offset
-                value = self.pm.read_uchar(addr)
-                if value in [0, 1]:
-                    return addr
-            except:
-                continue
-
-        try:
-            for offset in range(-0x100, 0x100, 4):
-                try:
-                    addr = self.base_address + 0x20C7CA8 + offset
-                    value = self.pm.read_uchar(addr)
-                    if value in [0, 1]:
-                        print(f"Found button at offset {hex(offset)}")
-                        return addr
-                except:
-                    continue
-        except:
-            pass
-
-        return None
+        edges = []
+        for edge_ns, state in events:
+            if state != self.last_state:
+                recorder.edge(state == 1, edge_ns)
+                edges.append((edge_ns / 1e9, state == 1))
+                self.last_state = state
+        return edges
 
     def read_button_state(self):
-        if not self.echo_connected or self.button_address is None:
+        if not self.echo_connected or self.reader is None:
             return -1
-        try:
-            button_state = self.pm.read_uchar(self.button_address)
-            return button_state
-        except:
+        if profiler.enabled:
+            read_start = time.perf_counter()
+            button_state = self.reader.read()
+            profiler.record("detector.read_uchar", time.perf_counter() - read_start)
+        else:
+            button_state = self.reader.read()
+        if button_state < 0:
             self.echo_connected = False
-            return -1
-
-    def process_clicks(self):
-        if self.click_count > 0 and not self.hold_detected:
-            print(f"Processing {self.click_count} clicks")
-            
-            pattern_map = {
-                int(self.click_patterns.get("prev_track", 3)): SoundAction.PREV_TRACK,
-                int(self.click_patterns.get("next_track", 4)): SoundAction.NEXT_TRACK,
-            }
-
-            if self.click_count in pattern_map:
-                action = pattern_map[self.click_count]
-                success = self.media_controller.send_media_key(action)
-                if success and self.gui_update_callback:
-                    action_text = action.value.replace("_", " ").title()
-                    self.gui_update_callback(f"{action_text} ({self.click_count} clicks)")
-
-        self.reset_detection()
-
-    def reset_detection(self):
-        self.click_count = 0
-        if self.click_timer:
-            self.click_timer.cancel()
-            self.click_timer = None
-        if self.hold_timer:
-            self.hold_timer.cancel()
-            self.hold_timer = None
-        self.hold_detected = False
-        self.detection_active = False
+        return button_state
 
-    def check_button_actions(self):
-        current_state = self.read_button_state()
-        if current_state < 0:
+    def perform_action(self, rule):
+        try:
+            action = SoundAction(rule.action)
+        except ValueError:
+            print(f"Unknown gesture action: {rule.action}")
             return
 
-        current_time = time.time()
+        gesture_text = describe_pattern(rule.pattern, self.hold_threshold)
+        print(f"{gesture_text} - {describe_action(rule.action)}")
+        recorder.gesture(rule.action, " ".join(rule.pattern))
+        success = self.media_controller.send_media_key(action)
+        if success and self.status_channel:
+            self.status_channel.reset_progress()
+            self.status_channel.publish(f"{describe_action(rule.action)} ({gesture_text})")
 
-        if current_state == 1 and self.last_state == 0:
-            press_time = current_time
-            
-            if (press_time - self.last_release_time) < self.debounce_delay:
-                self.last_state = current_state
-                return
-                
-            self.press_start_time = press_time
-            self.last_press_time = press_time
-            self.hold_detected = False
-            
-            if not self.detection_active:
-                self.detection_active = True
-            
-            if self.hold_timer:
-                self.hold_timer.cancel()
-            self.hold_timer = threading.Timer(self.hold_threshold, self.process_hold)
-            self.hold_timer.daemon = True
-            self.hold_timer.start()
-
-        elif current_state == 1 and self.last_state == 1:
-            hold_duration = current_time - self.press_start_time
-            
-            if hold_duration >= 1.0 and self.gui_update_callback and not self.hold_detected:
-                if hold_duration < self.hold_threshold:
-                    progress = int((hold_duration / self.hold_threshold) * 100)
-                    self.gui_update_callback(f"Hold: {progress}%...")
-                elif hold_duration >= self.hold_threshold and not self.hold_detected:
-                    self.process_hold()
-
-        elif current_state == 0 and self.last_state == 1:
-            release_time = current_time
-            press_duration = release_time - self.press_start_time
-            self.last_release_time = release_time
-            
-            if self.hold_timer:
-                self.hold_timer.cancel()
-                self.hold_timer = None
-            
-            if self.hold_detected:
-                self.reset_detection()
-                self.last_state = current_state
+    def check_button_actions(self):
+        if self.poller is not None:
+            edges = self.read_poller_edges()
+            if edges is None:
                 return
-            
-            if press_duration < self.detection_threshold:
-                self.last_state = current_state
+            current_time = time.monotonic_ns() / 1e9
+        else:
+            current_state = self.read_button_state()
+            if current_state < 0:
                 return
-                
-            if press_duration < 1.0:
-                self.click_count += 1
-                print(f"Click #{self.click_count} detected")
-                
-                if self.click_timer:
-                    self.click_timer.cancel()
-                
-                self.click_timer = threading.Timer(self.click_timeout, self.process_clicks)
-                self.click_timer.daemon = True
-                self.click_timer.start()
-            else:
-                print(f"Long press ({press_duration:.1f}s) - ignoring")
-                self.reset_detection()
-
-        self.last_state = current_state
-
-    def process_hold(self):
-        if not self.hold_detected:
-            self.hold_detected = True
-            print(f"Hold detected - Play/Pause")
-            
-            success = self.media_controller.send_media_key(SoundAction.PLAY_PAUSE)
-            if success and self.gui_update_callback:
-                self.gui_update_callback(f"Play/Pause ({self.hold_threshold}s hold)")
-            
-            if self.click_timer:
-                self.click_timer.cancel()
-                self.click_timer = None
-            self.click_count = 0
+            now_ns = time.monotonic_ns()
+            self.sampler.sample(current_state, now_ns)
+            current_time = now_ns / 1e9
+            edges = []
+            if current_state != self.last_state:
+                recorder.edge(current_state == 1, now_ns)
+                edges.append((current_time, current_state == 1))
+            self.last_state = current_state
+
+        rules = self.gesture_matcher.feed(edges, current_time)
+        for rule in rules:
+            self.perform_action(rule)
+        if not rules and self.last_state == 1 and self.status_channel:
+            hold_duration = current_time - self.gesture_matcher.press_start
+            if hold_duration >= 1.0:
+                progress = self.gesture_matcher.hold_progress(current_time)
+                if progress is not None:
+                    self.status_channel.publish_progress(progress, current_time)
 
 class EchoMediaControllerGUI:
     def __init__(self):
+        self.startup_timer = StartupTimer(STARTUP_TIME, expected=["first frame", "echovr attach"])
+        self.startup_timer.mark("imports")
+
         self.root = tk.Tk()
         self.root.title("EchoVR Media Controller")
         self.root.geometry("450x450")
         self.root.configure(bg='#1a1a1a')
         
         self.root.resizable(False, False)
-        self.root.attributes('-toolwindow', False)
+        if platform.system() == "Windows":
+            self.root.attributes('-toolwindow', False)
 
-        self.config = ConfigManager()
-        self.media_controller = MediaController()
-        self.echo_detector = EchoVRButtonDetector(self.media_controller, self.update_action_display)
+        self.config = ConfigManager.instance()
+        self.media_controller = MediaController(self.config.media_backend)
+        self.status_channel = StatusChannel()
+        self.echo_detector = EchoVRButtonDetector(self.media_controller, self.status_channel)
+        self.startup_timer.mark("tk root")
 
         self.setup_styles()
         self.create_widgets()
+        if not self.media_controller.available:
+            self.update_action_display(f"No media backend ({self.config.media_backend})")
 
         self.center_window()
+        self.startup_timer.mark("window built")
 
-        self.connect_to_echovr()
         self.start_echo_monitoring()
 
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        self.root.bind("<F9>", self.toggle_profiling)
+        self.root.bind("<F10>", self.dump_flight_recording)
+        self.root.report_callback_exception = self.report_callback_exception
+        recorder.install_crash_hooks()
+        # Looked up on each sample: the matcher is replaced whenever the gesture config changes
+        detector = self.echo_detector
+        profiler.add_gauge("gesture.commit_latency_median",
+                           lambda: detector.gesture_matcher.median_commit_latency())
+        profiler.add_gauge("media_key.latency", self.media_controller.get_latency_stats)
+        profiler.add_gauge("detector.sampler", self.echo_detector.sampler_stats)
+        if self.config.profiling:
+            profiler.enable()
 
         self.update_ui()
+        self.poll_status_channel()
 
     def setup_styles(self):
         self.style = ttk.Style()
@@ -401,9 +463,7 @@ class EchoMediaControllerGUI:
                                  background='#252525')
         controls_label.pack(pady=(10, 5))
 
-        controls_text = """• Hold 3 Seconds = Play/Pause
-• 3 Clicks = Previous Track
-• 4 Clicks = Next Track"""
+        controls_text = "\n".join(f"• {line}" for line in self.echo_detector.gesture_grammar.describe())
 
         controls_desc = ttk.Label(controls_frame,
                                 text=controls_text,
@@ -421,8 +481,8 @@ class EchoMediaControllerGUI:
                               background='#252525')
         stats_label.pack(pady=(10, 5))
 
-        settings_text = f"""Hold Time: {self.config.config['hold_threshold']}s
-Click Timeout: {self.config.config['click_timeout']}s"""
+        settings_text = f"""Hold Time: {self.config.hold_threshold}s
+Click Timeout: {self.config.click_timeout}s"""
 
         settings_desc = ttk.Label(stats_frame,
                                 text=settings_text,
@@ -460,7 +520,7 @@ Click Timeout: {self.config.config['click_timeout']}s"""
             btn.bind('<Enter>', lambda e, b=btn: b.config(bg='#357abd'))
             btn.bind('<Leave>', lambda e, b=btn: b.config(bg='#4a90e2'))
 
-        platform_text = f"Windows"
+        platform_text = f"{platform.system()} • {self.media_controller.backend_name} backend"
         self.platform_label = ttk.Label(main_frame,
                                       text=platform_text,
                                       style='Status.TLabel')
@@ -487,24 +547,31 @@ Click Timeout: {self.config.config['click_timeout']}s"""
         self.root.geometry(f'+{x}+{y}')
 
     def connect_to_echovr(self):
-        self.echo_connected = self.echo_detector.connect_to_echo()
-        status = "Connected" if self.echo_connected else "Disconnected"
-        color = "#48bb78" if self.echo_connected else "#f56565"
-        self.echo_status.config(text=f"EchoVR: {status}", foreground=color)
-
-        if not self.echo_connected and self.config.config.get("auto_reconnect", True):
-            self.root.after(5000, self.connect_to_echovr)
+        # Runs on the detection thread; update_ui picks the new status up on its next tick
+        self.echo_detector.connect_to_echo()
+        self.startup_timer.mark("echovr attach")
 
     def monitor_echo_buttons(self):
+        sampler = self.echo_detector.sampler
+        self.config.get_thread_tuning().apply()
+        self.connect_to_echovr()
         while True:
             try:
+                loop_start = time.perf_counter()
+                poll_interval = sampler.next_interval(time.monotonic_ns())
                 if self.echo_detector.echo_connected:
                     self.echo_detector.check_button_actions()
-                elif self.config.config.get("auto_reconnect", True):
+                elif self.config.auto_reconnect:
                     time.sleep(5)
                     if not self.echo_detector.echo_connected:
                         self.connect_to_echovr()
-                time.sleep(0.01)
+                if profiler.enabled:
+                    sleep_start = time.perf_counter()
+                    profiler.record("detector.loop", sleep_start - loop_start)
+                    time.sleep(poll_interval)
+                    profiler.record("detector.sleep_overshoot", time.perf_counter() - sleep_start - poll_interval)
+                else:
+                    time.sleep(poll_interval)
             except Exception as e:
                 print(f"Error: {e}")
                 time.sleep(1)
@@ -516,6 +583,16 @@ Click Timeout: {self.config.config['click_timeout']}s"""
     def update_action_display(self, action_text):
         self.action_display.config(text=f"Status: {action_text}")
 
+    @profiler.profiled("tk.poll_status_channel")
+    def poll_status_channel(self):
+        progress, messages = self.status_channel.drain()
+        if progress is not None:
+            self.update_action_display(f"Hold: {int(progress * 100)}%...")
+        for message in messages:
+            self.update_action_display(message)
+        self.root.after(int(self.status_channel.progress_interval * 1000), self.poll_status_channel)
+
+    @profiler.profiled("tk.update_ui")
     def update_ui(self):
         if hasattr(self.echo_detector, 'echo_connected'):
             status = "Connected" if self.echo_detector.echo_connected else "Disconnected"
@@ -524,22 +601,47 @@ Click Timeout: {self.config.config['click_timeout']}s"""
 
         self.root.after(1000, self.update_ui)
 
+    @profiler.profiled("tk.test_media_key")
     def test_media_key(self, action):
         success = self.media_controller.send_media_key(action)
         if success:
             action_text = action.value.replace("_", " ").title()
             self.update_action_display(f"Test: {action_text}")
-            self.root.after(2000, lambda: self.update_action_display("Ready"))
+        else:
+            self.update_action_display("Media keys unavailable" if not self.media_controller.available
+                                       else "Not supported by this media backend")
+        self.root.after(2000, lambda: self.update_action_display("Ready"))
 
     def on_closing(self):
         self.close_app()
 
+    def toggle_profiling(self, event=None):
+        enabled = profiler.toggle()
+        self.update_action_display("Profiling on (F9)" if enabled else "Profiling off")
+
+    def dump_flight_recording(self, event=None):
+        path = recorder.dump()
+        if path:
+            self.update_action_display(f"Saved {path}")
+
+    def report_callback_exception(self, exc_type, exc_value, traceback):
+        recorder.dump()
+        tk.Tk.report_callback_exception(self.root, exc_type, exc_value, traceback)
+
     def close_app(self):
         print("Shutting down...")
+        self.echo_detector.stop_poller()
+        profiler.disable()
+        stats = self.media_controller.get_latency_stats()
+        if stats:
+            print(f"Media key latency: median {stats['median_ms']:.1f} ms, "
+                  f"p95 {stats['p95_ms']:.1f} ms over {stats['count']} keys")
+        self.media_controller.close()
         self.root.quit()
         self.root.destroy()
 
     def run(self):
+        self.root.after_idle(lambda: self.startup_timer.mark("first frame"))
         self.root.mainloop()
 
 def main():
@@ -547,13 +649,13 @@ def main():
     print("EchoVR Media Controller")
     print("=" * 60)
     print("Controls:")
-    print("  • Hold 3 Seconds = Play/Pause")
-    print("  • 3 Clicks = Previous Track")
-    print("  • 4 Clicks = Next Track")
+    for line in ConfigManager.instance().get_gesture_grammar().describe():
+        print(f"  • {line}")
     print("=" * 60)
 
     app = EchoMediaControllerGUI()
     app.run()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
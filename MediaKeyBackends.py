@@ -0,0 +1,124 @@
+import sys
+import time
+import shutil
+import subprocess
+
+class MediaKeyBackend:
+    name = "none"
+    actions = ()
+
+    def supports(self, action_name):
+        return action_name in self.actions
+
+    def send(self, action_name):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class Win32KeyBackend(MediaKeyBackend):
+    name = "win32"
+
+    VK_MEDIA_PLAY_PAUSE = 0xB3
+    VK_MEDIA_NEXT_TRACK = 0xB0
+    VK_MEDIA_PREV_TRACK = 0xB1
+
+    def __init__(self):
+        import win32api
+        import win32con
+        self.win32api = win32api
+        self.keyup_flag = win32con.KEYEVENTF_KEYUP
+        self.key_map = {
+            "play_pause": self.VK_MEDIA_PLAY_PAUSE,
+            "next_track": self.VK_MEDIA_NEXT_TRACK,
+            "prev_track": self.VK_MEDIA_PREV_TRACK,
+        }
+        self.actions = tuple(self.key_map)
+
+    def send(self, action_name):
+        key = self.key_map[action_name]
+        self.win32api.keybd_event(key, 0, 0, 0)
+        time.sleep(0.05)
+        self.win32api.keybd_event(key, 0, self.keyup_flag, 0)
+
+class MprisBackend(MediaKeyBackend):
+    name = "mpris"
+    actions = ("play_pause", "next_track", "prev_track")
+
+    BUS_PREFIX = "org.mpris.MediaPlayer2."
+    OBJECT_PATH = "/org/mpris/MediaPlayer2"
+    INTERFACE = "org.mpris.MediaPlayer2.Player"
+
+    METHODS = {
+        "play_pause": "PlayPause",
+        "next_track": "Next",
+        "prev_track": "Previous",
+    }
+
+    def __init__(self):
+        self.bus = None
+        try:
+            import dbus
+            self.dbus = dbus
+            self.bus = dbus.SessionBus()
+        except Exception:
+            self.dbus = None
+            if not shutil.which("dbus-send"):
+                raise RuntimeError("Neither dbus-python nor dbus-send is available")
+
+    def find_player(self):
+        if self.bus is not None:
+            names = [str(n) for n in self.bus.list_names()]
+        else:
+            result = subprocess.run(
+                ["dbus-send", "--session", "--print-reply", "--dest=org.freedesktop.DBus",
+                 "/org/freedesktop/DBus", "org.freedesktop.DBus.ListNames"],
+                capture_output=True, text=True, timeout=2
+            )
+            names = [part.strip('"') for part in result.stdout.split() if self.BUS_PREFIX in part]
+        players = sorted(name for name in names if name.startswith(self.BUS_PREFIX))
+        return players[0] if players else None
+
+    def send(self, action_name):
+        player = self.find_player()
+        if player is None:
+            raise RuntimeError("No MPRIS media player found")
+        method = self.METHODS[action_name]
+        if self.bus is not None:
+            proxy = self.bus.get_object(player, self.OBJECT_PATH)
+            getattr(self.dbus.Interface(proxy, self.INTERFACE), method)()
+        else:
+            subprocess.run(
+                ["dbus-send", "--session", "--type=method_call", f"--dest={player}",
+                 self.OBJECT_PATH, f"{self.INTERFACE}.{method}"],
+                check=True, timeout=2
+            )
+
+class FakeBackend(MediaKeyBackend):
+    name = "fake"
+    actions = ("play_pause", "next_track", "prev_track")
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.sent = []
+
+    def send(self, action_name):
+        if self.delay:
+            time.sleep(self.delay)
+        self.sent.append((time.monotonic(), action_name))
+
+BACKENDS = {
+    "win32": Win32KeyBackend,
+    "mpris": MprisBackend,
+    "fake": FakeBackend,
+}
+
+def create_backend(name="auto"):
+    # The fake backend only records keys, so it is used only when configured by name
+    if name == "auto":
+        name = "win32" if sys.platform == "win32" else "mpris"
+    try:
+        return BACKENDS[name]()
+    except Exception as e:
+        print(f"Media backend '{name}' unavailable: {e}")
+        return None
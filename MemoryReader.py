@@ -0,0 +1,437 @@
+import os
+import sys
+import time
+import struct
+
+PROCESS_NAME = "echovr.exe"
+MEMORY_BACKENDS = ("auto", "pymem", "proc")
+IOV_MAX = 1024
+
+BUTTON_OFFSETS = [
+    0x20C7CA8,
+    0x20C7CA0, 0x20C7CB0, 0x20C7C98, 0x20C7CB8,
+    0x207CA8, 0x20C7D00, 0x20C8000
+]
+SCAN_CENTER = 0x20C7CA8
+SCAN_RADIUS = 0x100
+
+def parse_offset(value):
+    if isinstance(value, str):
+        return int(value, 0)
+    return int(value)
+
+class ProcessNotFound(Exception):
+    pass
+
+class ProcessMemory:
+    def __init__(self, process_name=PROCESS_NAME):
+        import pymem
+        import pymem.process
+        self.process_name = process_name
+        try:
+            self.pm = pymem.Pymem(process_name)
+        except pymem.exception.ProcessNotFound as e:
+            raise ProcessNotFound(process_name) from e
+        self.base_address = pymem.process.module_from_name(self.pm.process_handle, process_name).lpBaseOfDll
+
+    def module_base(self, module_name=None):
+        if module_name is None or module_name == self.process_name:
+            return self.base_address
+        import pymem.process
+        return pymem.process.module_from_name(self.pm.process_handle, module_name).lpBaseOfDll
+
+    def read_uchar(self, address):
+        return self.pm.read_uchar(address)
+
+    def read_pointer(self, address):
+        return self.pm.read_ulonglong(address)
+
+    def read_bytes(self, address, size):
+        return self.pm.read_bytes(address, size)
+
+    def read_many(self, requests):
+        results = []
+        for address, size in requests:
+            try:
+                results.append(self.pm.read_bytes(address, size))
+            except Exception:
+                results.append(None)
+        return results
+
+def process_names(pid):
+    names = []
+    try:
+        with open(f"/proc/{pid}/comm", "rb") as f:
+            names.append(os.fsdecode(f.read().strip()))
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            argv0 = f.read().split(b"\0", 1)[0]
+    except OSError:
+        return names
+    # Wine keeps the Windows path of the executable in argv[0]
+    names.append(os.fsdecode(argv0).replace("\\", "/").rsplit("/", 1)[-1])
+    return names
+
+def find_pid(process_name):
+    wanted = process_name.lower()
+    for entry in os.listdir("/proc"):
+        if entry.isdigit() and entry != str(os.getpid()):
+            if any(name.lower() == wanted for name in process_names(entry)):
+                return int(entry)
+    raise ProcessNotFound(process_name)
+
+def module_bases(pid):
+    bases = {}
+    with open(f"/proc/{pid}/maps", "r", errors="replace") as f:
+        for line in f:
+            fields = line.split(None, 5)
+            if len(fields) < 6:
+                continue
+            name = fields[5].strip().replace("\\", "/").rsplit("/", 1)[-1].lower()
+            start = int(fields[0].split("-", 1)[0], 16)
+            if name and (name not in bases or start < bases[name]):
+                bases[name] = start
+    return bases
+
+class LinuxProcessMemory:
+    # For EchoVR under Wine/Proton: the PE image shows up as a file mapping in /proc/<pid>/maps,
+    # and reads go through process_vm_readv, falling back to /proc/<pid>/mem
+    def __init__(self, process_name=PROCESS_NAME, pid=None):
+        self.process_name = process_name
+        self.pid = pid if pid is not None else find_pid(process_name)
+        self.mem_fd = None
+        self.libc = None
+        self.iovec = None
+        self.load_libc()
+        try:
+            self.bases = module_bases(self.pid)
+        except OSError as e:
+            raise ProcessNotFound(f"{process_name} (pid {self.pid}): {e}") from e
+        try:
+            self.base_address = self.module_base(process_name)
+        except ValueError as e:
+            raise ProcessNotFound(str(e)) from e
+
+    def load_libc(self):
+        try:
+            import ctypes
+            import ctypes.util
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            libc.process_vm_readv.restype = ctypes.c_ssize_t
+        except (OSError, AttributeError):
+            return
+
+        class iovec(ctypes.Structure):
+            _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+        self.libc = libc
+        self.iovec = iovec
+        # Reused for the per-tick button and pointer reads so polling allocates nothing
+        self.scratch = ctypes.create_string_buffer(8)
+        self.scratch_local = iovec(ctypes.cast(self.scratch, ctypes.c_void_p), 8)
+        self.scratch_remote = iovec(0, 8)
+        self.scratch_local_ref = ctypes.byref(self.scratch_local)
+        self.scratch_remote_ref = ctypes.byref(self.scratch_remote)
+
+    def module_base(self, module_name=None):
+        name = (module_name or self.process_name).lower()
+        if name not in self.bases:
+            self.bases = module_bases(self.pid)
+        if name not in self.bases:
+            raise ValueError(f"Module {name} is not mapped in process {self.pid}")
+        return self.bases[name]
+
+    def read_many(self, requests):
+        # One syscall per IOV_MAX requests; entries that fail come back as None
+        results = []
+        for start in range(0, len(requests), IOV_MAX):
+            chunk = requests[start:start + IOV_MAX]
+            results.extend(self.readv(chunk) if self.libc is not None else [self.pread(*r) for r in chunk])
+        return results
+
+    def readv(self, requests):
+        import ctypes
+        count = len(requests)
+        buffers = [ctypes.create_string_buffer(size) for _, size in requests]
+        local = (self.iovec * count)(*[self.iovec(ctypes.cast(buffer, ctypes.c_void_p), size)
+                                       for buffer, (_, size) in zip(buffers, requests)])
+        remote = (self.iovec * count)(*[self.iovec(address, size) for address, size in requests])
+        done = self.libc.process_vm_readv(self.pid, local, count, remote, count, 0)
+        if done < 0:
+            errno = ctypes.get_errno()
+            if errno == 3:
+                raise ProcessNotFound(f"{self.process_name} (pid {self.pid}) exited")
+            if errno in (1, 38):
+                # EPERM / ENOSYS: /proc/<pid>/mem may still be allowed
+                self.libc = None
+                return [self.pread(*request) for request in requests]
+            done = 0
+
+        # The kernel stops at the first unreadable remote range; retry the rest one by one
+        results = []
+        for buffer, (address, size) in zip(buffers, requests):
+            if done >= size:
+                results.append(buffer.raw)
+                done -= size
+            else:
+                done = 0
+                results.append(self.readv_one(address, size))
+        return results
+
+    def readv_one(self, address, size):
+        import ctypes
+        buffer = ctypes.create_string_buffer(size)
+        local = self.iovec(ctypes.cast(buffer, ctypes.c_void_p), size)
+        remote = self.iovec(address, size)
+        if self.libc.process_vm_readv(self.pid, ctypes.byref(local), 1, ctypes.byref(remote), 1, 0) == size:
+            return buffer.raw
+        return None
+
+    def pread(self, address, size):
+        if self.mem_fd is None:
+            try:
+                self.mem_fd = os.open(f"/proc/{self.pid}/mem", os.O_RDONLY)
+            except OSError as e:
+                raise ProcessNotFound(f"{self.process_name} (pid {self.pid}): {e}") from e
+        try:
+            data = os.pread(self.mem_fd, size, address)
+        except OSError:
+            return None
+        return data if len(data) == size else None
+
+    def read_bytes(self, address, size):
+        data = self.read_many([(address, size)])[0]
+        if data is None:
+            raise OSError(f"Could not read {size} bytes at {hex(address)}")
+        return data
+
+    def read_small(self, address, size):
+        if self.libc is not None:
+            self.scratch_local.iov_len = size
+            self.scratch_remote.iov_base = address
+            self.scratch_remote.iov_len = size
+            if self.libc.process_vm_readv(self.pid, self.scratch_local_ref, 1, self.scratch_remote_ref, 1, 0) == size:
+                return self.scratch.raw[:size]
+        return self.read_bytes(address, size)
+
+    def read_uchar(self, address):
+        return self.read_small(address, 1)[0]
+
+    def read_pointer(self, address):
+        return struct.unpack("<Q", self.read_small(address, 8))[0]
+
+    def close(self):
+        if self.mem_fd is not None:
+            os.close(self.mem_fd)
+            self.mem_fd = None
+
+def open_process_memory(process_name=PROCESS_NAME, backend="auto"):
+    if backend == "proc" or (backend == "auto" and sys.platform.startswith("linux")):
+        return LinuxProcessMemory(process_name)
+    return ProcessMemory(process_name)
+
+class PointerChain:
+    def __init__(self, offsets, module=None):
+        if not offsets:
+            raise ValueError("A pointer chain needs at least one offset")
+        self.offsets = [parse_offset(offset) for offset in offsets]
+        self.module = module
+
+    @classmethod
+    def from_config(cls, spec):
+        if isinstance(spec, dict):
+            return cls(spec.get("offsets", []), spec.get("module"))
+        return cls(spec)
+
+    def walk(self, memory):
+        # Returns the final address and every (address, pointer) link followed to reach it
+        address = memory.module_base(self.module) + self.offsets[0]
+        links = []
+        for offset in self.offsets[1:]:
+            pointer = memory.read_pointer(address)
+            if not pointer:
+                raise ValueError(f"Null pointer at {hex(address)}")
+            links.append((address, pointer))
+            address = pointer + offset
+        return address, links
+
+    def describe(self):
+        return f"[{self.module or 'base'}+{hex(self.offsets[0])}]" + \
+            "".join(f" -> +{hex(offset)}" for offset in self.offsets[1:])
+
+class ButtonReader:
+    def __init__(self, memory, chains=(), guard_interval=0.5):
+        self.memory = memory
+        self.chains = [chain if isinstance(chain, PointerChain) else PointerChain.from_config(chain)
+                       for chain in chains]
+        self.guard_interval = guard_interval
+        self.address = None
+        self.chain = None
+        self.links = []
+        self.next_guard = 0.0
+        self.rewalks = 0
+
+    def locate(self):
+        for chain in self.chains:
+            try:
+                address, links = chain.walk(self.memory)
+                if self.memory.read_uchar(address) not in (0, 1):
+                    continue
+            except Exception:
+                continue
+            self.use_chain(chain, address, links)
+            print(f"Button resolved through pointer chain {chain.describe()}")
+            return address
+
+        self.chain = None
+        self.links = []
+        self.address = self.scan()
+        return self.address
+
+    def use_chain(self, chain, address, links):
+        self.chain = chain
+        self.address = address
+        self.links = links
+        self.next_guard = time.monotonic() + self.guard_interval
+
+    def scan(self):
+        # Every candidate is fetched in one batch, then checked in the usual order
+        base_address = self.memory.base_address
+        candidates = [(base_address + offset, None) for offset in BUTTON_OFFSETS]
+        candidates += [(base_address + SCAN_CENTER + offset, offset) for offset in range(-SCAN_RADIUS, SCAN_RADIUS, 4)]
+        try:
+            values = self.memory.read_many([(address, 1) for address, _ in candidates])
+        except Exception:
+            return None
+        for (address, offset), data in zip(candidates, values):
+            if data is not None and data[0] in (0, 1):
+                if offset is not None:
+                    print(f"Found button at offset {hex(offset)}")
+                return address
+        return None
+
+    def links_intact(self):
+        # Every link is checked, starting from the static pointer in the module, in one batched read;
+        # a relocated object can leave its old copy (and any pointer inside it) untouched
+        try:
+            values = self.memory.read_many([(address, 8) for address, _ in self.links])
+        except Exception:
+            return False
+        return all(data is not None and int.from_bytes(data, "little") == pointer
+                   for (_, pointer), data in zip(self.links, values))
+
+    def revalidate(self):
+        if self.chain is None or not self.links:
+            return True
+        if self.links_intact():
+            return True
+        self.rewalks += 1
+        try:
+            address, links = self.chain.walk(self.memory)
+        except Exception:
+            return False
+        if address != self.address:
+            print(f"Button moved to {hex(address)}")
+        self.use_chain(self.chain, address, links)
+        return True
+
+    def read(self, now=None):
+        if self.address is None:
+            return -1
+        if self.chain is not None:
+            now = time.monotonic() if now is None else now
+            if now >= self.next_guard:
+                self.next_guard = now + self.guard_interval
+                if not self.revalidate():
+                    return -1
+        try:
+            state = self.memory.read_uchar(self.address)
+        except Exception:
+            state = -1
+        if state in (0, 1):
+            return state
+        if self.chain is None or not self.revalidate():
+            return -1
+        try:
+            state = self.memory.read_uchar(self.address)
+        except Exception:
+            return -1
+        # Anything else is not a button byte, and would show up as spurious edges
+        return state if state in (0, 1) else -1
+
+def stand_in(period=1.0):
+    # Pretends to be EchoVR: maps a file called echovr.exe and flips the byte at the button offset
+    import mmap
+    import signal
+    import tempfile
+    import ctypes
+    import ctypes.util
+    directory = tempfile.mkdtemp(prefix="echovr-stand-in-")
+    path = os.path.join(directory, PROCESS_NAME)
+    size = (SCAN_CENTER + SCAN_RADIUS + mmap.PAGESIZE) // mmap.PAGESIZE * mmap.PAGESIZE
+    with open(path, "wb") as f:
+        f.truncate(size)
+    with open(path, "r+b") as f:
+        image = mmap.mmap(f.fileno(), size)
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6")
+        libc.prctl(15, PROCESS_NAME.encode()[:15], 0, 0, 0)
+    except (OSError, AttributeError):
+        pass
+    base = module_bases(os.getpid())[PROCESS_NAME]
+    print(f"Stand-in pid {os.getpid()}, {PROCESS_NAME} mapped at {hex(base)}, button at +{hex(SCAN_CENTER)}",
+          flush=True)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    state = 0
+    try:
+        while True:
+            image[SCAN_CENTER] = state
+            time.sleep(period)
+            state ^= 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        image.close()
+        os.remove(path)
+        os.rmdir(directory)
+
+def probe(process_name=PROCESS_NAME, backend="auto", seconds=5.0):
+    try:
+        memory = open_process_memory(process_name, backend)
+    except ProcessNotFound as e:
+        print(f"Process not found: {e}")
+        return 1
+    reader = ButtonReader(memory)
+    address = reader.locate()
+    if address is None:
+        print("Button address not found")
+        return 1
+    print(f"{type(memory).__name__} attached to pid {getattr(memory, 'pid', '?')}, "
+          f"base {hex(memory.base_address)}, button {hex(address)}")
+    reads = 0
+    last = None
+    total = 0.0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        state = reader.read()
+        total += time.perf_counter() - start
+        reads += 1
+        if state != last:
+            print(f"  button {state}")
+            last = state
+        time.sleep(0.005)
+    print(f"{reads} reads, {total / reads * 1e6:.1f} us per read")
+    return 0
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["--stand-in"]:
+        stand_in(float(argv[1]) if len(argv) > 1 else 1.0)
+        return 0
+    if argv[:1] == ["--probe"]:
+        return probe(backend=argv[1] if len(argv) > 1 else "auto")
+    print("Usage: python MemoryReader.py --stand-in [period] | --probe [auto|pymem|proc]")
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
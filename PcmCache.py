@@ -0,0 +1,169 @@
+import os
+import mmap
+import queue
+import hashlib
+import threading
+
+class PcmCache:
+    def __init__(self, cache_dir, max_bytes=256 * 1024 * 1024, max_entry_bytes=32 * 1024 * 1024,
+                 decoder=None, mixer_format=None, duration_hint=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.decoder = decoder
+        self.duration_hint = duration_hint
+        self.mixer_format = mixer_format
+        self.queue = queue.Queue()
+        self.pending = set()
+        self.skipped = set()
+        self.lock = threading.Condition()
+        self.worker = None
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def source_key(self, path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return f"{os.path.abspath(path)}|{stat.st_mtime_ns}|{stat.st_size}"
+
+    def entry_path(self, path, variant=""):
+        source_key = self.source_key(path)
+        if source_key is None or self.mixer_format is None:
+            return None
+        key = f"{source_key}|{self.mixer_format}|{variant}"
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".pcm")
+
+    def lookup(self, path, variant=""):
+        entry = self.entry_path(path, variant)
+        if entry is None or not os.path.exists(entry):
+            return None
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+        return entry
+
+    def open(self, path, variant=""):
+        entry = self.lookup(path, variant)
+        if entry is None:
+            return None
+        try:
+            with open(entry, "rb") as f:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            print(f"Error opening cached audio for {path}: {e}")
+            return None
+
+    def request(self, path, variant=""):
+        key = (path, variant)
+        with self.lock:
+            if key in self.pending or key in self.skipped:
+                return
+            self.pending.add(key)
+        self.queue.put(key)
+        self.start_worker()
+
+    def wait(self, path, variant="", timeout=60.0):
+        # For other background threads: queues the entry and blocks until this cache's worker is done with it
+        self.request(path, variant)
+        with self.lock:
+            self.lock.wait_for(lambda: (path, variant) not in self.pending, timeout)
+        return self.open(path, variant)
+    
+    def request_many(self, paths, variant=""):
+        for path in paths:
+            self.request(path, variant)
+
+    def stop(self):
+        # Lets the worker finish the entry in hand, then waits for it to exit
+        self.queue.put(None)
+        with self.lock:
+            worker, self.worker = self.worker, None
+        if worker is not None and worker is not threading.current_thread():
+            worker.join()
+    
+    def start_worker(self):
+        # Called from the actor and from other caches' workers, so only one can ever be started
+        with self.lock:
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(target=self.worker_loop, daemon=True)
+                self.worker.start()
+
+    def worker_loop(self):
+        while True:
+            key = self.queue.get()
+            if key is None:
+                break
+            path, variant = key
+            try:
+                if self.lookup(path, variant) is None:
+                    self.decode(path, variant)
+            except Exception as e:
+                print(f"Error caching {path}: {e}")
+                with self.lock:
+                    self.skipped.add(key)
+            finally:
+                with self.lock:
+                    self.pending.discard(key)
+                    self.lock.notify_all()
+
+    def estimated_size(self, path, variant=""):
+        # A cheap lower bound on the decoded size; None when nothing is known
+        if not variant and self.duration_hint is not None and self.mixer_format is not None:
+            duration = self.duration_hint(path)
+            if duration is not None:
+                frequency, size, channels = self.mixer_format
+                return int(duration * frequency) * (abs(size) // 8) * channels
+        try:
+            # Even high-resolution WAV shrinks by less than this when decoded to the mixer format
+            return os.path.getsize(path) // 4
+        except OSError:
+            return None
+
+    def decode(self, path, variant=""):
+        estimate = self.estimated_size(path, variant)
+        if estimate is not None and estimate > self.max_entry_bytes:
+            with self.lock:
+                self.skipped.add((path, variant))
+            return None
+        # The decoder sees the variant so one cache can hold derived renders of a file
+        pcm = self.decoder(path, variant) if variant else self.decoder(path)
+        if pcm is None:
+            return None
+        if len(pcm) > self.max_entry_bytes:
+            with self.lock:
+                self.skipped.add((path, variant))
+            return None
+        return self.store(path, pcm, variant)
+
+    def store(self, path, pcm, variant=""):
+        entry = self.entry_path(path, variant)
+        if entry is None:
+            return None
+        temp_path = f"{entry}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(pcm)
+        os.replace(temp_path, entry)
+        self.evict()
+        return entry
+
+    def evict(self):
+        entries = []
+        total = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".pcm"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        for _, size, entry_path in sorted(entries):
+            try:
+                os.remove(entry_path)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.max_bytes:
+                break
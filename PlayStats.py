@@ -0,0 +1,131 @@
+import time
+import queue
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS plays (
+    path TEXT NOT NULL,
+    library TEXT NOT NULL,
+    played_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS track_stats (
+    path TEXT PRIMARY KEY,
+    play_count INTEGER NOT NULL,
+    last_played REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS plays_by_library ON plays (library, played_at);
+"""
+
+class PlayStats:
+    def __init__(self, db_path="play_stats.db", flush_interval=2.0, batch_size=64):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.queue = queue.Queue()
+        self.local = threading.local()
+        self.ready = threading.Event()
+        self.writer = threading.Thread(target=self.write_loop, daemon=True)
+        self.writer.start()
+
+    def connect(self):
+        connection = sqlite3.connect(self.db_path, timeout=5)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def record_play(self, path, library=""):
+        self.queue.put((path, library or "", time.time()))
+
+    def write_loop(self):
+        try:
+            connection = self.connect()
+            connection.executescript(SCHEMA)
+        except sqlite3.Error as e:
+            print(f"Play statistics disabled: {e}")
+            return
+        finally:
+            self.ready.set()
+
+        running = True
+        while running:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and batch[-1] is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            if batch[-1] is None:
+                running = False
+                batch.pop()
+            if batch:
+                self.write_batch(connection, batch)
+        connection.close()
+
+    def write_batch(self, connection, batch):
+        try:
+            with connection:
+                connection.executemany(
+                    "INSERT INTO plays (path, library, played_at) VALUES (?, ?, ?)", batch
+                )
+                connection.executemany(
+                    "INSERT INTO track_stats (path, play_count, last_played) VALUES (?, 1, ?) "
+                    "ON CONFLICT(path) DO UPDATE SET play_count = play_count + 1, "
+                    "last_played = MAX(last_played, excluded.last_played)",
+                    [(path, played_at) for path, _, played_at in batch]
+                )
+        except sqlite3.Error as e:
+            print(f"Error saving play statistics: {e}")
+
+    def query(self, sql, params=()):
+        if not self.ready.wait(timeout=1):
+            return []
+        connection = getattr(self.local, "connection", None)
+        try:
+            if connection is None:
+                connection = self.connect()
+                self.local.connection = connection
+            return connection.execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            print(f"Error reading play statistics: {e}")
+            return []
+
+    def counts(self, paths):
+        wanted = set(paths)
+        rows = self.query("SELECT path, play_count, last_played FROM track_stats")
+        return {path: (play_count, last_played) for path, play_count, last_played in rows
+                if path in wanted}
+
+    def most_played(self, limit=20, library=None):
+        if library is None:
+            rows = self.query("SELECT path FROM track_stats ORDER BY play_count DESC, last_played DESC "
+                              "LIMIT ?", (limit,))
+        else:
+            rows = self.query("SELECT path FROM plays WHERE library = ? GROUP BY path "
+                              "ORDER BY COUNT(*) DESC, MAX(played_at) DESC LIMIT ?", (library, limit))
+        return [row[0] for row in rows]
+
+    def recently_played(self, limit=20, library=None):
+        if library is None:
+            rows = self.query("SELECT path FROM track_stats ORDER BY last_played DESC LIMIT ?", (limit,))
+        else:
+            rows = self.query("SELECT path FROM plays WHERE library = ? GROUP BY path "
+                              "ORDER BY MAX(played_at) DESC LIMIT ?", (library, limit))
+        return [row[0] for row in rows]
+
+    def hot_paths(self, paths, limit=20):
+        counts = self.counts(paths)
+        ranked = sorted(counts, key=lambda path: counts[path], reverse=True)
+        return ranked[:limit]
+
+    def close(self):
+        self.queue.put(None)
+        self.writer.join(timeout=2)
+        connection = getattr(self.local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self.local.connection = None
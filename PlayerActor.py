@@ -0,0 +1,183 @@
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from TrackTable import TrackTable
+
+@dataclass(frozen=True)
+class PlayerState:
+    playing: bool = False
+    paused: bool = False
+    current_index: int = 0
+    current_song: str = None
+    track_count: int = 0
+    loop: bool = False
+    volume: float = 0.7
+    library_name: str = None
+    scanning: bool = False
+
+@dataclass
+class LibraryView:
+    # A private copy of the library for the GUI thread, taken on the actor thread
+    name: str = None
+    folder_path: str = None
+    scanning: bool = False
+    playlist: TrackTable = field(default_factory=TrackTable)
+    duplicates: frozenset = frozenset()
+    bad_tracks: dict = field(default_factory=dict)
+    library_names: tuple = ()
+
+def library_view(player):
+    return LibraryView(
+        name=player.library_name,
+        folder_path=player.folder_path,
+        scanning=player.scan is not None,
+        playlist=player.playlist.copy(),
+        duplicates=frozenset(player.duplicates),
+        bad_tracks=dict(player.bad_tracks),
+        library_names=tuple(player.libraries.names()),
+    )
+
+def snapshot(player):
+    return PlayerState(
+        playing=player.playing,
+        paused=player.paused,
+        current_index=player.current_index,
+        current_song=player.current_song,
+        track_count=len(player.playlist),
+        loop=player.loop,
+        volume=player.volume,
+        library_name=player.library_name,
+        scanning=player.scan is not None,
+    )
+
+class PlayerActor:
+    # The only thread that touches the player and pygame. Everyone else posts commands
+    # and reads the last published PlayerState. State changes and command callbacks go to
+    # an outbox that the GUI thread drains, so the actor never waits on that thread.
+    def __init__(self, player, on_state=None, tick=0.1):
+        self.player = player
+        self.on_state = on_state
+        self.tick = tick
+        self.commands = queue.SimpleQueue()
+        self.outbox = queue.SimpleQueue()
+        self.state = snapshot(player)
+        self.thread = None
+        self.running = False
+
+    @property
+    def gui(self):
+        return self.player.gui
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="player-actor", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=2):
+        if not self.running:
+            return
+        self.running = False
+        self.commands.put(None)
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+        self.thread = None
+
+    def submit(self, command, *args, then=None):
+        # command is a player method name or any callable to run on the actor thread;
+        # then(result) is posted to the outbox once the command has succeeded
+        future = Future()
+        self.commands.put((command, args, future, then))
+        return future
+
+    def call(self, command, *args, timeout=None):
+        # Blocks the caller, so never use it from a thread the outbox is drained on while running
+        if threading.current_thread() is self.thread or not self.running:
+            try:
+                return self.execute(command, args)
+            finally:
+                self.publish()
+        return self.submit(command, *args).result(timeout)
+
+    def execute(self, command, args):
+        function = getattr(self.player, command) if isinstance(command, str) else command
+        return function(*args)
+
+    def publish(self):
+        state = snapshot(self.player)
+        if state != self.state:
+            self.state = state
+            if self.on_state is not None:
+                self.post(self.on_state, state)
+
+    def post(self, callback, *args):
+        self.outbox.put((callback, args))
+
+    def drain(self):
+        # Runs on the GUI thread
+        while True:
+            try:
+                callback, args = self.outbox.get_nowait()
+            except queue.Empty:
+                return
+            callback(*args)
+
+    def run(self):
+        # Track-end checks ride on the same loop, so they can't race a command
+        next_check = time.monotonic() + self.tick
+        while self.running:
+            try:
+                item = self.commands.get(timeout=max(0.0, next_check - time.monotonic()))
+            except queue.Empty:
+                item = ()
+            if item is None:
+                break
+            if item:
+                self.handle(*item)
+            if time.monotonic() >= next_check:
+                next_check = time.monotonic() + self.tick
+                self.handle("check_song_end", (), None)
+
+    def handle(self, command, args, future, then=None):
+        if future is not None and not future.set_running_or_notify_cancel():
+            return
+        try:
+            result = self.execute(command, args)
+        except Exception as e:
+            print(f"Player command {getattr(command, '__name__', command)} failed: {e}")
+            if future is not None:
+                future.set_exception(e)
+            self.publish()
+            return
+        # Waiters are released before anyone is notified
+        if future is not None:
+            future.set_result(result)
+        self.publish()
+        if then is not None:
+            self.post(then, result)
+
+    def play(self, index=None):
+        return self.submit("play", index)
+
+    def stop_playback(self):
+        return self.submit("stop")
+
+    def toggle_play(self):
+        return self.submit("toggle_play")
+
+    def next_song(self):
+        return self.submit("next_song")
+
+    def previous_song(self):
+        return self.submit("previous_song")
+
+    def restart(self):
+        return self.submit("restart")
+
+    def set_volume(self, volume):
+        return self.submit("set_volume", volume)
+
+    def set_loop(self, loop):
+        return self.submit("set_loop", loop)
@@ -0,0 +1,190 @@
+import os
+import sys
+import time
+import threading
+import functools
+import logging
+import logging.handlers
+import tracemalloc
+from collections import deque
+
+class Metric:
+    __slots__ = ("count", "total", "max", "samples")
+
+    def __init__(self, sample_size=512):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=sample_size)
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        self.samples.append(value)
+
+    def summary(self):
+        samples = sorted(self.samples)
+        if not samples:
+            return None
+        return {
+            "count": self.count,
+            "mean": self.total / self.count,
+            "p50": samples[len(samples) // 2],
+            "p99": samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+            "max": self.max,
+        }
+
+class Profiler:
+    def __init__(self, report_path="echo_profile.log", interval=10.0,
+                 max_bytes=1024 * 1024, backup_count=3):
+        self.enabled = False
+        self.report_path = report_path
+        self.interval = interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.metrics = {}
+        self.gauges = {}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.report_thread = None
+        self.logger = None
+        self.started_at = 0.0
+
+    def enable(self):
+        if self.enabled:
+            return
+        with self.lock:
+            self.metrics = {}
+        self.started_at = time.perf_counter()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.stop_event.clear()
+        self.report_thread = threading.Thread(target=self.report_loop, daemon=True)
+        self.report_thread.start()
+        self.enabled = True
+        print(f"Profiling enabled, writing to {os.path.abspath(self.report_path)}")
+
+    def disable(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        self.stop_event.set()
+        if self.report_thread:
+            self.report_thread.join(timeout=1)
+            self.report_thread = None
+        self.write_report()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        print("Profiling disabled")
+
+    def toggle(self):
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+        return self.enabled
+
+    def record(self, name, seconds):
+        metric = self.metrics.get(name)
+        if metric is None:
+            with self.lock:
+                metric = self.metrics.setdefault(name, Metric())
+        metric.add(seconds)
+
+    def add_gauge(self, name, read_value):
+        self.gauges[name] = read_value
+
+    def profiled(self, name):
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(name, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def report_loop(self):
+        while not self.stop_event.wait(self.interval):
+            self.write_report()
+
+    def get_logger(self):
+        if self.logger is None:
+            logger = logging.getLogger("echovr.profiler")
+            logger.propagate = False
+            logger.setLevel(logging.INFO)
+            handler = logging.handlers.RotatingFileHandler(
+                self.report_path, maxBytes=self.max_bytes, backupCount=self.backup_count
+            )
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            logger.addHandler(handler)
+            self.logger = logger
+        return self.logger
+
+    def build_report(self):
+        elapsed = time.perf_counter() - self.started_at
+        lines = [f"--- profile ({elapsed:.1f}s since enabled) ---"]
+        with self.lock:
+            metrics = sorted(self.metrics.items())
+        for name, metric in metrics:
+            summary = metric.summary()
+            if summary is None:
+                continue
+            lines.append(
+                f"{name:<28} n={summary['count']:<8} mean={summary['mean'] * 1000:8.3f}ms "
+                f"p50={summary['p50'] * 1000:8.3f}ms p99={summary['p99'] * 1000:8.3f}ms "
+                f"max={summary['max'] * 1000:8.3f}ms"
+            )
+        for name, read_value in sorted(self.gauges.items()):
+            try:
+                lines.append(f"{name:<28} {read_value()}")
+            except Exception as e:
+                lines.append(f"{name:<28} error: {e}")
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            lines.append(f"{'tracemalloc':<28} current={current / 1024:.1f}KiB peak={peak / 1024:.1f}KiB")
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            ])
+            for stat in snapshot.statistics("lineno")[:5]:
+                lines.append(f"    {stat}")
+        return "\n".join(lines)
+
+    def write_report(self):
+        try:
+            self.get_logger().info(self.build_report())
+        except Exception as e:
+            print(f"Error writing profile report: {e}")
+
+class StartupTimer:
+    def __init__(self, start_time, expected=()):
+        self.enabled = "--startup-timing" in sys.argv or bool(os.environ.get("ECHOVR_STARTUP_TIMING"))
+        self.start_time = start_time
+        self.marks = []
+        self.pending = set(expected)
+        self.reported = False
+
+    def mark(self, name):
+        if not self.enabled:
+            return
+        self.marks.append((name, time.perf_counter() - self.start_time))
+        self.pending.discard(name)
+        if not self.pending and not self.reported:
+            self.reported = True
+            self.report()
+
+    def report(self):
+        print("Startup timing:")
+        previous = 0.0
+        for name, elapsed in sorted(self.marks, key=lambda mark: mark[1]):
+            print(f"  {name:<24} {elapsed * 1000:8.1f} ms  (+{(elapsed - previous) * 1000:.1f} ms)")
+            previous = elapsed
+
+profiler = Profiler()
@@ -0,0 +1,193 @@
+import os
+import sys
+import time
+import threading
+
+PRIORITIES = ("normal", "high", "realtime")
+
+# Windows thread priorities
+THREAD_PRIORITY_NORMAL = 0
+THREAD_PRIORITY_HIGHEST = 2
+THREAD_PRIORITY_TIME_CRITICAL = 15
+
+class ThreadTuning:
+    # Applied from inside the thread (or process) it tunes; every setting is optional and best effort
+    def __init__(self, priority="normal", cpus=(), timer_resolution_ms=0, nice=-10, fifo_priority=10):
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority {priority}; expected one of {', '.join(PRIORITIES)}")
+        self.priority = priority
+        self.cpus = [int(cpu) for cpu in cpus]
+        self.timer_resolution_ms = int(timer_resolution_ms)
+        self.nice = nice
+        self.fifo_priority = fifo_priority
+        self.timer_period_set = False
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.detector_priority, config.detector_cpus, config.timer_resolution_ms)
+
+    def describe(self):
+        parts = [self.priority]
+        if self.cpus:
+            parts.append("cpus " + ",".join(str(cpu) for cpu in self.cpus))
+        if self.timer_resolution_ms:
+            parts.append(f"timer {self.timer_resolution_ms} ms")
+        return ", ".join(parts)
+
+    def apply(self):
+        applied = []
+        for step in (self.apply_priority, self.apply_affinity, self.apply_timer_resolution):
+            try:
+                result = step()
+            except (OSError, AttributeError, ValueError) as e:
+                print(f"Could not apply {step.__name__[6:].replace('_', ' ')}: {e}")
+                continue
+            if result:
+                applied.append(result)
+        return applied
+
+    def apply_priority(self):
+        if self.priority == "normal":
+            return None
+        if sys.platform == "win32":
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            level = THREAD_PRIORITY_TIME_CRITICAL if self.priority == "realtime" else THREAD_PRIORITY_HIGHEST
+            if not kernel32.SetThreadPriority(kernel32.GetCurrentThread(), level):
+                raise OSError(ctypes.get_last_error(), "SetThreadPriority failed")
+            return f"thread priority {level}"
+
+        if self.priority == "realtime" and hasattr(os, "sched_setscheduler"):
+            try:
+                # pid 0 is the calling thread on Linux
+                os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(self.fifo_priority))
+                return f"SCHED_FIFO {self.fifo_priority}"
+            except PermissionError:
+                print("SCHED_FIFO needs CAP_SYS_NICE or an rtprio limit; trying nice instead")
+        # Linux nice values are per thread, addressed by the native thread id
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), self.nice)
+        return f"nice {self.nice}"
+
+    def apply_affinity(self):
+        if not self.cpus:
+            return None
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, self.cpus)
+        elif sys.platform == "win32":
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetThreadAffinityMask.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+            mask = sum(1 << cpu for cpu in self.cpus)
+            if not kernel32.SetThreadAffinityMask(kernel32.GetCurrentThread(), mask):
+                raise OSError(ctypes.get_last_error(), "SetThreadAffinityMask failed")
+        else:
+            return None
+        return "cpus " + ",".join(str(cpu) for cpu in self.cpus)
+
+    def apply_timer_resolution(self):
+        # Only Windows has a coarse default timer; Linux sleeps are already high resolution
+        if not self.timer_resolution_ms or sys.platform != "win32":
+            return None
+        import ctypes
+        if ctypes.windll.winmm.timeBeginPeriod(self.timer_resolution_ms) != 0:
+            raise OSError(f"timeBeginPeriod({self.timer_resolution_ms}) was refused")
+        self.timer_period_set = True
+        return f"timer {self.timer_resolution_ms} ms"
+
+    def restore(self):
+        if self.timer_period_set:
+            import ctypes
+            ctypes.windll.winmm.timeEndPeriod(self.timer_resolution_ms)
+            self.timer_period_set = False
+
+def measure_jitter(interval, duration, tuning=None):
+    overshoots = []
+    applied = []
+
+    def run():
+        if tuning is not None:
+            applied.extend(tuning.apply())
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            time.sleep(interval)
+            overshoots.append(time.perf_counter() - start - interval)
+        if tuning is not None:
+            tuning.restore()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join()
+    overshoots.sort()
+    count = len(overshoots)
+    return {
+        "applied": applied,
+        "samples": count,
+        "mean_ms": sum(overshoots) / count * 1000,
+        "p50_ms": overshoots[count // 2] * 1000,
+        "p99_ms": overshoots[min(count - 1, int(count * 0.99))] * 1000,
+        "max_ms": overshoots[-1] * 1000,
+        "long_gaps": sum(1 for overshoot in overshoots if overshoot > interval),
+    }
+
+def burn(stop_event):
+    while not stop_event.is_set():
+        pass
+
+def start_load(workers):
+    # Stands in for the game keeping every core busy
+    import multiprocessing
+    stop_event = multiprocessing.Event()
+    processes = [multiprocessing.Process(target=burn, args=(stop_event,), daemon=True) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    return stop_event, processes
+
+def compare(configurations, interval=0.02, duration=5.0, load=False):
+    loader = start_load(os.cpu_count() or 1) if load else None
+    rows = []
+    try:
+        for tuning in configurations:
+            rows.append((tuning.describe(), measure_jitter(interval, duration, tuning)))
+    finally:
+        if loader is not None:
+            stop_event, processes = loader
+            stop_event.set()
+            for process in processes:
+                process.join(timeout=1)
+
+    print(f"Sleep overshoot for a {interval * 1000:.0f} ms poll over {duration:.0f} s"
+          f"{' with every core busy' if load else ''}:")
+    print(f"  {'configuration':<28} {'mean':>8} {'p50':>8} {'p99':>8} {'max':>8}  {'>1 period':>9}  applied")
+    for label, stats in rows:
+        print(f"  {label:<28} {stats['mean_ms']:7.2f}ms {stats['p50_ms']:7.2f}ms {stats['p99_ms']:7.2f}ms "
+              f"{stats['max_ms']:7.2f}ms  {stats['long_gaps']:>9}  {', '.join(stats['applied']) or '-'}")
+    return rows
+
+def default_configurations():
+    last_cpu = (os.cpu_count() or 1) - 1
+    configurations = [
+        ThreadTuning(),
+        ThreadTuning("high"),
+        ThreadTuning("realtime"),
+        ThreadTuning("high", cpus=[last_cpu]),
+    ]
+    if sys.platform == "win32":
+        configurations += [ThreadTuning(timer_resolution_ms=1), ThreadTuning("high", [last_cpu], 1)]
+    return configurations
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    interval = 0.02
+    duration = 5.0
+    load = "--load" in argv
+    for flag, value in zip(argv, argv[1:]):
+        if flag == "--interval":
+            interval = float(value)
+        elif flag == "--duration":
+            duration = float(value)
+    compare(default_configurations(), interval, duration, load)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+import os
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+
+SEPARATOR = 0
+
+def split_point(path):
+    if os.altsep:
+        return max(path.rfind(os.sep), path.rfind(os.altsep)) + 1
+    return path.rfind(os.sep) + 1
+
+def split_path(path):
+    cut = split_point(path)
+    return path[:cut], path[cut:]
+
+def encode_name(name):
+    return name.encode("utf-8", "surrogateescape")
+
+def decode_name(data):
+    return data.decode("utf-8", "surrogateescape")
+
+class TrackNames:
+    def __init__(self, table):
+        self.table = table
+
+    def __len__(self):
+        return len(self.table)
+
+    def __getitem__(self, index):
+        return self.table.name(index)
+
+    def __iter__(self):
+        for index in range(len(self.table)):
+            yield self.table.name(index)
+
+class TrackTable:
+    # Paths are split into an interned directory prefix and a file name. File names
+    # live back to back in one NUL-separated bytearray, located through an offset array.
+    def __init__(self, paths=()):
+        self.dirs = []
+        self.dir_ids = {}
+        self.dir_index = array("I")
+        self.ranks = array("I")
+        self.blob = bytearray(b"\0")
+        self.offsets = array("Q", [1])
+        self.next_rank = 0
+        self.names = TrackNames(self)
+        self.extend(paths)
+
+    def dir_id(self, prefix):
+        dir_id = self.dir_ids.get(prefix)
+        if dir_id is None:
+            dir_id = len(self.dirs)
+            self.dirs.append(prefix)
+            self.dir_ids[prefix] = dir_id
+        return dir_id
+
+    def append(self, path, rank=None):
+        prefix, file_name = split_path(path)
+        self.dir_index.append(self.dir_id(prefix))
+        self.blob += encode_name(file_name)
+        self.blob.append(SEPARATOR)
+        self.offsets.append(len(self.blob))
+        if rank is None:
+            rank = self.next_rank
+        self.ranks.append(rank)
+        self.next_rank = max(self.next_rank, rank + 1)
+        return len(self.dir_index) - 1
+
+    def extend(self, paths):
+        dir_ids = self.dir_ids
+        dir_index = array("I")
+        file_names = []
+        for path in paths:
+            cut = split_point(path)
+            prefix = path[:cut]
+            dir_id = dir_ids.get(prefix)
+            if dir_id is None:
+                dir_id = self.dir_id(prefix)
+            dir_index.append(dir_id)
+            file_names.append(path[cut:])
+        if not file_names:
+            return
+
+        encoded = "\0".join(file_names).encode("utf-8", "surrogateescape") + b"\0"
+        if len(encoded) == sum(map(len, file_names)) + len(file_names):
+            lengths = map(len, file_names)
+        else:
+            lengths = (len(encode_name(file_name)) for file_name in file_names)
+        start = len(self.blob)
+        self.blob += encoded
+        self.offsets.extend(start + offset + count
+                            for count, offset in enumerate(accumulate(lengths), 1))
+        self.dir_index.extend(dir_index)
+        self.ranks.extend(range(self.next_rank, self.next_rank + len(file_names)))
+        self.next_rank += len(file_names)
+
+    def __len__(self):
+        return len(self.dir_index)
+
+    def normalize(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("track index out of range")
+        return index
+
+    def file_name(self, index):
+        return decode_name(self.blob[self.offsets[index]:self.offsets[index + 1] - 1])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        index = self.normalize(index)
+        return self.dirs[self.dir_index[index]] + self.file_name(index)
+
+    def __iter__(self):
+        dirs = self.dirs
+        for index in range(len(self)):
+            yield dirs[self.dir_index[index]] + self.file_name(index)
+
+    def name(self, index):
+        return os.path.splitext(self.file_name(self.normalize(index)))[0]
+
+    def rank(self, index):
+        return self.ranks[self.normalize(index)]
+
+    def index(self, path):
+        prefix, file_name = split_path(path)
+        dir_id = self.dir_ids.get(prefix)
+        if dir_id is not None:
+            needle = b"\0" + encode_name(file_name) + b"\0"
+            position = self.blob.find(needle)
+            while position >= 0:
+                index = bisect_left(self.offsets, position + 1)
+                if self.dir_index[index] == dir_id:
+                    return index
+                position = self.blob.find(needle, position + 1)
+        raise ValueError(f"{path} is not in the track table")
+
+    def __contains__(self, path):
+        try:
+            self.index(path)
+            return True
+        except ValueError:
+            return False
+
+    def shift_offsets(self, index, delta):
+        self.offsets[index:] = array("Q", [offset + delta for offset in self.offsets[index:]])
+
+    def __delitem__(self, index):
+        index = self.normalize(index)
+        start, end = self.offsets[index], self.offsets[index + 1]
+        del self.blob[start:end]
+        del self.offsets[index + 1]
+        self.shift_offsets(index + 1, start - end)
+        del self.dir_index[index]
+        del self.ranks[index]
+
+    def replace(self, index, path):
+        index = self.normalize(index)
+        prefix, file_name = split_path(path)
+        start, end = self.offsets[index], self.offsets[index + 1]
+        encoded = encode_name(file_name) + b"\0"
+        self.blob[start:end] = encoded
+        self.shift_offsets(index + 1, len(encoded) - (end - start))
+        self.dir_index[index] = self.dir_id(prefix)
+
+    def reorder(self, order):
+        # Also filters: indexes left out of order are dropped
+        blob = self.blob
+        offsets = self.offsets
+        parts = [blob[offsets[i]:offsets[i + 1]] for i in order]
+        new_offsets = array("Q", [1])
+        position = 1
+        for part in parts:
+            position += len(part)
+            new_offsets.append(position)
+        self.blob = bytearray(b"\0") + b"".join(parts)
+        self.offsets = new_offsets
+        self.dir_index = array("I", [self.dir_index[i] for i in order])
+        self.ranks = array("I", [self.ranks[i] for i in order])
+
+    def renumber(self):
+        # Current order becomes library order
+        self.ranks = array("I", range(len(self)))
+        self.next_rank = len(self)
+
+    def copy(self):
+        table = TrackTable()
+        table.dirs = list(self.dirs)
+        table.dir_ids = dict(self.dir_ids)
+        table.dir_index = array("I", self.dir_index)
+        table.ranks = array("I", self.ranks)
+        table.blob = bytearray(self.blob)
+        table.offsets = array("Q", self.offsets)
+        table.next_rank = self.next_rank
+        return table
+
+    def memory_usage(self):
+        return (sys.getsizeof(self.blob) + sys.getsizeof(self.offsets) + sys.getsizeof(self.dir_index)
+                + sys.getsizeof(self.ranks) + sys.getsizeof(self.dirs) + sys.getsizeof(self.dir_ids)
+                + sum(sys.getsizeof(prefix) for prefix in self.dirs))
+
+def synthetic_paths(count, folders=2000):
+    root = os.path.join(os.path.expanduser("~"), "Music", "Soundboard")
+    for i in range(count):
+        folder = i % folders
+        yield os.path.join(root, f"Pack {folder:04d}", f"Category {folder % 13}", f"Clip {i:07d} - sound effect.mp3")
+
+def measure(label, build, count):
+    import gc
+    import tracemalloc
+    # Paths are generated inside the build so each representation owns its strings
+    gc.collect()
+    start = time.perf_counter()
+    build(list(synthetic_paths(count)))
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    paths = list(synthetic_paths(count))
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    result = build(paths)
+    del paths
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    return label, elapsed, size, result
+
+def build_lists(paths):
+    playlist = paths
+    song_names = [os.path.splitext(os.path.basename(path))[0] for path in playlist]
+    return playlist, song_names
+
+def benchmark(count):
+    rows = [measure("lists", build_lists, count), measure("TrackTable", TrackTable, count)]
+    paths = list(synthetic_paths(count))
+    print(f"{count:,} tracks")
+    for label, elapsed, size, _ in rows:
+        print(f"  {label:<11} load {elapsed:7.3f} s  memory {size / 1024 / 1024:8.1f} MiB  "
+              f"({size / count:6.1f} B/track)")
+
+    table = rows[1][3]
+    target = paths[count // 2]
+    start = time.perf_counter()
+    table.index(target)
+    lookup = time.perf_counter() - start
+    start = time.perf_counter()
+    for index in range(0, count, max(1, count // 1000)):
+        table[index]
+        table.names[index]
+    access = (time.perf_counter() - start) / min(count, 1000)
+    print(f"  TrackTable  index() {lookup * 1000:.2f} ms  path+name access {access * 1e6:.2f} us")
+
+if __name__ == "__main__":
+    for count in (100_000, 1_000_000):
+        benchmark(count)
@@ -0,0 +1,99 @@
+import unittest
+
+from GestureGrammar import CLICK, HOLD, LONG_PRESS, GestureGrammar, parse_pattern
+
+SOUNDBOARD = [
+    {"pattern": "C C C", "action": "prev_song", "window": 0.8},
+    {"pattern": "C C C C", "action": "next_song", "window": 1.0},
+    {"pattern": "C C C C C", "action": "next_library", "window": 1.2},
+    {"pattern": "H", "action": "toggle_pause"},
+]
+
+
+def run(grammar, presses, settle=3.0):
+    # presses: (gap before the press, press duration)
+    matcher = grammar.matcher()
+    rules = []
+    now = 0.0
+    for gap, duration in presses:
+        now += gap
+        # Let deadlines inside a long press (holds) fire as they would while polling
+        step = 0.01
+        rules += matcher.feed([(now, True)], now)
+        held = 0.0
+        while held + step < duration:
+            held += step
+            rules += matcher.feed([], now + held)
+        now += duration
+        rules += matcher.feed([(now, False)], now)
+    rules += matcher.feed([], now + settle)
+    return [rule.action for rule in rules]
+
+
+class ParsePatternTest(unittest.TestCase):
+    def test_words_and_letters(self):
+        self.assertEqual(parse_pattern("C C H"), (CLICK, CLICK, HOLD))
+        self.assertEqual(parse_pattern("click, long"), (CLICK, LONG_PRESS))
+        self.assertEqual(parse_pattern("cch"), (CLICK, CLICK, HOLD))
+
+    def test_rejects_unknown_tokens(self):
+        with self.assertRaises(ValueError):
+            parse_pattern("C X")
+        with self.assertRaises(ValueError):
+            parse_pattern("")
+
+
+class GestureMatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.grammar = GestureGrammar(SOUNDBOARD, hold_threshold=2.0, click_timeout=0.5, click_max=0.5)
+
+    def test_click_counts(self):
+        self.assertEqual(run(self.grammar, [(0.0, 0.05)] * 2), [])
+        self.assertEqual(run(self.grammar, [(0.0, 0.05)] + [(0.15, 0.05)] * 2), ["prev_song"])
+        self.assertEqual(run(self.grammar, [(0.0, 0.05)] + [(0.15, 0.05)] * 3), ["next_song"])
+        self.assertEqual(run(self.grammar, [(0.0, 0.05)] + [(0.15, 0.05)] * 4), ["next_library"])
+
+    def test_window_limits_slow_gestures(self):
+        self.assertEqual(run(self.grammar, [(0.0, 0.05)] + [(0.4, 0.05)] * 2), [])
+
+    def test_hold_fires_on_its_own(self):
+        self.assertEqual(run(self.grammar, [(0.0, 2.2)]), ["toggle_pause"])
+
+    def test_hold_right_after_clicks_still_fires(self):
+        presses = [(0.0, 0.05), (0.15, 0.05), (0.2, 2.2)]
+        self.assertEqual(run(self.grammar, presses), ["toggle_pause"])
+
+    def test_hold_after_one_click_still_fires(self):
+        self.assertEqual(run(self.grammar, [(0.0, 0.05), (0.2, 2.2)]), ["toggle_pause"])
+
+    def test_leaf_commits_on_release(self):
+        grammar = GestureGrammar([{"pattern": "C C", "action": "next"}], click_timeout=0.5)
+        matcher = grammar.matcher()
+        rules = matcher.feed([(0.0, True), (0.05, False), (0.2, True), (0.25, False)], 0.25)
+        self.assertEqual([rule.action for rule in rules], ["next"])
+
+    def test_invalid_gestures_are_skipped(self):
+        grammar = GestureGrammar([{"pattern": "C Z", "action": "x"}, {"pattern": "C", "action": "ok"},
+                                  {"pattern": "C C", "action": "slow", "window": -1}])
+        self.assertEqual([rule.action for rule in grammar.rules], ["ok"])
+
+    def test_adaptive_timeout_recovers_after_slower_clicks(self):
+        grammar = GestureGrammar([{"pattern": "C C", "action": "a"}, {"pattern": "C C C", "action": "b"}],
+                                 click_timeout=0.5, adaptive_timeout=True, min_click_timeout=0.1)
+        matcher = grammar.matcher()
+        now = 0.0
+        for _ in range(10):
+            matcher.feed([(now, True), (now + 0.05, False), (now + 0.17, True), (now + 0.22, False)], now + 0.22)
+            now += 2.0
+            matcher.feed([], now)
+        fast_timeout = matcher.click_timeout
+        self.assertLess(fast_timeout, 0.3)
+        for _ in range(3):
+            matcher.feed([(now, True), (now + 0.05, False), (now + 0.4, True), (now + 0.45, False)], now + 0.45)
+            now += 2.0
+            matcher.feed([], now)
+        self.assertGreater(matcher.click_timeout, 0.4)
+
+
+if __name__ == "__main__":
+    unittest.main()
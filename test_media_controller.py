@@ -0,0 +1,62 @@
+import time
+import unittest
+
+from MediaController import MediaController, SoundAction
+from MediaKeyBackends import FakeBackend, create_backend
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+class MediaControllerTest(unittest.TestCase):
+    def test_fake_backend_is_only_created_by_name(self):
+        backend = create_backend("fake")
+        self.assertIsInstance(backend, FakeBackend)
+        self.assertNotIsInstance(create_backend("auto"), FakeBackend)
+
+    def test_keys_are_sent_through_the_backend(self):
+        backend = FakeBackend()
+        controller = MediaController(backend)
+        try:
+            self.assertTrue(controller.available)
+            self.assertEqual(controller.backend_name, "fake")
+            self.assertTrue(controller.send_media_key(SoundAction.NEXT_TRACK))
+            self.assertTrue(controller.send_media_key(SoundAction.PLAY_PAUSE))
+            self.assertTrue(wait_for(lambda: len(backend.sent) == 2))
+            self.assertEqual([action for _, action in backend.sent], ["next_track", "play_pause"])
+            self.assertEqual(controller.get_last_action(), "play_pause")
+            self.assertEqual(controller.get_latency_stats()["count"], 2)
+        finally:
+            controller.close()
+
+    def test_repeated_key_is_sent_once_while_pending(self):
+        backend = FakeBackend(delay=0.05)
+        controller = MediaController(backend)
+        try:
+            for _ in range(4):
+                controller.send_media_key(SoundAction.PREV_TRACK)
+            self.assertTrue(wait_for(lambda: controller.queue.empty() and not controller.pending))
+            time.sleep(0.1)
+            self.assertLessEqual(len(backend.sent), 2)
+        finally:
+            controller.close()
+
+    def test_without_a_backend_keys_are_refused(self):
+        controller = MediaController(None)
+        try:
+            self.assertFalse(controller.available)
+            self.assertEqual(controller.backend_name, "no")
+            self.assertFalse(controller.send_media_key(SoundAction.PLAY_PAUSE))
+            self.assertIsNone(controller.get_latency_stats())
+        finally:
+            controller.close()
+
+
+if __name__ == "__main__":
+    unittest.main()